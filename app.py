@@ -1,18 +1,264 @@
-import asyncio
-import json
-from collections.abc import AsyncGenerator
-from datetime import datetime
-
-from fastapi import FastAPI, Request
-from fastapi.responses import HTMLResponse
+import ipaddress
+import os
+import random
+from collections.abc import AsyncGenerator, Callable
+from contextlib import asynccontextmanager
+from datetime import timezone
+from functools import partial
+from typing import Literal
+
+from fastapi import FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.responses import HTMLResponse, PlainTextResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
-from sse_starlette.sse import EventSourceResponse
+from sse_starlette.sse import EventSourceResponse, ServerSentEvent, ensure_bytes
+
+from streaming import (
+    BroadcastHub,
+    Clock,
+    DeltaEncoder,
+    Filter,
+    Frame,
+    JobsFull,
+    LatestValue,
+    LoopLagMonitor,
+    Policy,
+    StreamProfiler,
+    batched,
+    compile_filter,
+    create_admission,
+    create_compression,
+    create_jobs,
+    create_transport,
+    hash_chain,
+    overflow_counts,
+    shared_tail,
+    track_stream,
+)
+from streaming.metrics import CONTENT_TYPE, registry
+
+# Every stream reads the time and sleeps through this clock, and draws its
+# simulated data from this generator; tests swap in a VirtualClock and a seed
+clock = Clock(tick=float(os.environ.get("SSE_TIMER_TICK", "0.1")))
+rng = random.Random()
+
+# Seconds between keep-alive comments on an otherwise quiet stream
+ping_interval = float(os.environ.get("SSE_PING_INTERVAL", "15"))
+
+# Shared hub: one producer per channel, fanned out to all clients. The transport
+# relays frames between worker processes (see SSE_TRANSPORT in the README)
+hub = BroadcastHub(create_transport())
+
+
+async def datetime_ticks() -> AsyncGenerator[tuple[str, dict], None]:
+    """Producer for the shared datetime channel"""
+    while True:
+        data = {
+            "datetime": clock.timestamp(),
+            "message": "Current server time",
+            "interval": "30 seconds",
+        }
+
+        yield "datetime", data
+
+        # Wait 30 seconds before next update
+        await clock.sleep(30)
+
+
+# Keep the last hour of ticks for clients resuming with Last-Event-ID. Only the
+# newest time matters, so a client that falls behind skips straight to it
+hub.register(
+    "datetime",
+    datetime_ticks,
+    replay_latest=True,
+    history=120,
+    queue_size=4,
+    policy=Policy.COALESCE,
+)
+
+# Upstream sensor update rate for the conflated realtime stream
+SENSOR_HZ = float(os.environ.get("SENSOR_HZ", "100"))
+SENSOR_UNITS = {"temperature": "°C", "humidity": "%", "pressure": "hPa"}
+
+
+async def sensor_updates(cell: LatestValue) -> None:
+    """High-frequency sensor simulation feeding the conflated realtime stream"""
+    temperature, humidity, pressure = 25.0, 60.0, 1010.0
+    interval = 1 / SENSOR_HZ
+    while True:
+        # Random walk within the ranges of the 1 Hz simulation
+        temperature = min(30.0, max(20.0, temperature + rng.uniform(-0.05, 0.05)))
+        humidity = min(80.0, max(40.0, humidity + rng.uniform(-0.1, 0.1)))
+        pressure = min(1020.0, max(1000.0, pressure + rng.uniform(-0.05, 0.05)))
+
+        # Raw values only; nothing is serialized until a client samples
+        cell.update(
+            {
+                "temperature": temperature,
+                "humidity": humidity,
+                "pressure": pressure,
+                "timestamp": clock.timestamp(),
+            }
+        )
+        await clock.sleep(interval)
+
+
+def render_sensor_data(state: dict) -> dict:
+    """Payload for a sampled sensor snapshot, same shape as the 1 Hz stream"""
+    return {
+        "temperature": round(state["temperature"], 2),
+        "humidity": round(state["humidity"], 2),
+        "pressure": round(state["pressure"], 2),
+        "timestamp": state["timestamp"],
+        "unit": SENSOR_UNITS,
+    }
+
+
+# Looked up per call, so tests can swap the clock after import
+sensors = LatestValue(
+    "sensor_data",
+    render_sensor_data,
+    sensor_updates,
+    sleep=lambda seconds: clock.sleep(seconds),
+)
+
+
+def sensor_delta_frames() -> Callable[[int, dict], Frame]:
+    """Per-connection framing for ?encoding=delta (see streaming/delta.py)"""
+    # The first reading goes out as sensor_schema, every later one as sensor_delta
+    encoder = DeltaEncoder(tuple(SENSOR_UNITS), precision=2, static=("unit",))
+
+    def encode(event_id: int, reading: dict) -> Frame:
+        kind, payload = encoder.encode(reading)
+        return Frame.json(f"sensor_{kind}", payload, id=str(event_id))
+
+    return encode
+
+
+def resume_position(last_event_id: str | None) -> int:
+    """Number of events a reconnecting client has already received"""
+    try:
+        return max(0, int(last_event_id))
+    except (TypeError, ValueError):
+        return 0
+
+
+def stream_filter(request: Request) -> Filter:
+    """The compiled filter a stream URL declares, e.g. ``?level>=WARNING&service=api``"""
+    try:
+        return compile_filter(request.query_params.multi_items())
+    except ValueError as exc:
+        raise HTTPException(status_code=422, detail=str(exc)) from None
+
+
+def ping_message() -> ServerSentEvent:
+    """Keep-alive comment, stamped by the stream clock"""
+    return ServerSentEvent(comment=f"ping - {clock.now(timezone.utc)}")
+
+
+# Per-process and per-client stream limits, and the retry hints that spread
+# reconnects out under load (see SSE_MAX_STREAMS in the README)
+admission = create_admission(rng)
+
+# Opt-in gzip/deflate for event streams, capped in streams and CPU (see
+# SSE_COMPRESSION in the README)
+compression = create_compression()
+
+# Per-phase timings of every stream, off unless SSE_PROFILE=1 or switched on
+# through /admin/profile
+profiler = StreamProfiler(enabled=os.environ.get("SSE_PROFILE") == "1")
+
+
+class MeteredEventSourceResponse(EventSourceResponse):
+    """An EventSourceResponse that records stream metrics under its route path"""
+
+    async def __call__(self, scope, receive, send) -> None:
+        # The route template, so /stream/x/{id} stays one series
+        route = scope.get("route")
+        path = route.path if route is not None else scope["path"]
+        client = scope["client"][0] if scope.get("client") else None
+        rejected = admission.admit(client)
+        if rejected is not None:
+            # Turned away before the generator starts, so it holds nothing yet
+            await admission.reject(path, rejected, send)
+            return
+        self.body_iterator, send = profiler.instrument(path, self.body_iterator, send)
+        # Metrics see events as written; retry hints and then compression sit
+        # between them and the socket
+        call = admission.wrap(partial(track_stream, path, super().__call__), client)
+        encoding = compression.negotiate(scope["headers"])
+        if encoding is not None:
+            call = compression.wrap(call, encoding)
+        await call(scope, receive, send)
+
+    async def _ping(self, send) -> None:
+        # sse-starlette sleeps on its own loop timer per response; the clock's
+        # timer wheel wakes every connection due for a ping in one batch
+        while self.active:
+            await clock.sleep(self.ping_interval)
+            ping = ensure_bytes(self.ping_message_factory(), self.sep)
+            async with self._send_lock:
+                if self.active:
+                    await send({"type": "http.response.body", "body": ping, "more_body": True})
+
+
+def event_stream(generator: AsyncGenerator[Frame, None]) -> EventSourceResponse:
+    """SSE response for one of the stream generators"""
+    return MeteredEventSourceResponse(
+        generator, ping=ping_interval, ping_message_factory=ping_message
+    )
+
+
+# Hub state is read when /metrics is scraped rather than tracked per frame
+registry.collector(
+    "sse_channel_subscribers",
+    "Subscribers attached to each hub channel",
+    "gauge",
+    ("channel",),
+    lambda: [((c.name,), len(c.subscribers)) for c in hub.channels],
+)
+registry.collector(
+    "sse_channel_queued_frames",
+    "Frames waiting in subscriber queues, summed per hub channel",
+    "gauge",
+    ("channel",),
+    lambda: [((c.name,), sum(map(len, c.subscribers))) for c in hub.channels],
+)
+registry.collector(
+    "sse_overflows_total",
+    "Slow-subscriber overflows by policy, plus forced disconnects",
+    "counter",
+    ("policy",),
+    lambda: [((policy,), count) for policy, count in overflow_counts.items()],
+)
+
+lag_monitor = LoopLagMonitor()
+
+# CPU-heavy jobs run in a process pool; their progress streams to watchers
+jobs = create_jobs(
+    sleep=lambda seconds: clock.sleep(seconds), timestamp=lambda: clock.timestamp()
+)
+
+# /stream/logs follows this file when set, through one shared tail per file,
+# instead of simulating log lines
+log_file = os.environ.get("SSE_LOG_FILE")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await hub.start()
+    lag_monitor.start()
+    yield
+    await lag_monitor.close()
+    await jobs.close()
+    await hub.close()
+
 
 app = FastAPI(
     title="FastAPI SSE Streaming Example",
     description="A comprehensive example demonstrating Server-Sent Events (SSE) streaming with FastAPI",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Mount static files and templates
@@ -27,40 +273,44 @@ async def root(request: Request):
 
 
 @app.get("/stream/simple")
-async def simple_stream() -> EventSourceResponse:
+async def simple_stream(
+    last_event_id: str | None = Header(default=None),
+) -> EventSourceResponse:
     """Simple SSE stream that sends 10 messages with 1-second intervals"""
+    start = resume_position(last_event_id)
 
-    async def event_generator() -> AsyncGenerator[dict, None]:
-        for i in range(10):
+    async def event_generator() -> AsyncGenerator[Frame, None]:
+        for i in range(start, 10):
             # Simulate some processing time
-            await asyncio.sleep(1)
+            await clock.sleep(1)
 
             data = {
                 "message": f"Simple message #{i + 1}",
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": clock.timestamp(),
                 "count": i + 1,
             }
 
-            yield {"event": "message", "data": json.dumps(data)}
+            yield Frame.json("message", data, id=str(i + 1))
 
         # Send completion event
-        yield {
-            "event": "complete",
-            "data": json.dumps({"message": "Stream completed successfully"}),
-        }
+        yield Frame.json("complete", {"message": "Stream completed successfully"})
 
-    return EventSourceResponse(event_generator())
+    return event_stream(event_generator())
 
 
 @app.get("/stream/progress")
-async def progress_stream() -> EventSourceResponse:
+async def progress_stream(
+    last_event_id: str | None = Header(default=None),
+) -> EventSourceResponse:
     """Progress bar simulation with percentage updates"""
+    start = resume_position(last_event_id)
 
-    async def event_generator() -> AsyncGenerator[dict, None]:
+    async def event_generator() -> AsyncGenerator[Frame, None]:
         total_steps = 20
 
-        for i in range(total_steps + 1):
-            await asyncio.sleep(0.5)
+        # Resume after the last step the client saw instead of starting over
+        for i in range(start, total_steps + 1):
+            await clock.sleep(0.5)
 
             percentage = (i / total_steps) * 100
             status = "processing"
@@ -76,47 +326,98 @@ async def progress_stream() -> EventSourceResponse:
                 "total_steps": total_steps,
                 "status": status,
                 "message": f"Processing step {i}/{total_steps}",
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": clock.timestamp(),
             }
 
-            yield {"event": "progress", "data": json.dumps(data)}
+            yield Frame.json("progress", data, id=str(i + 1))
+
+    return event_stream(event_generator())
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    steps: int = Query(default=20, ge=1, le=1000),
+    rounds: int = Query(default=200_000, ge=1, le=10_000_000),
+) -> dict:
+    """Start a CPU-heavy demo job (chained SHA-256) in the process pool"""
+    try:
+        job = jobs.submit(hash_chain, steps, rounds)
+    except JobsFull as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={"Retry-After": "5"})
+    return {"job_id": job.id, "status": job.status, "stream": f"/stream/progress/{job.id}"}
 
-    return EventSourceResponse(event_generator())
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str) -> dict:
+    """Current state of a job, with its result once it has finished"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    return job.snapshot()
+
+
+@app.get("/stream/progress/{job_id}")
+async def job_progress_stream(
+    job_id: str,
+    max_hz: float = Query(default=10, gt=0, le=50),
+) -> EventSourceResponse:
+    """Progress of a real job; any number of watchers share its snapshots"""
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown job")
+    # Ends with a complete or error event once the job has finished
+    return event_stream(job.progress.sample(max_hz))
 
 
 @app.get("/stream/realtime")
-async def realtime_stream() -> EventSourceResponse:
+async def realtime_stream(
+    last_event_id: str | None = Header(default=None),
+    max_hz: float | None = Query(default=None, gt=0, le=50),
+    encoding: Literal["full", "delta"] = Query(default="full"),
+) -> EventSourceResponse:
     """Real-time data stream (simulates sensor data or live updates)"""
+    # Delta mode sends names, units and absolute values once per connection
+    encode = sensor_delta_frames() if encoding == "delta" else None
 
-    async def event_generator() -> AsyncGenerator[dict, None]:
-        import random
+    if max_hz is not None:
+        # Conflated mode: the newest merged snapshot, at most max_hz per second
+        return event_stream(sensors.sample(max_hz, encode))
 
-        for _ in range(30):  # Stream for 30 seconds
-            await asyncio.sleep(1)
+    start = resume_position(last_event_id)
+
+    async def event_generator() -> AsyncGenerator[Frame, None]:
+        for i in range(start, 30):  # Stream for 30 seconds
+            await clock.sleep(1)
 
             # Simulate sensor data
-            temperature = round(random.uniform(20, 30), 2)
-            humidity = round(random.uniform(40, 80), 2)
-            pressure = round(random.uniform(1000, 1020), 2)
+            temperature = round(rng.uniform(20, 30), 2)
+            humidity = round(rng.uniform(40, 80), 2)
+            pressure = round(rng.uniform(1000, 1020), 2)
 
             data = {
                 "temperature": temperature,
                 "humidity": humidity,
                 "pressure": pressure,
-                "timestamp": datetime.now().isoformat(),
-                "unit": {"temperature": "°C", "humidity": "%", "pressure": "hPa"},
+                "timestamp": clock.timestamp(),
+                "unit": SENSOR_UNITS,
             }
 
-            yield {"event": "sensor_data", "data": json.dumps(data)}
+            if encode is None:
+                yield Frame.json("sensor_data", data, id=str(i + 1))
+            else:
+                yield encode(i + 1, data)
 
-    return EventSourceResponse(event_generator())
+    return event_stream(event_generator())
 
 
 @app.get("/stream/chat")
-async def chat_stream() -> EventSourceResponse:
+async def chat_stream(
+    last_event_id: str | None = Header(default=None),
+) -> EventSourceResponse:
     """Chat message simulation with typing indicators"""
+    start = resume_position(last_event_id)
 
-    async def event_generator() -> AsyncGenerator[dict, None]:
+    async def event_generator() -> AsyncGenerator[Frame, None]:
         messages = [
             "Hello! How can I help you today?",
             "I'm here to assist with any questions you might have.",
@@ -125,63 +426,73 @@ async def chat_stream() -> EventSourceResponse:
             "Is there anything specific you'd like to know?",
         ]
 
-        for i, message in enumerate(messages):
+        for i, message in enumerate(messages[start:], start=start):
             # Send typing indicator
-            yield {
-                "event": "typing",
-                "data": json.dumps(
-                    {
-                        "is_typing": True,
-                        "message": "Bot is typing...",
-                        "timestamp": datetime.now().isoformat(),
-                    }
-                ),
-            }
+            yield Frame.json(
+                "typing",
+                {
+                    "is_typing": True,
+                    "message": "Bot is typing...",
+                    "timestamp": clock.timestamp(),
+                },
+            )
 
             # Simulate typing time
-            await asyncio.sleep(2)
+            await clock.sleep(2)
 
             # Send the actual message
-            yield {
-                "event": "message",
-                "data": json.dumps(
-                    {
-                        "id": i + 1,
-                        "text": message,
-                        "sender": "bot",
-                        "timestamp": datetime.now().isoformat(),
-                    }
-                ),
-            }
+            yield Frame.json(
+                "message",
+                {
+                    "id": i + 1,
+                    "text": message,
+                    "sender": "bot",
+                    "timestamp": clock.timestamp(),
+                },
+                id=str(i + 1),
+            )
 
             # Stop typing indicator
-            yield {
-                "event": "typing",
-                "data": json.dumps(
-                    {"is_typing": False, "timestamp": datetime.now().isoformat()}
-                ),
-            }
+            yield Frame.json(
+                "typing", {"is_typing": False, "timestamp": clock.timestamp()}
+            )
 
-            await asyncio.sleep(1)
+            await clock.sleep(1)
 
         # Send completion
-        yield {
-            "event": "complete",
-            "data": json.dumps(
-                {"message": "Chat session completed", "total_messages": len(messages)}
-            ),
-        }
+        yield Frame.json(
+            "complete",
+            {"message": "Chat session completed", "total_messages": len(messages)},
+        )
 
-    return EventSourceResponse(event_generator())
+    return event_stream(event_generator())
 
 
 @app.get("/stream/logs")
-async def log_stream() -> EventSourceResponse:
-    """Log streaming simulation with different log levels"""
-
-    async def event_generator() -> AsyncGenerator[dict, None]:
-        import random
-
+async def log_stream(
+    request: Request,
+    last_event_id: str | None = Header(default=None),
+    batch_ms: int | None = Query(default=None, ge=1, le=5000),
+    batch_max: int = Query(default=500, ge=1, le=10000),
+    min_level: Literal["DEBUG", "INFO", "WARNING", "ERROR", "CRITICAL"]
+    | None = Query(default=None),
+) -> EventSourceResponse:
+    """Log streaming, from SSE_LOG_FILE or simulated, filtered on the server"""
+    # level>=, service= and topic= filters; min_level is the same as level>=
+    log_filter = stream_filter(request)
+    if log_file:
+        # Every line read goes to every matching stream once; a tail has no
+        # history, so Last-Event-ID is ignored and batch_ms only picks the format
+        tail = shared_tail(
+            log_file,
+            sleep=lambda seconds: clock.sleep(seconds),
+            timestamp=lambda: clock.timestamp(),
+        )
+        return event_stream(tail.stream(log_filter, batch=batch_ms is not None))
+
+    start = resume_position(last_event_id)
+
+    async def log_records() -> AsyncGenerator[dict, None]:
         log_levels = ["INFO", "WARNING", "ERROR", "DEBUG"]
         log_messages = [
             "Application started successfully",
@@ -196,44 +507,45 @@ async def log_stream() -> EventSourceResponse:
             "Service health check passed",
         ]
 
-        for i in range(15):
-            await asyncio.sleep(0.8)
+        for i in range(start, 15):
+            await clock.sleep(0.8)
 
-            level = random.choice(log_levels)
-            message = random.choice(log_messages)
+            level = rng.choice(log_levels)
+            message = rng.choice(log_messages)
 
-            data = {
+            record = {
                 "level": level,
                 "message": message,
-                "timestamp": datetime.now().isoformat(),
+                "timestamp": clock.timestamp(),
                 "line_number": i + 1,
                 "service": "api-server",
             }
+            if log_filter.matches(record):
+                yield record
+
+    async def event_generator() -> AsyncGenerator[Frame, None]:
+        async for data in log_records():
+            yield Frame.json("log", data, id=str(data["line_number"]))
 
-            yield {"event": "log", "data": json.dumps(data)}
+    async def batch_generator() -> AsyncGenerator[Frame, None]:
+        # One frame and one socket write per linger window instead of per line
+        async for batch in batched(log_records(), batch_ms / 1000, batch_max):
+            yield Frame.json("log_batch", batch, id=str(batch[-1]["line_number"]))
 
-    return EventSourceResponse(event_generator())
+    if batch_ms is not None:
+        return event_stream(batch_generator())
+    return event_stream(event_generator())
 
 
 @app.get("/stream/datetime")
-async def datetime_stream() -> EventSourceResponse:
+async def datetime_stream(
+    last_event_id: str | None = Header(default=None),
+) -> EventSourceResponse:
     """Infinite datetime stream that sends current datetime every 30 seconds"""
-
-    async def event_generator() -> AsyncGenerator[dict, None]:
-        while True:  # Infinite loop to keep the stream alive
-            # Send current datetime
-            data = {
-                "datetime": datetime.now().isoformat(),
-                "message": "Current server time",
-                "interval": "30 seconds",
-            }
-
-            yield {"event": "datetime", "data": json.dumps(data)}
-
-            # Wait 30 seconds before next update
-            await asyncio.sleep(30)
-
-    return EventSourceResponse(event_generator())
+    # All clients share one producer; late joiners get the latest tick immediately
+    # and reconnecting clients get the ticks they missed
+    resume = resume_position(last_event_id) if last_event_id is not None else None
+    return event_stream(hub.stream("datetime", resume))
 
 
 @app.get("/health")
@@ -241,6 +553,45 @@ async def health_check():
     """Health check endpoint"""
     return {
         "status": "healthy",
-        "timestamp": datetime.now().isoformat(),
+        "timestamp": clock.now().isoformat(),
         "service": "FastAPI SSE Streaming Server",
+        # How often slow subscribers hit each overflow policy
+        "backpressure": dict(overflow_counts),
+        # Stream limits of the worker that answers, and how full it is
+        "admission": admission.snapshot(),
+        "jobs": jobs.stats(),
     }
+
+
+def require_local(request: Request) -> None:
+    """Admin endpoints only answer clients on this machine"""
+    try:
+        local = ipaddress.ip_address(request.client.host).is_loopback
+    except (AttributeError, ValueError):
+        local = False
+    if not local:
+        raise HTTPException(status_code=403, detail="Admin endpoints are local only")
+
+
+@app.get("/admin/profile", response_class=PlainTextResponse)
+async def profile_dump(request: Request, reset: bool = False) -> str:
+    """Stream phase timings as folded stacks for flame graph tools"""
+    require_local(request)
+    folded = profiler.folded()
+    if reset:
+        profiler.reset()
+    return folded
+
+
+@app.post("/admin/profile")
+async def profile_toggle(request: Request, enabled: bool = Query()) -> dict:
+    """Switch stream profiling on or off for new connections"""
+    require_local(request)
+    profiler.enabled = enabled
+    return {"enabled": profiler.enabled}
+
+
+@app.get("/metrics")
+async def metrics():
+    """Prometheus metrics for the worker process that answers"""
+    return Response(registry.render(), media_type=CONTENT_TYPE)
@@ -0,0 +1,91 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one frame per log line vs micro-batched log_batch frames.
+
+A burst of log records is pushed through a real EventSourceResponse with an
+in-memory ASGI send, so the numbers include sse-starlette's per-chunk work as
+well as frame encoding. Batched mode groups lines with streaming.batched the
+same way /stream/logs?batch_ms=...&batch_max=... does.
+"""
+
+import asyncio
+import time
+from datetime import datetime
+
+from sse_starlette.sse import EventSourceResponse
+
+from streaming import Frame, batched
+
+LINES = 100_000
+BATCH_SIZES = [50, 500]
+
+
+async def log_records():
+    for i in range(LINES):
+        yield {
+            "level": "INFO",
+            "message": "Background task completed",
+            "timestamp": datetime.now().isoformat(),
+            "line_number": i + 1,
+            "service": "api-server",
+        }
+
+
+async def unbatched():
+    async for data in log_records():
+        yield Frame.json("log", data, id=str(data["line_number"]))
+
+
+def batched_frames(batch_max: int):
+    async def generator():
+        async for batch in batched(log_records(), 0.05, batch_max):
+            yield Frame.json("log_batch", batch, id=str(batch[-1]["line_number"]))
+
+    return generator()
+
+
+async def measure(frames) -> dict:
+    totals = {"writes": 0, "bytes": 0}
+    disconnected = asyncio.Event()
+
+    async def receive():
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.body":
+            totals["writes"] += 1
+            totals["bytes"] += len(message["body"])
+
+    response = EventSourceResponse(frames, ping=3600)
+    scope = {"type": "http", "method": "GET", "path": "/stream/logs", "headers": []}
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    await response(scope, receive, send)
+    totals["wall"] = time.perf_counter() - start_wall
+    totals["cpu"] = time.process_time() - start_cpu
+    disconnected.set()
+    return totals
+
+
+async def run_all():
+    print(f"{LINES:,} log lines through EventSourceResponse")
+    print(f"{'mode':>14} {'writes':>9} {'bytes':>12} {'lines/s':>12} {'CPU µs/line':>12}")
+    modes = [("unbatched", unbatched)] + [
+        (f"batch_max={size}", lambda size=size: batched_frames(size)) for size in BATCH_SIZES
+    ]
+    # All modes share one loop: sse-starlette binds its exit event to the first
+    for name, factory in modes:
+        totals = await measure(factory())
+        print(
+            f"{name:>14} {totals['writes']:>9,} {totals['bytes']:>12,} "
+            f"{LINES / totals['wall']:>12,.0f} {totals['cpu'] / LINES * 1e6:>12.2f}"
+        )
+
+
+
+def main():
+    asyncio.run(run_all())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-client generators vs the shared broadcast hub.
+
+For a growing number of subscribers this measures the CPU time of one datetime
+tick. The per-client baseline serializes the payload once per connection, the
+way /stream/datetime used to; the hub serializes once and fans out bytes.
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime
+
+from sse_starlette.sse import ServerSentEvent
+
+from streaming import BroadcastHub
+
+TICKS = 20
+SUBSCRIBER_COUNTS = [1, 100, 1_000, 10_000, 20_000]
+
+
+def payload() -> dict:
+    return {
+        "datetime": datetime.now().isoformat(),
+        "message": "Current server time",
+        "interval": "30 seconds",
+    }
+
+
+def per_client_tick(subscribers: int) -> None:
+    for _ in range(subscribers):
+        ServerSentEvent(data=json.dumps(payload()), event="datetime").encode()
+
+
+async def hub_ticks(subscribers: int) -> float:
+    hub = BroadcastHub()
+    channel = hub.register("datetime")
+    subscriptions = [channel.attach() for _ in range(subscribers)]
+
+    start = time.process_time()
+    for _ in range(TICKS):
+        channel.publish("datetime", payload())
+        # Drain like the response writers would
+        for subscription in subscriptions:
+            subscription.get_nowait()
+    elapsed = time.process_time() - start
+
+    for subscription in subscriptions:
+        channel.detach(subscription)
+    return elapsed / TICKS
+
+
+def main():
+    print(f"{'subscribers':>12} {'per-client µs/tick':>20} {'hub µs/tick':>14} {'hub µs/sub':>12}")
+    for subscribers in SUBSCRIBER_COUNTS:
+        start = time.process_time()
+        for _ in range(TICKS):
+            per_client_tick(subscribers)
+        baseline = (time.process_time() - start) / TICKS
+
+        shared = asyncio.run(hub_ticks(subscribers))
+        print(
+            f"{subscribers:>12} {baseline * 1e6:>20.1f} {shared * 1e6:>14.1f} "
+            f"{shared * 1e6 / subscribers:>12.3f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Benchmark: blocking requests-based client vs AsyncSSEClient.
+
+A minimal HTTP/1.1 server in a child process replays a pre-generated event
+stream as fast as the socket allows, so the measured CPU time is the client's
+own. The legacy client reads one stream at a time with iter_lines() and
+line slicing, as example_client.py used to; the async client consumes all
+streams concurrently from one event loop. Results are events per second and
+events per CPU-second (per core).
+"""
+
+import asyncio
+import json
+import multiprocessing
+import socket
+import time
+
+import requests
+
+from streaming import AsyncSSEClient
+
+STREAMS = 50
+EVENTS_PER_STREAM = 2_000
+
+
+def build_body() -> bytes:
+    events = []
+    for i in range(EVENTS_PER_STREAM):
+        data = json.dumps(
+            {
+                "level": "INFO",
+                "message": "Background task completed",
+                "timestamp": "2024-01-15T10:30:00.123456",
+                "line_number": i + 1,
+                "service": "api-server",
+            }
+        )
+        events.append(f"id: {i + 1}\r\nevent: log\r\ndata: {data}\r\n\r\n".encode())
+    # Chunked transfer encoding, 64 events per chunk
+    chunks = []
+    for start in range(0, len(events), 64):
+        chunk = b"".join(events[start : start + 64])
+        chunks.append(b"%x\r\n%s\r\n" % (len(chunk), chunk))
+    return b"".join(chunks) + b"0\r\n\r\n"
+
+
+def serve(port_queue) -> None:
+    body = build_body()
+    head = (
+        b"HTTP/1.1 200 OK\r\ncontent-type: text/event-stream\r\n"
+        b"transfer-encoding: chunked\r\n\r\n"
+    )
+
+    async def handle(reader, writer):
+        try:
+            while True:
+                await reader.readuntil(b"\r\n\r\n")
+                writer.write(head + body)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            writer.close()
+
+    async def main():
+        server = await asyncio.start_server(handle, "127.0.0.1", 0, backlog=1024)
+        port_queue.put(server.sockets[0].getsockname()[1])
+        await server.serve_forever()
+
+    asyncio.run(main())
+
+
+def legacy(url: str) -> int:
+    received = 0
+    for _ in range(STREAMS):
+        response = requests.get(url, stream=True)
+        for line in response.iter_lines():
+            if line:
+                line_str = line.decode("utf-8")
+                if line_str.startswith("data: "):
+                    json.loads(line_str[6:])
+                    received += 1
+    return received
+
+
+async def async_client(base_url: str) -> int:
+    received = 0
+
+    async def consume():
+        nonlocal received
+        async for event in client.events("/stream/logs", reconnect=False):
+            json.loads(event.data)
+            received += 1
+
+    async with AsyncSSEClient(base_url) as client:
+        await asyncio.gather(*(consume() for _ in range(STREAMS)))
+    return received
+
+
+def measure(name: str, func) -> None:
+    start_wall, start_cpu = time.perf_counter(), time.process_time()
+    received = func()
+    wall = time.perf_counter() - start_wall
+    cpu = time.process_time() - start_cpu
+    print(
+        f"{name:>14} {received:>9,} {received / wall:>12,.0f} {received / cpu:>14,.0f}"
+    )
+
+
+def main():
+    context = multiprocessing.get_context("spawn")
+    port_queue = context.Queue()
+    server = context.Process(target=serve, args=(port_queue,), daemon=True)
+    server.start()
+    port = port_queue.get()
+    base_url = f"http://127.0.0.1:{port}"
+    socket.create_connection(("127.0.0.1", port)).close()
+
+    print(f"{STREAMS} streams x {EVENTS_PER_STREAM:,} events")
+    print(f"{'client':>14} {'events':>9} {'events/s':>12} {'events/CPU-s':>14}")
+    measure("requests", lambda: legacy(f"{base_url}/stream/logs"))
+    measure("AsyncSSEClient", lambda: asyncio.run(async_client(base_url)))
+    server.terminate()
+
+
+if __name__ == "__main__":
+    main()
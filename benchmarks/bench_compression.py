@@ -0,0 +1,149 @@
+#!/usr/bin/env python3
+"""
+Benchmark: per-connection stream compression at 1k open connections.
+
+Each of ``CONNECTIONS`` connections gets its own zlib stream, exactly as
+``StreamCompression.wrap`` builds it, and every event is compressed then
+sync-flushed on its own. Reports, per configuration and payload shape:
+
+- the compression ratio (uncompressed / compressed wire bytes)
+- CPU µs per event, and the share of one core the whole fleet costs at
+  ``RATE`` events per second per connection
+- zlib memory per connection, measured with tracemalloc
+
+The last row of each shape compresses the same events in one buffered call
+per connection, an upper bound on what the per-event flush gives up.
+"""
+
+import random
+import time
+import tracemalloc
+import zlib
+from datetime import datetime, timedelta
+
+from streaming import Frame, StreamCompression
+
+CONNECTIONS = 1000
+EVENTS = 50
+RATE = 1.0
+LEVELS = ["INFO", "WARNING", "ERROR", "DEBUG"]
+MESSAGES = [
+    "User login successful",
+    "Database connection established",
+    "Cache miss for key: user_123",
+    "API request processed",
+    "Background task completed",
+]
+CONFIGS = [
+    ("gzip level 1, window 8K", dict(level=1)),
+    ("gzip level 6, window 8K", dict(level=6)),
+    ("gzip level 9, window 8K", dict(level=9)),
+    ("gzip level 6, window 32K", dict(level=6, window_bits=15, mem_level=8)),
+    ("deflate level 6, window 8K", dict(level=6, encodings=("deflate",))),
+]
+
+
+def logs(rng: random.Random, start: datetime) -> list[bytes]:
+    return [
+        Frame.json(
+            "log",
+            {
+                "level": rng.choice(LEVELS),
+                "message": rng.choice(MESSAGES),
+                "timestamp": (start + timedelta(seconds=i)).isoformat(),
+                "line_number": i,
+                "service": "api-server",
+            },
+            id=str(i),
+        )
+        for i in range(EVENTS)
+    ]
+
+
+def datetimes(rng: random.Random, start: datetime) -> list[bytes]:
+    return [
+        Frame.build("datetime", (start + timedelta(seconds=i)).isoformat(), str(i))
+        for i in range(EVENTS)
+    ]
+
+
+def streams(shape) -> list[list[bytes]]:
+    rng = random.Random(1)
+    start = datetime(2024, 1, 1)
+    # Connections joined at different times, so their streams differ
+    return [
+        shape(rng, start + timedelta(seconds=rng.randrange(86400))) for _ in range(CONNECTIONS)
+    ]
+
+
+def per_event(compression: StreamCompression, events: list[list[bytes]]) -> tuple[int, float]:
+    """Compressed bytes and CPU µs per event, sync-flushing after every event"""
+    encoding = compression.encodings[0]
+    compressors = [compression.compressor(encoding) for _ in events]
+    flush = zlib.Z_SYNC_FLUSH
+    out = 0
+    start = time.process_time()
+    # Round-robin like a broadcast: event i goes to every connection in turn
+    for i in range(EVENTS):
+        for compressor, stream in zip(compressors, events):
+            out += len(compressor.compress(stream[i])) + len(compressor.flush(flush))
+    elapsed = time.process_time() - start
+    return out, elapsed / (EVENTS * CONNECTIONS) * 1e6
+
+
+def buffered(compression: StreamCompression, events: list[list[bytes]]) -> int:
+    encoding = compression.encodings[0]
+    out = 0
+    for stream in events:
+        compressor = compression.compressor(encoding)
+        out += len(compressor.compress(b"".join(stream)) + compressor.flush(zlib.Z_SYNC_FLUSH))
+    return out
+
+
+def memory_per_connection(compression: StreamCompression, sample: list[bytes]) -> float:
+    """KiB of zlib state per connection once the window has filled"""
+    encoding = compression.encodings[0]
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    compressors = [compression.compressor(encoding) for _ in range(100)]
+    for compressor in compressors:
+        for event in sample:
+            compressor.compress(event)
+            compressor.flush(zlib.Z_SYNC_FLUSH)
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del compressors
+    return used / 100 / 1024
+
+
+def main():
+    print(
+        f"{CONNECTIONS} connections, {EVENTS} events each, core share at {RATE:g} event/s"
+        " per connection\n"
+    )
+    print(
+        f"{'shape':>9} {'configuration':>27} {'B/event':>8} {'ratio':>6}"
+        f" {'µs/event':>9} {'core':>6} {'KiB/conn':>9}"
+    )
+    for shape in (logs, datetimes):
+        events = streams(shape)
+        raw = sum(len(event) for stream in events for event in stream)
+        print(f"{shape.__name__:>9} {'identity':>27} {raw / CONNECTIONS / EVENTS:>8.1f}")
+        for name, options in CONFIGS:
+            compression = StreamCompression(**options)
+            out, us = per_event(compression, events)
+            kib = memory_per_connection(compression, events[0])
+            core = us * CONNECTIONS * RATE / 1e6
+            print(
+                f"{'':>9} {name:>27} {out / CONNECTIONS / EVENTS:>8.1f} {raw / out:>5.1f}x"
+                f" {us:>9.2f} {core:>6.1%} {kib:>9.1f}"
+            )
+        out = buffered(StreamCompression(), events)
+        print(
+            f"{'':>9} {'gzip level 6, unflushed':>27} {out / CONNECTIONS / EVENTS:>8.1f}"
+            f" {raw / out:>5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+"""
+Benchmark: conflated latest-value delivery vs forwarding every reading.
+
+A producer updates sensor state at UPSTREAM_HZ. In "forward" mode every update
+is serialized and fanned out to all clients through the broadcast hub; in
+"conflated" mode clients sample a LatestValue at CLIENT_HZ. Both run for the
+same wall-clock time and report frames serialized, bytes delivered and CPU.
+"""
+
+import asyncio
+import random
+import time
+from datetime import datetime
+
+from streaming import BroadcastHub, LatestValue
+
+UPSTREAM_HZ = 1000
+CLIENT_HZ = 5
+CLIENTS = 100
+DURATION = 3.0
+UNITS = {"temperature": "°C", "humidity": "%", "pressure": "hPa"}
+
+
+def reading() -> dict:
+    return {
+        "temperature": 20 + random.random() * 10,
+        "humidity": 40 + random.random() * 40,
+        "pressure": 1000 + random.random() * 20,
+        "timestamp": datetime.now(),
+    }
+
+
+def render(state: dict) -> dict:
+    return {
+        "temperature": round(state["temperature"], 2),
+        "humidity": round(state["humidity"], 2),
+        "pressure": round(state["pressure"], 2),
+        "timestamp": state["timestamp"].isoformat(),
+        "unit": UNITS,
+    }
+
+
+async def upstream(update) -> None:
+    # Pace on absolute deadlines so both modes see the same update count
+    interval = 1 / UPSTREAM_HZ
+    loop = asyncio.get_running_loop()
+    deadline = loop.time()
+    while True:
+        update(reading())
+        deadline += interval
+        await asyncio.sleep(max(0.0, deadline - loop.time()))
+
+
+async def drain(stream, totals: dict) -> None:
+    async for frame in stream:
+        totals["frames"] += 1
+        totals["bytes"] += len(frame)
+
+
+async def run(mode: str) -> dict:
+    totals = {"frames": 0, "bytes": 0, "serialized": 0}
+    if mode == "forward":
+        hub = BroadcastHub()
+        hub.register("sensors", queue_size=UPSTREAM_HZ)
+
+        def update(state):
+            totals["serialized"] += 1
+            hub.publish("sensors", "sensor_data", render(state))
+
+        streams = [hub.stream("sensors") for _ in range(CLIENTS)]
+        producer = asyncio.create_task(upstream(update))
+    else:
+
+        def counted_render(state):
+            totals["serialized"] += 1
+            return render(state)
+
+        cell = LatestValue("sensor_data", counted_render)
+        streams = [cell.sample(CLIENT_HZ) for _ in range(CLIENTS)]
+        producer = asyncio.create_task(upstream(cell.update))
+
+    readers = [asyncio.create_task(drain(stream, totals)) for stream in streams]
+    start_cpu = time.process_time()
+    await asyncio.sleep(DURATION)
+    totals["cpu"] = time.process_time() - start_cpu
+    for task in [producer, *readers]:
+        task.cancel()
+    await asyncio.gather(producer, *readers, return_exceptions=True)
+    return totals
+
+
+def main():
+    print(f"{UPSTREAM_HZ} Hz upstream, {CLIENTS} clients at {CLIENT_HZ} Hz, {DURATION}s")
+    print(f"{'mode':>10} {'serialized':>11} {'frames out':>11} {'bytes out':>12} {'CPU s':>7}")
+    results = {}
+    for mode in ("forward", "conflated"):
+        totals = asyncio.run(run(mode))
+        results[mode] = totals
+        print(
+            f"{mode:>10} {totals['serialized']:>11,} {totals['frames']:>11,} "
+            f"{totals['bytes']:>12,} {totals['cpu']:>7.2f}"
+        )
+    forward, conflated = results["forward"], results["conflated"]
+    print(f"bytes saved: {1 - conflated['bytes'] / forward['bytes']:.1%}")
+    print(f"CPU saved:   {1 - conflated['cpu'] / forward['cpu']:.1%}")
+
+
+if __name__ == "__main__":
+    main()
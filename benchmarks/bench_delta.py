@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full sensor_data frames vs ?encoding=delta on /stream/realtime.
+
+Reports wire bytes per event (whole SSE frame, id and event lines included) and
+server CPU per event for both encodings, on the two realtime modes:
+
+- 1 Hz: independent random readings, as the default stream sends them
+- 5 Hz of a 100 Hz random walk, as ``?max_hz=5`` samples the sensor cell
+
+Delta frames are built per connection, while a conflated full frame is shared
+by every reader of the same snapshot; the last column is the delta CPU cost as
+a multiple of the full frame's.
+"""
+
+import json
+import random
+import time
+from datetime import datetime, timedelta
+
+from streaming import DeltaDecoder, DeltaEncoder, Frame
+
+EVENTS = 20_000
+UNITS = {"temperature": "°C", "humidity": "%", "pressure": "hPa"}
+START = datetime(2024, 1, 1)
+
+
+def stamp(seconds: float) -> str:
+    # Millisecond ticks, like Clock.timestamp()
+    return (START + timedelta(milliseconds=round(seconds * 1000))).isoformat()
+
+
+def one_hz(rng: random.Random) -> list[dict]:
+    return [
+        {
+            "temperature": round(rng.uniform(20, 30), 2),
+            "humidity": round(rng.uniform(40, 80), 2),
+            "pressure": round(rng.uniform(1000, 1020), 2),
+            "timestamp": stamp(i),
+            "unit": UNITS,
+        }
+        for i in range(EVENTS)
+    ]
+
+
+def random_walk(rng: random.Random) -> list[dict]:
+    temperature, humidity, pressure = 25.0, 60.0, 1010.0
+    readings = []
+    for i in range(EVENTS * 20):
+        temperature = min(30.0, max(20.0, temperature + rng.uniform(-0.05, 0.05)))
+        humidity = min(80.0, max(40.0, humidity + rng.uniform(-0.1, 0.1)))
+        pressure = min(1020.0, max(1000.0, pressure + rng.uniform(-0.05, 0.05)))
+        # Every 20th update of a 100 Hz sensor is a 5 Hz sample
+        if i % 20 == 0:
+            readings.append(
+                {
+                    "temperature": round(temperature, 2),
+                    "humidity": round(humidity, 2),
+                    "pressure": round(pressure, 2),
+                    "timestamp": stamp(i / 100),
+                    "unit": UNITS,
+                }
+            )
+    return readings
+
+
+def full_frames(readings: list[dict]) -> list[Frame]:
+    return [Frame.json("sensor_data", r, id=str(i)) for i, r in enumerate(readings)]
+
+
+def delta_frames(readings: list[dict]) -> list[Frame]:
+    encoder = DeltaEncoder(tuple(UNITS), precision=2, static=("unit",))
+    frames = []
+    for i, reading in enumerate(readings):
+        kind, payload = encoder.encode(reading)
+        frames.append(Frame.json(f"sensor_{kind}", payload, id=str(i)))
+    return frames
+
+
+def measure(func, readings: list[dict]) -> tuple[list[Frame], float]:
+    """Frames and CPU µs per event, best of 3"""
+    best = float("inf")
+    for _ in range(3):
+        start = time.process_time()
+        frames = func(readings)
+        best = min(best, (time.process_time() - start) / len(readings) * 1e6)
+    return frames, best
+
+
+def main():
+    print(
+        f"{'mode':>14} {'full B/event':>13} {'delta B/event':>14} {'saved':>7}"
+        f" {'full µs':>8} {'delta µs':>9} {'cpu':>6}"
+    )
+    for name, make in (("1 Hz", one_hz), ("5 Hz of 100 Hz", random_walk)):
+        readings = make(random.Random(1))
+        full, full_us = measure(full_frames, readings)
+        delta, delta_us = measure(delta_frames, readings)
+
+        # The round trip must be lossless for the numbers to mean anything
+        decoder = DeltaDecoder()
+        for frame, reading in zip(delta, readings):
+            kind = frame.event.removeprefix("sensor_")
+            assert decoder.decode(kind, json.loads(frame.data)) == reading
+
+        full_bytes = sum(map(len, full)) / len(full)
+        delta_bytes = sum(map(len, delta)) / len(delta)
+        print(
+            f"{name:>14} {full_bytes:>13.1f} {delta_bytes:>14.1f}"
+            f" {1 - delta_bytes / full_bytes:>6.0%} {full_us:>8.2f} {delta_us:>9.2f}"
+            f" {delta_us / full_us:>5.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
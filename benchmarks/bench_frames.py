@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+"""
+Benchmark: dict-yield vs pre-encoded frames on the response path.
+
+A dict yielded to EventSourceResponse is turned into wire bytes for every
+connection it is written to. A Frame is encoded once and reused, so an event
+shared by many subscribers costs a single encode.
+"""
+
+import json
+import time
+from datetime import datetime
+
+from sse_starlette.sse import ensure_bytes
+
+from streaming import Frame
+
+EVENTS = 200
+SUBSCRIBER_COUNTS = [1, 100, 10_000]
+SEP = "\r\n"
+
+
+def payload(i: int) -> dict:
+    return {
+        "level": "INFO",
+        "message": "Background task completed",
+        "timestamp": datetime.now().isoformat(),
+        "line_number": i,
+        "service": "api-server",
+    }
+
+
+def dict_yield(subscribers: int, events: int) -> None:
+    for i in range(events):
+        data = json.dumps(payload(i))
+        for _ in range(subscribers):
+            # ensure_bytes mutates the dict, so each connection needs its own
+            ensure_bytes({"event": "log", "data": data}, SEP)
+
+
+def pre_encoded(subscribers: int, events: int) -> None:
+    for i in range(events):
+        frame = Frame.json("log", payload(i))
+        for _ in range(subscribers):
+            ensure_bytes(frame, SEP)
+
+
+def measure(func, subscribers: int) -> float:
+    events = max(1, EVENTS // max(1, subscribers // 100))
+    start = time.process_time()
+    func(subscribers, events)
+    return (time.process_time() - start) / events
+
+
+def main():
+    print(f"{'subscribers':>12} {'dict µs/event':>16} {'frame µs/event':>16} {'speedup':>9}")
+    for subscribers in SUBSCRIBER_COUNTS:
+        baseline = measure(dict_yield, subscribers)
+        frames = measure(pre_encoded, subscribers)
+        print(
+            f"{subscribers:>12} {baseline * 1e6:>16.1f} {frames * 1e6:>16.1f} "
+            f"{baseline / frames:>8.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
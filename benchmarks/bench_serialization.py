@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+"""
+Benchmark: payload serialization per event for the app's stream shapes.
+
+Compares the old per-event path (``datetime.now().isoformat()`` for every
+timestamp, then ``json.dumps``) with ``Frame.json`` on the stdlib and orjson
+serializers, both stamping events from the clock's cached per-tick timestamp.
+Chat sends three frames per message, each with its own timestamp.
+"""
+
+import json
+import time
+from datetime import datetime
+
+from streaming import Clock, Frame, JsonSerializer, OrjsonSerializer, use_serializer
+from streaming.serialization import orjson
+
+EVENTS = 20_000
+REPEATS = 5
+UNITS = {"temperature": "°C", "humidity": "%", "pressure": "hPa"}
+
+
+def progress(i: int, stamp) -> list[tuple[str, dict]]:
+    return [
+        (
+            "progress",
+            {
+                "percentage": 55.0,
+                "current_step": 11,
+                "total_steps": 20,
+                "status": "almost_done",
+                "message": "Processing step 11/20",
+                "timestamp": stamp(),
+            },
+        )
+    ]
+
+
+def sensor_data(i: int, stamp) -> list[tuple[str, dict]]:
+    return [
+        (
+            "sensor_data",
+            {
+                "temperature": 24.31,
+                "humidity": 61.07,
+                "pressure": 1009.88,
+                "timestamp": stamp(),
+                "unit": UNITS,
+            },
+        )
+    ]
+
+
+def log(i: int, stamp) -> list[tuple[str, dict]]:
+    return [
+        (
+            "log",
+            {
+                "level": "INFO",
+                "message": "Background task completed",
+                "timestamp": stamp(),
+                "line_number": i,
+                "service": "api-server",
+            },
+        )
+    ]
+
+
+def chat(i: int, stamp) -> list[tuple[str, dict]]:
+    return [
+        ("typing", {"is_typing": True, "message": "Bot is typing...", "timestamp": stamp()}),
+        (
+            "message",
+            {
+                "id": i,
+                "text": "I'm here to assist with any questions you might have.",
+                "sender": "bot",
+                "timestamp": stamp(),
+            },
+        ),
+        ("typing", {"is_typing": False, "timestamp": stamp()}),
+    ]
+
+
+SHAPES = [progress, sensor_data, log, chat]
+
+
+def per_event_now() -> str:
+    return datetime.now().isoformat()
+
+
+def baseline(shape, events: int) -> int:
+    frames = 0
+    for i in range(events):
+        for event, payload in shape(i, per_event_now):
+            Frame.build(event, json.dumps(payload), str(i))
+            frames += 1
+    return frames
+
+
+def frame_json(shape, events: int) -> int:
+    stamp = Clock().timestamp
+    frames = 0
+    for i in range(events):
+        for event, payload in shape(i, stamp):
+            Frame.json(event, payload, str(i))
+            frames += 1
+    return frames
+
+
+def measure(func, shape) -> float:
+    """CPU µs per frame, best of REPEATS runs"""
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.process_time()
+        frames = func(shape, EVENTS)
+        best = min(best, (time.process_time() - start) / frames * 1e6)
+    return best
+
+
+def main():
+    columns = [("now+dumps", None), ("stdlib+cache", JsonSerializer())]
+    if orjson is not None:
+        columns.append(("orjson+cache", OrjsonSerializer()))
+    else:
+        print("orjson is not installed; skipping the orjson column\n")
+
+    header = "".join(f"{name:>14}" for name, _ in columns)
+    print(f"{'shape':>12}{header} {'speedup':>8}   (CPU µs per frame)")
+    for shape in SHAPES:
+        results = []
+        for _, serializer in columns:
+            if serializer is None:
+                results.append(measure(baseline, shape))
+                continue
+            previous = use_serializer(serializer)
+            try:
+                results.append(measure(frame_json, shape))
+            finally:
+                use_serializer(previous)
+        cells = "".join(f"{us:>14.2f}" for us in results)
+        print(f"{shape.__name__:>12}{cells} {results[0] / results[-1]:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,183 @@
+#!/usr/bin/env python3
+"""
+Benchmark: one shared LogTail under 100k appended lines/s and 1k subscribers.
+
+A writer process appends ``RATE`` log lines per second to a temporary file,
+in 10 ms bursts, for ``SECONDS``. The server side is a single event loop with
+one ``LogTail`` on that file and ``SUBSCRIBERS`` streams spread over four
+(minimum level, format) groups. Each stream drains its frames the way a
+response would, without a socket. Reports:
+
+- lines read per second and how far the tail fell behind the writer
+- CPU share of one core used by the server side, and worst event loop lag
+- frames and lines delivered per group, and whether every subscriber got
+  every line it asked for
+
+The last line estimates the same load if every subscriber parsed and
+serialized each line itself, from timing that work on a sample.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import random
+import tempfile
+import time
+
+from streaming import LogTail
+from streaming.tail import LEVELS
+
+RATE = 100_000
+SECONDS = 5
+SUBSCRIBERS = 1000
+BURST = 0.01
+GROUPS = [(None, False), ("WARNING", False), ("ERROR", False), ("INFO", True)]
+WRITER_LEVELS = ["DEBUG", "INFO", "INFO", "INFO", "WARNING", "ERROR"]
+MESSAGES = [
+    "GET /api/users/42 200 3.1ms",
+    "Cache miss - fetching from database",
+    "Background task completed",
+    "Network request timeout after 30s",
+    "Database connection pool exhausted, waiting",
+]
+
+
+def line(rng: random.Random, number: int) -> str:
+    stamp = f"2024-01-01T00:00:00.{number % 1000:03d}"
+    level = rng.choice(WRITER_LEVELS)
+    return f"{stamp} {level:<7} app[{number}] {rng.choice(MESSAGES)}\n"
+
+
+def write(path: str, started) -> None:
+    """Append RATE lines per second in bursts; runs in its own process"""
+    rng = random.Random(1)
+    # Pre-rendered, so the writer's own cost does not cap the rate
+    burst = int(RATE * BURST)
+    bursts = ["".join(line(rng, i * burst + j) for j in range(burst)) for i in range(100)]
+    started.wait()
+    with open(path, "a", buffering=1 << 20) as log:
+        begin = time.monotonic()
+        for i in range(int(SECONDS / BURST)):
+            log.write(bursts[i % len(bursts)])
+            log.flush()
+            delay = begin + (i + 1) * BURST - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+
+
+async def drain(tail: LogTail, min_level, batch: bool, counts: list) -> None:
+    # [frames, bytes, lines]; lines are only counted for the first of a group
+    async for frame in tail.stream(min_level, batch=batch):
+        counts[0] += 1
+        counts[1] += len(frame)
+        if counts[2] is not None:
+            counts[2] += frame.count(b'"line_number"')
+
+
+async def probe(stop: asyncio.Event) -> float:
+    loop = asyncio.get_running_loop()
+    worst = 0.0
+    while not stop.is_set():
+        started = loop.time()
+        await asyncio.sleep(0.01)
+        worst = max(worst, loop.time() - started - 0.01)
+    return worst
+
+
+async def serve(path: str) -> None:
+    tail = LogTail(path, poll_interval=0.1)
+    counts = [[0, 0, 0 if i < len(GROUPS) else None] for i in range(SUBSCRIBERS)]
+    tasks = [
+        asyncio.create_task(drain(tail, *GROUPS[i % len(GROUPS)], counts[i]))
+        for i in range(SUBSCRIBERS)
+    ]
+    await asyncio.sleep(0.2)
+
+    started = multiprocessing.get_context("spawn").Event()
+    writer = multiprocessing.get_context("spawn").Process(
+        target=write, args=(path, started)
+    )
+    writer.start()
+    await asyncio.to_thread(time.sleep, 1)
+    # Probed from here on: starting a spawned process blocks the loop itself
+    stop = asyncio.Event()
+    lag = asyncio.create_task(probe(stop))
+    wall, cpu = time.perf_counter(), time.process_time()
+    started.set()
+    await asyncio.to_thread(writer.join)
+    # Let the tail catch up with the last bursts
+    written = os.path.getsize(path)
+    while tail._position < written:
+        await asyncio.sleep(0.05)
+    await asyncio.sleep(0.2)
+    wall, cpu = time.perf_counter() - wall, time.process_time() - cpu
+    stop.set()
+    worst = await lag
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    with open(path, "rb") as log:
+        levels = [LEVELS[raw.split()[1].decode()] for raw in log]
+    print(
+        f"{tail.line_number:,} lines in {wall:.2f} s: {tail.line_number / wall:,.0f} lines/s read,"
+        f" writer target {RATE:,}/s"
+    )
+    print(f"server CPU {cpu / wall:.0%} of one core, worst loop lag {worst * 1000:.0f} ms\n")
+    print(
+        f"{'group':>16} {'subscribers':>11} {'frames/sub':>10} {'lines/sub':>10}"
+        f" {'MB/sub':>7} {'complete':>8}"
+    )
+    for index, (min_level, batch) in enumerate(GROUPS):
+        members = counts[index :: len(GROUPS)]
+        frames, size, delivered = members[0]
+        threshold = LEVELS[min_level] if min_level else 0
+        expected = sum(level >= threshold for level in levels)
+        # Every member got the same frames as the first, which got every line
+        complete = delivered == expected and all(
+            member[:2] == [frames, size] for member in members
+        )
+        name = f"{min_level or 'all'}/{'batch' if batch else 'log'}"
+        print(
+            f"{name:>16} {len(members):>11,} {frames:>10,} {delivered:>10,}"
+            f" {size / 1e6:>7.1f} {str(complete):>8}"
+        )
+
+
+def per_subscriber_estimate(path: str) -> None:
+    # The work the shared tail does once per line: decode, find the level,
+    # serialize the payload, encode the event
+    tail = LogTail(path)
+    tail.groups[(0, False)] = {_Sink()}
+    with open(path, "rb") as log:
+        sample = log.read(4 << 20)
+    sample = sample[: sample.rfind(b"\n") + 1]
+    lines = sample.count(b"\n")
+    began = time.process_time()
+    tail.feed(sample)
+    per_line = (time.process_time() - began) / lines
+    print(
+        f"\nparse per subscriber instead: {per_line * 1e6:.2f} µs/line x {SUBSCRIBERS:,}"
+        f" subscribers x {RATE:,} lines/s = {per_line * SUBSCRIBERS * RATE:,.0f} cores"
+    )
+
+
+class _Sink:
+    def put(self, frame) -> None:
+        pass
+
+
+def main():
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "app.log")
+        open(path, "w").close()
+        print(
+            f"{RATE:,} lines/s appended for {SECONDS} s, {SUBSCRIBERS:,} subscribers"
+            f" over {len(GROUPS)} level/format groups\n"
+        )
+        asyncio.run(serve(path))
+        per_subscriber_estimate(path)
+
+
+if __name__ == "__main__":
+    main()
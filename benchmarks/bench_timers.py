@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Benchmark: event loop cost of idle connections, asyncio.sleep vs TimerWheel.
+
+Each simulated connection is two tasks, like an sse-starlette response: a
+stream loop waking every ``CADENCE`` seconds and a keep-alive loop waking
+every ``PING`` seconds. Both start at a random phase. The loop runs on a
+``VirtualClock``, so ``SECONDS`` of stream time pass without waiting and the
+CPU time measured is only the cost of the timers and of waking the tasks.
+
+For each connection count and each timer, the benchmark reports:
+
+- loop timers: entries on the event loop's timer heap with every task asleep
+- setup: wall ms to start every connection and put it to sleep
+- KiB/conn: memory per connection, tasks included, from tracemalloc
+- CPU ms/s: CPU per second of stream time spent waking the sleepers
+"""
+
+import asyncio
+import random
+import time
+import tracemalloc
+
+from streaming import TimerWheel, VirtualClock
+
+COUNTS = [10_000, 50_000, 100_000]
+CADENCE = 30.0  # /stream/datetime
+PING = 15.0
+SECONDS = 60
+
+
+async def connection(sleep, interval: float, phase: float) -> None:
+    await sleep(phase)
+    while True:
+        await sleep(interval)
+
+
+def start(count: int, sleep) -> list[asyncio.Task]:
+    rng = random.Random(1)
+    tasks = []
+    for _ in range(count):
+        tasks.append(asyncio.create_task(connection(sleep, CADENCE, rng.uniform(1, CADENCE))))
+        tasks.append(asyncio.create_task(connection(sleep, PING, rng.uniform(1, PING))))
+    return tasks
+
+
+async def stop(tasks: list[asyncio.Task]) -> None:
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def footprint(count: int, sleep) -> tuple[int, float, float]:
+    """Loop timers, setup ms and KiB per connection"""
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    began = time.perf_counter()
+    tasks = start(count, sleep)
+    # Let every task run up to its first sleep
+    await asyncio.sleep(0)
+    await asyncio.sleep(0)
+    setup = (time.perf_counter() - began) * 1000
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    # The heap also holds cancelled handles until they reach its top
+    timers = sum(not handle.cancelled() for handle in asyncio.get_running_loop()._scheduled)
+    await stop(tasks)
+    return timers, setup, used / count / 1024
+
+
+async def running(count: int, sleep) -> float:
+    """CPU ms per second of stream time"""
+    tasks = start(count, sleep)
+    await asyncio.sleep(0)
+    began = time.process_time()
+    await asyncio.sleep(SECONDS)
+    cpu = time.process_time() - began
+    await stop(tasks)
+    return cpu / SECONDS * 1000
+
+
+def main():
+    print(
+        f"idle connections: a {CADENCE:g} s stream tick and a {PING:g} s ping each,"
+        f" {SECONDS} s of virtual time\n"
+    )
+    print(
+        f"{'connections':>11} {'timer':>13} {'loop timers':>12} {'setup ms':>9}"
+        f" {'KiB/conn':>9} {'CPU ms/s':>9}"
+    )
+    for count in COUNTS:
+        for name in ("asyncio.sleep", "TimerWheel"):
+            clock = VirtualClock()
+
+            async def measure():
+                sleep = asyncio.sleep if name == "asyncio.sleep" else TimerWheel().sleep
+                timers, setup, kib = await footprint(count, sleep)
+                return timers, setup, kib, await running(count, sleep)
+
+            timers, setup, kib, cpu = clock.run(measure())
+            print(
+                f"{count:>11,} {name:>13} {timers:>12,} {setup:>9.0f}"
+                f" {kib:>9.2f} {cpu:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Benchmark: cross-worker fan-out over the Unix-socket transport.
+
+The main process is the broker and runs the producer. WORKERS child processes
+each join as a follower with one local subscriber, the way uvicorn workers
+would. Every event carries its publish time so followers can measure delivery
+latency; throughput is events delivered per second across all workers.
+"""
+
+import asyncio
+import json
+import multiprocessing
+import os
+import statistics
+import tempfile
+import time
+
+from streaming import BroadcastHub, UnixSocketTransport
+
+WORKERS = 4
+EVENTS = 20_000
+BATCH = 100
+
+
+def percentile(values: list[float], pct: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+async def follower(path: str, ready, results) -> None:
+    hub = BroadcastHub(UnixSocketTransport(path))
+    await hub.start()
+    stream = hub.stream("bench")
+    first = asyncio.ensure_future(stream.__anext__())
+    await asyncio.sleep(0.1)
+    ready.put(os.getpid())
+
+    latencies = []
+    frame = await first
+    while True:
+        payload = json.loads(frame.data)
+        if payload.get("done"):
+            break
+        latencies.append((time.time_ns() - payload["sent_ns"]) / 1e6)
+        frame = await stream.__anext__()
+    await stream.aclose()
+    await hub.close()
+    results.put(latencies)
+
+
+def run_follower(path: str, ready, results) -> None:
+    asyncio.run(follower(path, ready, results))
+
+
+async def leader(path: str, ready, results) -> None:
+    hub = BroadcastHub(UnixSocketTransport(path))
+    await hub.start()
+    assert hub.transport.leader
+
+    context = multiprocessing.get_context("spawn")
+    processes = [
+        context.Process(target=run_follower, args=(path, ready, results))
+        for _ in range(WORKERS)
+    ]
+    for process in processes:
+        process.start()
+    for _ in processes:
+        await asyncio.to_thread(ready.get)
+
+    start = time.perf_counter()
+    for i in range(EVENTS):
+        hub.publish("bench", "tick", {"seq": i, "sent_ns": time.time_ns()})
+        if i % BATCH == 0:
+            # Let the transport drain, as a real producer would between ticks
+            await asyncio.sleep(0)
+    hub.publish("bench", "tick", {"done": True})
+
+    latencies = []
+    for _ in processes:
+        latencies.extend(await asyncio.to_thread(results.get))
+    elapsed = time.perf_counter() - start
+    for process in processes:
+        process.join()
+    await hub.close()
+
+    delivered = len(latencies)
+    print(f"workers:            {WORKERS}")
+    print(f"events published:   {EVENTS}")
+    print(f"events delivered:   {delivered}")
+    print(f"throughput:         {delivered / elapsed:,.0f} deliveries/s")
+    print(f"latency p50:        {statistics.median(latencies):.2f} ms")
+    print(f"latency p95:        {percentile(latencies, 95):.2f} ms")
+    print(f"latency p99:        {percentile(latencies, 99):.2f} ms")
+
+
+def main():
+    context = multiprocessing.get_context("spawn")
+    ready, results = context.Queue(), context.Queue()
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(leader(os.path.join(directory, "bench.sock"), ready, results))
+
+
+if __name__ == "__main__":
+    main()
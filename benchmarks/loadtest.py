@@ -0,0 +1,488 @@
+#!/usr/bin/env python3
+"""
+Load test: many concurrent EventSource-style clients against one endpoint.
+
+Opens N SSE connections to a ``/stream/*`` endpoint on a local server, ramping
+them up instantly, linearly or in steps. Clients behave like a browser
+``EventSource``: a stream that ends or drops is reopened after the server's
+retry delay with ``Last-Event-ID``. Each event's delivery latency is measured
+from the ``timestamp`` (or ``datetime``) field the server embeds, so client and
+server must share a clock, and the target must be on localhost.
+
+Results are printed and written as JSON for comparing releases:
+
+    python -m benchmarks.loadtest /stream/realtime --clients 2000 --ramp 10
+    python -m benchmarks.loadtest "/stream/logs?batch_ms=50" --spawn --workers 4
+
+``--spawn`` starts its own uvicorn server on a free port, which also lets the
+harness sample the server's RSS; for a server that is already running, pass
+``--server-pid``. RSS is read from /proc, so it is only reported on Linux.
+Clients can be spread over several processes with ``--processes`` when one
+event loop cannot keep up with the event rate.
+"""
+
+import argparse
+import asyncio
+import ipaddress
+import json
+import math
+import multiprocessing
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter
+from datetime import datetime
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import httpx
+
+from streaming import DeltaDecoder, SSEParser
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+DEFAULT_RETRY_MS = 3000
+# Events of /stream/realtime?encoding=delta and the DeltaDecoder kind of each
+DELTA_EVENTS = {"sensor_schema": "schema", "sensor_delta": "delta"}
+
+
+def percentile(values: list[float], pct: float) -> float | None:
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def start_offsets(clients: int, profile: str, ramp: float, steps: int) -> list[float]:
+    """Seconds after the start at which each client connects"""
+    if profile == "instant" or ramp <= 0:
+        return [0.0] * clients
+    if profile == "linear":
+        return [ramp * i / clients for i in range(clients)]
+    # step: equal batches, the first at once and the last at the end of the ramp
+    per_step = math.ceil(clients / steps)
+    interval = ramp / max(1, steps - 1)
+    return [interval * (i // per_step) for i in range(clients)]
+
+
+class Stats:
+    """Counters for the connections of one worker process"""
+
+    def __init__(self, started: float) -> None:
+        self.started = started
+        self.events = 0
+        self.latencies: list[float] = []
+        # Events received in each second of the run
+        self.timeline: list[int] = []
+        self.opened = 0
+        self.open = 0
+        self.peak_open = 0
+        self.ended = 0
+        self.dropped = 0
+        self.connect_errors = 0
+        self.http_errors: Counter = Counter()
+
+    def record(self, data: str, received: datetime, second: int) -> None:
+        try:
+            payload = json.loads(data)
+        except ValueError:
+            payload = None
+        self.record_payload(payload, received, second)
+
+    def record_payload(self, payload, received: datetime, second: int) -> None:
+        self.events += 1
+        if second >= len(self.timeline):
+            self.timeline.extend([0] * (second + 1 - len(self.timeline)))
+        self.timeline[second] += 1
+        # Batched endpoints carry one record, and one timestamp, per entry
+        for record in payload if isinstance(payload, list) else [payload]:
+            if not isinstance(record, dict):
+                continue
+            stamp = record.get("timestamp") or record.get("datetime")
+            if isinstance(stamp, str):
+                try:
+                    sent = datetime.fromisoformat(stamp)
+                except ValueError:
+                    continue
+                self.latencies.append((received - sent).total_seconds() * 1000)
+
+    def result(self) -> dict:
+        return {
+            "events": self.events,
+            "latencies": self.latencies,
+            "timeline": self.timeline,
+            "opened": self.opened,
+            "peak_open": self.peak_open,
+            "ended": self.ended,
+            "dropped": self.dropped,
+            "connect_errors": self.connect_errors,
+            "http_errors": dict(self.http_errors),
+        }
+
+
+async def connection(
+    http: httpx.AsyncClient, path: str, stats: Stats, reconnect: bool
+) -> None:
+    """One EventSource-like client"""
+    last_event_id = None
+    retry_ms = DEFAULT_RETRY_MS
+    while True:
+        headers = {"Accept": "text/event-stream", "Cache-Control": "no-store"}
+        if last_event_id is not None:
+            headers["Last-Event-ID"] = last_event_id
+        parser = SSEParser()
+        decoder = DeltaDecoder()
+        try:
+            async with http.stream("GET", path, headers=headers) as response:
+                if response.status_code == 204:
+                    return
+                if response.status_code != 200:
+                    stats.http_errors[str(response.status_code)] += 1
+                    retry_after = response.headers.get("retry-after", "")
+                    if retry_after.isdigit():
+                        retry_ms = int(retry_after) * 1000
+                else:
+                    stats.opened += 1
+                    stats.open += 1
+                    stats.peak_open = max(stats.peak_open, stats.open)
+                    try:
+                        async for chunk in response.aiter_raw():
+                            received = datetime.now()
+                            second = int(time.time() - stats.started)
+                            for event in parser.feed(chunk):
+                                if event.event in DELTA_EVENTS:
+                                    # Rebuild ?encoding=delta readings so their
+                                    # timestamps are measured too
+                                    reading = decoder.decode(
+                                        DELTA_EVENTS[event.event], json.loads(event.data)
+                                    )
+                                    stats.record_payload(reading, received, second)
+                                else:
+                                    stats.record(event.data, received, second)
+                    finally:
+                        stats.open -= 1
+                    stats.ended += 1
+        except (httpx.ConnectError, httpx.ConnectTimeout, httpx.PoolTimeout):
+            stats.connect_errors += 1
+        except (httpx.TransportError, httpx.StreamError):
+            stats.dropped += 1
+        if parser.last_event_id is not None:
+            last_event_id = parser.last_event_id
+        if parser.retry is not None:
+            retry_ms = parser.retry
+        if not reconnect:
+            return
+        await asyncio.sleep(retry_ms / 1000)
+
+
+async def run_clients(config: dict, offsets: list[float], started: float) -> dict:
+    stats = Stats(started)
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=0)
+    async with httpx.AsyncClient(
+        base_url=config["url"],
+        limits=limits,
+        timeout=httpx.Timeout(None, connect=config["connect_timeout"]),
+    ) as http:
+
+        async def client(offset: float) -> None:
+            await asyncio.sleep(max(0.0, started + offset - time.time()))
+            await connection(http, config["path"], stats, config["reconnect"])
+
+        tasks = [asyncio.create_task(client(offset)) for offset in offsets]
+        await asyncio.sleep(max(0.0, started + config["duration"] - time.time()))
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return stats.result()
+
+
+def run_worker(config: dict, offsets: list[float], started: float) -> dict:
+    raise_fd_limit()
+    return asyncio.run(run_clients(config, offsets, started))
+
+
+def raise_fd_limit() -> None:
+    """Every connection is a file descriptor; use the hard limit"""
+    if resource is None:
+        return
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    if hard == resource.RLIM_INFINITY or soft < hard:
+        try:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+        except (ValueError, OSError):
+            pass
+
+
+def process_tree(pid: int) -> list[int]:
+    """pid and all of its descendants, from /proc"""
+    children: dict[int, list[int]] = {}
+    for entry in Path("/proc").iterdir():
+        if not entry.name.isdigit():
+            continue
+        try:
+            stat = (entry / "stat").read_text()
+        except OSError:
+            continue
+        # The command name may contain spaces; fields resume after ")"
+        parent = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(parent, []).append(int(entry.name))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+
+def rss_mb(pid: int) -> float | None:
+    """Resident memory of a process and its workers, in MiB"""
+    total = 0
+    try:
+        for member in process_tree(pid):
+            for line in Path(f"/proc/{member}/status").read_text().splitlines():
+                if line.startswith("VmRSS:"):
+                    total += int(line.split()[1])
+    except (OSError, ValueError):
+        return None
+    return total / 1024
+
+
+class RSSSampler(threading.Thread):
+    """Samples the server's RSS once per interval in the background"""
+
+    def __init__(self, pid: int, interval: float = 1.0) -> None:
+        super().__init__(daemon=True)
+        self.pid = pid
+        self.interval = interval
+        self.samples: list[float] = []
+        self._stop_event = threading.Event()
+
+    def run(self) -> None:
+        while not self._stop_event.is_set():
+            value = rss_mb(self.pid)
+            if value is not None:
+                self.samples.append(round(value, 1))
+            self._stop_event.wait(self.interval)
+
+    def stop(self) -> list[float]:
+        self._stop_event.set()
+        self.join()
+        return self.samples
+
+
+def check_localhost(url: str) -> str:
+    host = urlsplit(url).hostname or ""
+    if host != "localhost":
+        try:
+            if not ipaddress.ip_address(host).is_loopback:
+                raise ValueError
+        except ValueError:
+            raise argparse.ArgumentTypeError(
+                f"{url} is not a localhost URL; load tests only run locally"
+            ) from None
+    return url.rstrip("/")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def spawn_server(workers: int, broker_dir: str) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    env = dict(os.environ, SSE_BROKER_PATH=os.path.join(broker_dir, "sse.sock"))
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "uvicorn",
+            "app:app",
+            "--host",
+            "127.0.0.1",
+            "--port",
+            str(port),
+            "--workers",
+            str(workers),
+            "--log-level",
+            "warning",
+        ],
+        env=env,
+        cwd=Path(__file__).resolve().parent.parent,
+    )
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"{url}/health").status_code == 200:
+                return server, url
+        except httpx.TransportError:
+            time.sleep(0.2)
+    server.terminate()
+    raise RuntimeError("server did not become healthy within 30 seconds")
+
+
+def parse_args(argv: list[str] | None = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(
+        description="Open many concurrent SSE connections to a local server"
+    )
+    parser.add_argument("path", help="endpoint to load, e.g. /stream/realtime")
+    parser.add_argument("--url", type=check_localhost, default="http://127.0.0.1:8000")
+    parser.add_argument("--clients", type=int, default=1000)
+    parser.add_argument(
+        "--profile", choices=("instant", "linear", "step"), default="linear"
+    )
+    parser.add_argument("--ramp", type=float, default=10.0, help="ramp-up seconds")
+    parser.add_argument("--steps", type=int, default=5, help="batches for --profile step")
+    parser.add_argument("--duration", type=float, default=30.0, help="total seconds")
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--connect-timeout", type=float, default=10.0)
+    parser.add_argument(
+        "--no-reconnect",
+        dest="reconnect",
+        action="store_false",
+        help="let clients finish when their stream ends",
+    )
+    parser.add_argument("--spawn", action="store_true", help="start a server to test")
+    parser.add_argument("--workers", type=int, default=1, help="workers for --spawn")
+    parser.add_argument("--server-pid", type=int, help="pid whose RSS to sample")
+    parser.add_argument("--output", default="loadtest.json")
+    args = parser.parse_args(argv)
+    if not args.path.startswith("/"):
+        parser.error("path must start with /")
+    return args
+
+
+def summarize(args: argparse.Namespace, url: str, results: list[dict], rss) -> dict:
+    latencies = sorted(lat for result in results for lat in result["latencies"])
+    events = sum(result["events"] for result in results)
+    timeline = [0] * max((len(result["timeline"]) for result in results), default=0)
+    for result in results:
+        for second, count in enumerate(result["timeline"]):
+            timeline[second] += count
+    # Steady state: whole seconds after every client has connected
+    settled = timeline[math.ceil(args.ramp) : int(args.duration)]
+    http_errors: Counter = Counter()
+    for result in results:
+        http_errors.update(result["http_errors"])
+
+    def rounded(value: float | None) -> float | None:
+        return None if value is None else round(value, 2)
+
+    return {
+        "endpoint": args.path,
+        "url": url,
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "clients": args.clients,
+            "profile": args.profile,
+            "ramp_s": args.ramp,
+            "steps": args.steps,
+            "duration_s": args.duration,
+            "processes": args.processes,
+            "reconnect": args.reconnect,
+            "server_workers": args.workers if args.spawn else None,
+        },
+        "connections": {
+            "opened": sum(result["opened"] for result in results),
+            "peak_open": sum(result["peak_open"] for result in results),
+            "ended_by_server": sum(result["ended"] for result in results),
+        },
+        "errors": {
+            "connect": sum(result["connect_errors"] for result in results),
+            "dropped": sum(result["dropped"] for result in results),
+            "http": dict(http_errors),
+        },
+        "events": {
+            "total": events,
+            "per_second": round(events / args.duration, 1),
+            "per_second_after_ramp": (
+                round(sum(settled) / len(settled), 1) if settled else None
+            ),
+            "timeline": timeline,
+        },
+        "latency_ms": {
+            "samples": len(latencies),
+            "p50": rounded(percentile(latencies, 50)),
+            "p95": rounded(percentile(latencies, 95)),
+            "p99": rounded(percentile(latencies, 99)),
+            "max": rounded(latencies[-1] if latencies else None),
+        },
+        "server_rss_mb": (
+            {
+                "start": rss[0],
+                "peak": max(rss),
+                "end": rss[-1],
+                "samples": rss,
+            }
+            if rss
+            else None
+        ),
+    }
+
+
+def main(argv: list[str] | None = None) -> None:
+    args = parse_args(argv)
+    raise_fd_limit()
+
+    with tempfile.TemporaryDirectory() as broker_dir:
+        server = None
+        url, pid = args.url, args.server_pid
+        if args.spawn:
+            server, url = spawn_server(args.workers, broker_dir)
+            pid = server.pid
+        sampler = RSSSampler(pid) if pid and sys.platform == "linux" else None
+        if sampler:
+            sampler.start()
+
+        config = {
+            "url": url,
+            "path": args.path,
+            "duration": args.duration,
+            "connect_timeout": args.connect_timeout,
+            "reconnect": args.reconnect,
+        }
+        offsets = start_offsets(args.clients, args.profile, args.ramp, args.steps)
+        # Clients are dealt round-robin so every process ramps at the same pace
+        shares = [offsets[i :: args.processes] for i in range(args.processes)]
+        print(f"{args.clients} clients -> {url}{args.path} for {args.duration:g}s")
+        try:
+            if args.processes == 1:
+                results = [run_worker(config, shares[0], time.time() + 0.5)]
+            else:
+                # Leave time for the spawned interpreters to import everything
+                started = time.time() + 2.0
+                context = multiprocessing.get_context("spawn")
+                with context.Pool(args.processes) as pool:
+                    results = pool.starmap(
+                        run_worker, [(config, share, started) for share in shares]
+                    )
+        finally:
+            rss = sampler.stop() if sampler else []
+            if server:
+                server.terminate()
+                server.wait()
+
+    report = summarize(args, url, results, rss)
+    Path(args.output).write_text(json.dumps(report, indent=2) + "\n")
+
+    latency = report["latency_ms"]
+    print(f"connections opened: {report['connections']['opened']}")
+    print(f"peak open:          {report['connections']['peak_open']}")
+    print(f"errors:             {report['errors']}")
+    print(f"events:             {report['events']['total']:,}")
+    print(f"events/s:           {report['events']['per_second']:,}")
+    print(f"latency p50/p95/p99 {latency['p50']} / {latency['p95']} / {latency['p99']} ms")
+    if report["server_rss_mb"]:
+        print(f"server RSS peak:    {report['server_rss_mb']['peak']} MiB")
+    print(f"results written to  {args.output}")
+
+
+if __name__ == "__main__":
+    main()
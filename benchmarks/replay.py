@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Replay hours of stream activity in seconds, optionally under cProfile.
+
+Runs app.py in process on a VirtualClock with in-process clients connected to
+one endpoint. Clients reopen a stream when it ends, as an EventSource would, so
+finite streams keep producing for the whole virtual duration. Only the
+server's CPU work and the clients' parsing take real time, which makes this a
+quick way to profile long-running behaviour:
+
+    python -m benchmarks.replay /stream/datetime --hours 24 --clients 100
+    python -m benchmarks.replay /stream/logs --hours 2 --profile logs.pstats
+"""
+
+import argparse
+import asyncio
+import cProfile
+import os
+import pstats
+import time
+
+from streaming import VirtualClock
+from streaming.testing import ASGIClient
+
+
+async def replay(module, path: str, clients: int, seconds: float) -> int:
+    received = 0
+
+    async def client(http: ASGIClient) -> None:
+        nonlocal received
+        while True:
+            async with http.stream(path) as response:
+                async for _ in response.events():
+                    received += 1
+            # EventSource's default reconnection delay
+            await module.clock.sleep(3)
+
+    async with ASGIClient(module.app) as http:
+        tasks = [asyncio.create_task(client(http)) for _ in range(clients)]
+        await module.clock.sleep(seconds)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+    return received
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("path", help="endpoint to replay, e.g. /stream/datetime")
+    parser.add_argument("--hours", type=float, default=1.0, help="virtual hours")
+    parser.add_argument("--clients", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", help="write cProfile stats to this file")
+    args = parser.parse_args()
+
+    # One process, no broker: the whole run happens on the virtual loop
+    os.environ["SSE_TRANSPORT"] = "local"
+    import app
+
+    app.clock = VirtualClock()
+    app.rng.seed(args.seed)
+    seconds = args.hours * 3600
+
+    profiler = cProfile.Profile() if args.profile else None
+    started = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    received = app.clock.run(replay(app, args.path, args.clients, seconds))
+    if profiler:
+        profiler.disable()
+    wall = time.perf_counter() - started
+
+    print(f"virtual time:  {seconds:,.0f} s")
+    print(f"wall time:     {wall:.2f} s ({seconds / wall:,.0f}x)")
+    print(f"events:        {received:,} ({received / wall:,.0f} per wall second)")
+    if profiler:
+        profiler.dump_stats(args.profile)
+        pstats.Stats(args.profile).sort_stats("cumulative").print_stats(15)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Reusable streaming building blocks for the SSE endpoints in app.py"""
+
+from streaming.admission import AdmissionControl, create_admission
+from streaming.batching import batched
+from streaming.broadcast import BroadcastHub, Channel
+from streaming.client import AsyncSSEClient, SSEError
+from streaming.clock import Clock, VirtualClock
+from streaming.compression import StreamCompression, create_compression
+from streaming.conflation import LatestValue
+from streaming.delta import DeltaDecoder, DeltaEncoder
+from streaming.filters import MATCH_ALL, Filter, FilterIndex, compile_filter
+from streaming.frames import Frame
+from streaming.jobs import Job, JobManager, JobsFull, create_jobs, hash_chain
+from streaming.metrics import LoopLagMonitor, Registry, track_stream
+from streaming.parser import Event, SSEParser
+from streaming.profiling import StreamProfiler
+from streaming.replay import ReplayBuffer
+from streaming.serialization import (
+    JsonSerializer,
+    OrjsonSerializer,
+    Serializer,
+    create_serializer,
+    use_serializer,
+)
+from streaming.subscription import Policy, Subscription, overflow_counts
+from streaming.tail import LogTail, shared_tail
+from streaming.timers import TimerWheel
+from streaming.transport import (
+    LocalTransport,
+    Transport,
+    UnixSocketTransport,
+    create_transport,
+)
+
+__all__ = [
+    "AdmissionControl",
+    "AsyncSSEClient",
+    "BroadcastHub",
+    "Channel",
+    "Clock",
+    "DeltaDecoder",
+    "DeltaEncoder",
+    "Event",
+    "Filter",
+    "FilterIndex",
+    "Frame",
+    "Job",
+    "JobManager",
+    "JobsFull",
+    "JsonSerializer",
+    "LatestValue",
+    "LocalTransport",
+    "LogTail",
+    "LoopLagMonitor",
+    "MATCH_ALL",
+    "OrjsonSerializer",
+    "Policy",
+    "Registry",
+    "ReplayBuffer",
+    "SSEError",
+    "SSEParser",
+    "Serializer",
+    "StreamCompression",
+    "StreamProfiler",
+    "Subscription",
+    "TimerWheel",
+    "Transport",
+    "UnixSocketTransport",
+    "VirtualClock",
+    "batched",
+    "compile_filter",
+    "create_admission",
+    "create_compression",
+    "create_jobs",
+    "create_serializer",
+    "create_transport",
+    "hash_chain",
+    "overflow_counts",
+    "shared_tail",
+    "track_stream",
+    "use_serializer",
+]
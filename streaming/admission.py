@@ -0,0 +1,163 @@
+"""
+Admission control for stream endpoints.
+
+A worker accepts at most ``max_streams`` concurrent streams, and at most
+``max_per_client`` from one client address (0 disables a limit). A request
+over either limit is turned away at once with 503 and ``Retry-After``. Without
+limits it would be accepted and make every other stream slower.
+
+Every accepted stream starts with an SSE ``retry:`` field that grows with
+occupancy. It is ``retry_min_ms`` when the worker is idle and reaches
+``retry_max_ms`` at the limit. Each connection adds its own random jitter on
+top. After a mass disconnect, clients therefore come back spread out instead
+of all at once. The level moves in ``step_ms`` steps. When it changes, open
+streams get the new value with their next write, which can be a keep-alive
+ping.
+"""
+
+import json
+import math
+import os
+import random
+from collections import Counter
+from collections.abc import Callable
+
+from streaming.frames import Frame
+from streaming.metrics import registry
+
+admission_rejected = registry.counter(
+    "sse_admission_rejected_total",
+    "Stream requests turned away with 503, by limit",
+    ("path", "reason"),
+)
+
+
+class AdmissionControl:
+    """Per-process and per-client stream limits, with load-aware retry hints"""
+
+    def __init__(
+        self,
+        max_streams: int = 10_000,
+        max_per_client: int = 0,
+        retry_min_ms: int = 3000,
+        retry_max_ms: int = 30_000,
+        step_ms: int = 1000,
+        jitter: float = 0.5,
+        rng: random.Random | None = None,
+    ) -> None:
+        self.max_streams = max_streams
+        self.max_per_client = max_per_client
+        self.retry_min_ms = retry_min_ms
+        self.retry_max_ms = retry_max_ms
+        self.step_ms = step_ms
+        # Each connection's hint is the level times a factor in [1, 1 + jitter)
+        self.jitter = jitter
+        self.rng = rng or random.Random()
+        self.active = 0
+        # Open streams per client address
+        self.clients: Counter[str] = Counter()
+        self.rejected: Counter[str] = Counter()
+        self.retry_ms = retry_min_ms
+
+    def admit(self, client: str | None) -> str | None:
+        """Take a slot for ``client``, or return why the stream is refused"""
+        if self.max_streams and self.active >= self.max_streams:
+            return "max_streams"
+        if self.max_per_client and client is not None:
+            if self.clients[client] >= self.max_per_client:
+                return "max_per_client"
+        self.active += 1
+        if client is not None:
+            self.clients[client] += 1
+        self._update()
+        return None
+
+    def release(self, client: str | None) -> None:
+        self.active -= 1
+        if client is not None:
+            self.clients[client] -= 1
+            if self.clients[client] <= 0:
+                del self.clients[client]
+        self._update()
+
+    def _update(self) -> None:
+        if not self.max_streams:
+            return
+        # Quadratic, so the hint stays short until the worker is fairly busy
+        load = min(1.0, self.active / self.max_streams)
+        level = self.retry_min_ms + (self.retry_max_ms - self.retry_min_ms) * load * load
+        self.retry_ms = int(level // self.step_ms * self.step_ms)
+
+    def retry_after(self) -> int:
+        """Seconds a refused client should wait, jittered like the retry hints"""
+        factor = 1 + self.rng.random() * self.jitter
+        return math.ceil(self.retry_ms * factor / 1000)
+
+    async def reject(self, path: str, reason: str, send: Callable) -> None:
+        """Answer 503 with Retry-After without starting the stream"""
+        self.rejected[reason] += 1
+        admission_rejected.labels(path, reason).inc()
+        body = json.dumps({"detail": "Too many streams, retry later"}).encode()
+        await send(
+            {
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(self.retry_after()).encode()),
+                ],
+            }
+        )
+        await send({"type": "http.response.body", "body": body})
+
+    def wrap(self, app: Callable, client: str | None) -> Callable:
+        """An ASGI app that runs ``app`` with retry hints, then frees its slot"""
+
+        async def admitted(scope: dict, receive: Callable, send: Callable) -> None:
+            factor = 1 + self.rng.random() * self.jitter
+            sent = None
+
+            async def hinting_send(message: dict) -> None:
+                nonlocal sent
+                if message["type"] == "http.response.start":
+                    await send(message)
+                    sent = self.retry_ms
+                    hint = Frame.build(retry=int(sent * factor))
+                    await send({"type": "http.response.body", "body": hint, "more_body": True})
+                    return
+                if sent != self.retry_ms and message.get("more_body", False):
+                    sent = self.retry_ms
+                    hint = Frame.build(retry=int(sent * factor))
+                    message = {**message, "body": hint + message.get("body", b"")}
+                await send(message)
+
+            try:
+                await app(scope, receive, hinting_send)
+            finally:
+                self.release(client)
+
+        return admitted
+
+    def snapshot(self) -> dict:
+        """Limits and current occupancy, for the health endpoint"""
+        return {
+            "active_streams": self.active,
+            "max_streams": self.max_streams,
+            "max_per_client": self.max_per_client,
+            "clients": len(self.clients),
+            "busiest_client_streams": max(self.clients.values(), default=0),
+            "retry_ms": self.retry_ms,
+            "rejected": dict(self.rejected),
+        }
+
+
+def create_admission(rng: random.Random | None = None) -> AdmissionControl:
+    """Build the stream limits from SSE_MAX_STREAMS and friends"""
+    return AdmissionControl(
+        max_streams=int(os.environ.get("SSE_MAX_STREAMS", "10000")),
+        max_per_client=int(os.environ.get("SSE_MAX_STREAMS_PER_CLIENT", "0")),
+        retry_min_ms=int(os.environ.get("SSE_RETRY_MIN_MS", "3000")),
+        retry_max_ms=int(os.environ.get("SSE_RETRY_MAX_MS", "30000")),
+        rng=rng,
+    )
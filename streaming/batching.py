@@ -0,0 +1,96 @@
+"""
+Micro-batching for high-volume streams.
+
+``batched`` groups items from an async source into lists. A batch is released
+when ``max_size`` items are waiting or ``linger`` seconds after its first item
+arrived, whichever comes first, which bounds both the added latency and the
+frame size. A single pump task reads the source, so collecting a burst costs a
+deque append per item rather than a task or timer per item.
+"""
+
+import asyncio
+from collections import deque
+from collections.abc import AsyncGenerator, AsyncIterable
+from typing import TypeVar
+
+T = TypeVar("T")
+
+
+class _Pump:
+    """Reads a source into a bounded buffer on behalf of ``batched``"""
+
+    def __init__(self, source: AsyncIterable[T], max_size: int) -> None:
+        self.buffer: deque[T] = deque()
+        self.limit = max_size * 2
+        self.done = False
+        self.error: BaseException | None = None
+        self._more: asyncio.Future | None = None
+        self._room: asyncio.Future | None = None
+        self._task = asyncio.create_task(self._run(source))
+
+    async def _run(self, source: AsyncIterable[T]) -> None:
+        try:
+            async for item in source:
+                self.buffer.append(item)
+                self._wake()
+                if len(self.buffer) >= self.limit:
+                    # The consumer is behind; stop reading until it catches up
+                    self._room = asyncio.get_running_loop().create_future()
+                    await self._room
+        except Exception as exc:
+            self.error = exc
+        finally:
+            self.done = True
+            self._wake()
+
+    async def wait(self, timeout: float | None = None) -> None:
+        """Wait until another item arrives, the source ends, or ``timeout`` passes"""
+        if self._more is None:
+            self._more = asyncio.get_running_loop().create_future()
+        await asyncio.wait((self._more,), timeout=timeout)
+
+    def take(self, count: int) -> list[T]:
+        buffer = self.buffer
+        batch = [buffer.popleft() for _ in range(min(count, len(buffer)))]
+        room = self._room
+        if room is not None and not room.done():
+            self._room = None
+            room.set_result(None)
+        return batch
+
+    def cancel(self) -> None:
+        self._task.cancel()
+
+    def _wake(self) -> None:
+        more = self._more
+        if more is not None:
+            self._more = None
+            if not more.done():
+                more.set_result(None)
+
+
+async def batched(
+    source: AsyncIterable[T], linger: float, max_size: int
+) -> AsyncGenerator[list[T], None]:
+    """Yield lists of up to ``max_size`` items, each held at most ``linger`` seconds"""
+    if max_size < 1:
+        raise ValueError("max_size must be at least 1")
+    loop = asyncio.get_running_loop()
+    pump = _Pump(source, max_size)
+    try:
+        while True:
+            while not pump.buffer:
+                if pump.done:
+                    if pump.error is not None:
+                        raise pump.error
+                    return
+                await pump.wait()
+            deadline = loop.time() + linger
+            while len(pump.buffer) < max_size and not pump.done:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                await pump.wait(remaining)
+            yield pump.take(max_size)
+    finally:
+        pump.cancel()
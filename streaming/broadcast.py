@@ -0,0 +1,244 @@
+"""
+Per-process broadcast hub.
+
+Each channel runs at most one producer task. Every event the producer emits is
+serialized once into SSE wire bytes and the same bytes object is handed to all
+subscribers, so the cost of a tick does not depend on how many clients listen.
+
+Frames carry consecutive event ids. Channels with a history keep the most recent
+frames in a ``ReplayBuffer`` so a reconnecting client can resume from its
+``Last-Event-ID`` instead of starting over.
+
+With a cross-worker transport, producers run only in the leader worker; every
+published frame is relayed to the other workers, which deliver it to their own
+subscribers.
+"""
+
+import asyncio
+from collections.abc import AsyncGenerator, AsyncIterator, Callable
+
+from streaming.frames import Frame
+from streaming.replay import ReplayBuffer
+from streaming.subscription import Policy, Subscription
+from streaming.transport import LocalTransport, Transport
+
+# A producer is a factory for an async iterator of (event name, payload) pairs
+Producer = Callable[[], AsyncIterator[tuple[str, dict]]]
+
+
+class Channel:
+    """A named event source with a single producer task and many subscribers"""
+
+    def __init__(
+        self,
+        name: str,
+        producer: Producer | None = None,
+        replay_latest: bool = False,
+        history: int = 0,
+        queue_size: int = 256,
+        policy: Policy = Policy.DROP_OLDEST,
+    ) -> None:
+        self.name = name
+        self.producer = producer
+        self.replay_latest = replay_latest
+        self.history = ReplayBuffer(history) if history else None
+        self.queue_size = queue_size
+        self.policy = policy
+        self.subscribers: set[Subscription] = set()
+        self.last_frame: Frame | None = None
+        self.next_id = 1
+        # Set by the hub when frames must also reach other workers
+        self.relay: Callable[[str, Frame], None] | None = None
+        # Eager channels ignore local subscriber counts: with several workers the
+        # leader runs every producer and the other workers run none
+        self.eager = False
+        self._task: asyncio.Task | None = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def publish(self, event: str, data: dict) -> Frame:
+        """Serialize an event once and fan the frame out to every subscriber"""
+        return self.publish_frame(Frame.json(event, data, id=str(self.next_id)))
+
+    def publish_frame(self, frame: Frame) -> Frame:
+        """Fan an already-encoded frame out locally and to other workers"""
+        self.deliver(frame)
+        if self.relay is not None:
+            self.relay(self.name, frame)
+        return frame
+
+    def deliver(self, frame: Frame) -> None:
+        """Hand a frame to this worker's subscribers only"""
+        if frame.id is not None and frame.id.isdigit():
+            event_id = int(frame.id)
+            # Followers track the leader's ids so a promoted leader continues them
+            self.next_id = max(self.next_id, event_id + 1)
+            if self.history is not None:
+                self.history.append(event_id, frame)
+        self.last_frame = frame
+        for subscription in self.subscribers:
+            subscription.put(frame)
+
+    def attach(
+        self,
+        last_event_id: int | None = None,
+        queue_size: int | None = None,
+        policy: Policy | None = None,
+    ) -> Subscription:
+        """Add a subscriber, starting the producer if it is not running"""
+        subscription = Subscription(
+            queue_size or self.queue_size, policy or self.policy
+        )
+        if last_event_id is not None and self.history is not None:
+            for frame in self.missed(last_event_id):
+                subscription.put(frame)
+        elif self.replay_latest and self.last_frame is not None:
+            subscription.put(self.last_frame)
+        self.subscribers.add(subscription)
+        if self.producer is not None and not self.eager and self._task is None:
+            self.start()
+        return subscription
+
+    def detach(self, subscription: Subscription) -> None:
+        """Remove a subscriber, stopping the producer when nobody is left"""
+        self.subscribers.discard(subscription)
+        if not self.subscribers and not self.eager and self._task is not None:
+            self._task.cancel()
+            self._task = None
+            self.last_frame = None
+
+    def missed(self, last_event_id: int) -> list[Frame]:
+        """Frames a client that last saw ``last_event_id`` has not received"""
+        frames, complete = self.history.since(last_event_id)
+        if complete:
+            return frames
+        gap = Frame.json(
+            "gap",
+            {
+                "last_event_id": last_event_id,
+                "oldest_available": self.history.first_id if frames else None,
+            },
+        )
+        return [gap, *frames]
+
+    def start(self) -> None:
+        """Start the producer task"""
+        self._task = asyncio.create_task(self._run())
+
+    async def _run(self) -> None:
+        try:
+            async for event, data in self.producer():
+                self.publish(event, data)
+        finally:
+            # Finite producers close their subscribers when they run out
+            if not asyncio.current_task().cancelling():
+                for subscription in self.subscribers:
+                    subscription.close()
+
+
+class BroadcastHub:
+    """Registry of channels shared by all connections in this process"""
+
+    def __init__(self, transport: Transport | None = None) -> None:
+        self._channels: dict[str, Channel] = {}
+        self.transport = transport or LocalTransport()
+
+    @property
+    def distributed(self) -> bool:
+        return not isinstance(self.transport, LocalTransport)
+
+    async def start(self) -> None:
+        """Connect the transport; call once the event loop is running"""
+        await self.transport.start(self._deliver, self._on_leader, self._snapshot)
+
+    def register(
+        self,
+        name: str,
+        producer: Producer | None = None,
+        replay_latest: bool = False,
+        history: int = 0,
+        queue_size: int = 256,
+        policy: Policy = Policy.DROP_OLDEST,
+    ) -> Channel:
+        """Register a channel, optionally driven by a producer"""
+        channel = Channel(
+            name,
+            producer,
+            replay_latest=replay_latest,
+            history=history,
+            queue_size=queue_size,
+            policy=policy,
+        )
+        if self.distributed:
+            channel.relay = self.transport.publish
+            channel.eager = True
+            if producer is not None and self.transport.leader:
+                channel.start()
+        self._channels[name] = channel
+        return channel
+
+    @property
+    def channels(self) -> list[Channel]:
+        """Every registered channel"""
+        return list(self._channels.values())
+
+    def channel(self, name: str) -> Channel:
+        """Return the named channel, creating a publish-only one if needed"""
+        channel = self._channels.get(name)
+        if channel is None:
+            channel = self.register(name)
+        return channel
+
+    def publish(self, name: str, event: str, data: dict) -> Frame:
+        """Publish an event to the named channel"""
+        return self.channel(name).publish(event, data)
+
+    async def stream(
+        self,
+        name: str,
+        last_event_id: int | None = None,
+        queue_size: int | None = None,
+        policy: Policy | None = None,
+    ) -> AsyncGenerator[Frame, None]:
+        """Yield pre-encoded frames from a channel until it ends or the client leaves"""
+        channel = self.channel(name)
+        subscription = channel.attach(last_event_id, queue_size, policy)
+        try:
+            while True:
+                frame = await subscription.get()
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            channel.detach(subscription)
+
+    async def close(self) -> None:
+        """Stop every running producer and disconnect the transport"""
+        tasks = [c._task for c in self._channels.values() if c._task is not None]
+        for channel in self._channels.values():
+            channel._task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await self.transport.close()
+
+    def _deliver(self, name: str, frame: Frame) -> None:
+        self.channel(name).deliver(frame)
+
+    def _on_leader(self) -> None:
+        # Other workers may have subscribers we cannot see, so the leader keeps
+        # every producer running
+        if not self.distributed:
+            return
+        for channel in self._channels.values():
+            if channel.producer is not None and channel._task is None:
+                channel.start()
+
+    def _snapshot(self) -> list[tuple[str, Frame]]:
+        return [
+            (channel.name, channel.last_frame)
+            for channel in self._channels.values()
+            if channel.replay_latest and channel.last_frame is not None
+        ]
@@ -0,0 +1,142 @@
+"""
+Asyncio client for server-sent event streams.
+
+One ``AsyncSSEClient`` shares a pooled ``httpx.AsyncClient`` between any number
+of streams running on the same event loop. Each stream is parsed incrementally
+and reconnects automatically. On reconnect it sends ``Last-Event-ID`` and waits
+for the server's ``retry`` interval, as a browser ``EventSource`` would. A busy
+server's 503 is retried after its ``Retry-After``.
+"""
+
+import asyncio
+from collections.abc import AsyncGenerator, Mapping
+
+import httpx
+
+from streaming.parser import Event, SSEParser
+
+DEFAULT_RETRY_MS = 3000
+
+
+class SSEError(Exception):
+    """The server answered in a way that must not be retried"""
+
+
+class AsyncSSEClient:
+    """Consume many SSE streams concurrently over a shared connection pool"""
+
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000",
+        max_connections: int = 1000,
+        timeout: float | None = 30.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ) -> None:
+        self.base_url = base_url
+        self._http = httpx.AsyncClient(
+            base_url=base_url,
+            transport=transport,
+            limits=httpx.Limits(
+                max_connections=max_connections,
+                max_keepalive_connections=max_connections,
+            ),
+            # Streams are long-lived, so only connecting has a deadline
+            timeout=httpx.Timeout(None, connect=timeout),
+        )
+
+    async def __aenter__(self) -> "AsyncSSEClient":
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        await self._http.aclose()
+
+    async def events(
+        self,
+        path: str,
+        *,
+        params: Mapping[str, str] | None = None,
+        last_event_id: str | None = None,
+        reconnect: bool = True,
+        max_retries: int | None = None,
+    ) -> AsyncGenerator[Event, None]:
+        """
+        Yield events from ``path``. With ``reconnect``, a dropped or finished
+        stream is reopened after the server's retry delay, resuming from the
+        last event id seen. ``max_retries`` caps consecutive failed attempts.
+        """
+        retry_ms = DEFAULT_RETRY_MS
+        failures = 0
+        while True:
+            headers = {"Accept": "text/event-stream", "Cache-Control": "no-store"}
+            if last_event_id is not None:
+                headers["Last-Event-ID"] = last_event_id
+            parser = SSEParser()
+            received = False
+            delay_ms = retry_ms
+            try:
+                async with self._http.stream(
+                    "GET", path, params=params, headers=headers
+                ) as response:
+                    if response.status_code == 204:
+                        # The server asked us to stop reconnecting
+                        return
+                    if response.status_code == 503:
+                        # Turned away under load: wait as long as the server asks
+                        retry_after = response.headers.get("retry-after", "")
+                        if retry_after.isdigit():
+                            delay_ms = max(retry_ms, int(retry_after) * 1000)
+                    elif response.status_code != 200:
+                        raise SSEError(f"{path} answered {response.status_code}")
+                    else:
+                        async for chunk in response.aiter_raw():
+                            for event in parser.feed(chunk):
+                                received = True
+                                yield event
+                            if parser.last_event_id is not None:
+                                last_event_id = parser.last_event_id
+                            if parser.retry is not None:
+                                retry_ms = delay_ms = parser.retry
+            except (httpx.TransportError, httpx.StreamError):
+                pass
+            if parser.last_event_id is not None:
+                last_event_id = parser.last_event_id
+            if not reconnect:
+                return
+            failures = 0 if received else failures + 1
+            if max_retries is not None and failures > max_retries:
+                return
+            await asyncio.sleep(delay_ms / 1000)
+
+    async def merge(
+        self, *paths: str, **options
+    ) -> AsyncGenerator[tuple[str, Event], None]:
+        """Consume several streams at once, yielding ``(path, event)`` pairs"""
+        queue: asyncio.Queue = asyncio.Queue()
+        done = object()
+
+        async def pump(path: str) -> None:
+            try:
+                async for event in self.events(path, **options):
+                    await queue.put((path, event))
+            finally:
+                queue.put_nowait((path, done))
+
+        tasks = [asyncio.create_task(pump(path)) for path in paths]
+        try:
+            remaining = len(tasks)
+            while remaining:
+                path, event = await queue.get()
+                if event is done:
+                    remaining -= 1
+                    continue
+                yield path, event
+        finally:
+            for task in tasks:
+                task.cancel()
+            results = await asyncio.gather(*tasks, return_exceptions=True)
+            for result in results:
+                if isinstance(result, Exception):
+                    raise result
@@ -0,0 +1,132 @@
+"""
+Time as the streams see it.
+
+Producers ask a ``Clock`` for the current time and sleep through it instead of
+calling ``datetime.now()`` and ``asyncio.sleep()`` directly. ``timestamp()``
+formats the time once per tick (a millisecond by default) and hands the same
+string to every event stamped within it. ``sleep()`` goes through a shared
+``TimerWheel``, so thousands of sleeping connections cost one loop timer.
+
+``Clock`` is the real thing. ``VirtualClock`` runs code on an event loop whose
+time only moves forward when every task is waiting on a timer, and then jumps
+straight to the next deadline. A stream that sleeps for an hour finishes in milliseconds and,
+given the same inputs, produces the same bytes on every run.
+
+Everything on the virtual loop runs in virtual time, including
+``asyncio.sleep``, ``asyncio.wait_for`` and anyio timeouts. Real I/O is still
+polled, but a timer can fire while a socket or thread is still busy. Drive a
+virtual run with in-process clients (see ``streaming.testing``) rather than
+real sockets.
+"""
+
+import asyncio
+import selectors
+import time
+from collections.abc import Coroutine
+from datetime import datetime, timedelta, tzinfo
+from typing import Any, TypeVar
+
+from streaming.timers import TimerWheel
+
+T = TypeVar("T")
+
+
+class Clock:
+    """Wall-clock time and sleeping, backed by the system clock"""
+
+    def __init__(self, resolution: float = 0.001, tick: float = 0.1) -> None:
+        # timestamp() strings are truncated to this many seconds
+        self._resolution_ns = max(1, round(resolution * 1e9))
+        # Sleeps of at least a tick are batched per tick; shorter ones are exact
+        self.timers = TimerWheel(tick)
+        self._tick: float | None = None
+        self._stamp = ""
+
+    def now(self, tz: tzinfo | None = None) -> datetime:
+        return datetime.now(tz)
+
+    def timestamp(self) -> str:
+        """Local time as an ISO 8601 string, shared by every event in one tick"""
+        tick = time.time_ns() // self._resolution_ns
+        if tick != self._tick:
+            ns = tick * self._resolution_ns
+            moment = datetime.fromtimestamp(ns // 1_000_000_000)
+            self._stamp = moment.replace(microsecond=ns % 1_000_000_000 // 1000).isoformat()
+            self._tick = tick
+        return self._stamp
+
+    async def sleep(self, seconds: float) -> None:
+        await self.timers.sleep(seconds)
+
+
+class VirtualClock(Clock):
+    """A clock that advances only when the event loop has nothing else to do"""
+
+    def __init__(self, start: datetime = datetime(2024, 1, 1)) -> None:
+        super().__init__()
+        self.start = start
+        # Seconds of virtual time since start; also the loop's time()
+        self.elapsed = 0.0
+
+    def now(self, tz: tzinfo | None = None) -> datetime:
+        now = self.start + timedelta(seconds=self.elapsed)
+        # Virtual time has no zone of its own; a requested one is attached as-is
+        return now.replace(tzinfo=tz) if tz is not None else now
+
+    def timestamp(self) -> str:
+        # Virtual time stands still between timer jumps: one tick per instant
+        if self.elapsed != self._tick:
+            self._stamp = self.now().isoformat()
+            self._tick = self.elapsed
+        return self._stamp
+
+    def new_event_loop(self) -> asyncio.AbstractEventLoop:
+        return _VirtualLoop(self)
+
+    def run(self, main: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine to completion on a fresh virtual-time loop"""
+        with asyncio.Runner(loop_factory=self.new_event_loop) as runner:
+            return runner.run(main)
+
+
+class _VirtualSelector(selectors.BaseSelector):
+    """Polls real I/O without blocking and skips the wait for the next timer"""
+
+    def __init__(self, clock: VirtualClock) -> None:
+        self._clock = clock
+        self._selector = selectors.DefaultSelector()
+
+    def register(self, fileobj, events, data=None):
+        return self._selector.register(fileobj, events, data)
+
+    def unregister(self, fileobj):
+        return self._selector.unregister(fileobj)
+
+    def modify(self, fileobj, events, data=None):
+        return self._selector.modify(fileobj, events, data)
+
+    def select(self, timeout: float | None = None):
+        ready = self._selector.select(0)
+        if ready or timeout == 0:
+            return ready
+        if timeout is None:
+            # No timer is pending, so only real I/O (say a worker thread
+            # finishing) can wake the loop
+            return self._selector.select(None)
+        self._clock.elapsed += timeout
+        return ready
+
+    def get_map(self):
+        return self._selector.get_map()
+
+    def close(self) -> None:
+        self._selector.close()
+
+
+class _VirtualLoop(asyncio.SelectorEventLoop):
+    def __init__(self, clock: VirtualClock) -> None:
+        super().__init__(_VirtualSelector(clock))
+        self._clock = clock
+
+    def time(self) -> float:
+        return self._clock.elapsed
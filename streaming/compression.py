@@ -0,0 +1,204 @@
+"""
+Per-connection gzip/deflate compression for event streams.
+
+Starlette's GZipMiddleware skips ``text/event-stream`` because it buffers, which
+would hold events back. Here every connection gets its own zlib stream, and
+after each event (each ASGI body message) the compressor is sync-flushed: the
+client can decode the event as soon as it arrives, while the shared window
+still lets later events reference earlier ones, which is where the ratio on
+repetitive JSON comes from.
+
+Compression is opt-in twice: the server enables encodings (``SSE_COMPRESSION``)
+and the client has to accept one of them. Two caps keep it from starving the
+event loop when many connections are open; past either one, new connections
+are served uncompressed:
+
+- ``max_streams``: compressed connections open at once in this process
+- ``cpu_budget``: the fraction of one core spent compressing over the last
+  second
+
+Connections that are already compressing keep their encoding.
+"""
+
+import os
+import zlib
+from collections.abc import Callable
+from time import perf_counter
+
+from streaming.metrics import registry
+
+# zlib wbits offsets for each Content-Encoding; HTTP "deflate" is the zlib format
+_WBITS = {"gzip": 16, "deflate": 0}
+
+compressed_streams = registry.gauge(
+    "sse_compressed_connections", "Open connections with a compressed body", ("encoding",)
+)
+compression_bytes_in = registry.counter(
+    "sse_compression_input_bytes_total", "Body bytes before compression", ("encoding",)
+)
+compression_bytes_out = registry.counter(
+    "sse_compression_output_bytes_total", "Body bytes after compression", ("encoding",)
+)
+compression_seconds = registry.counter(
+    "sse_compression_seconds_total", "CPU time spent compressing", ("encoding",)
+)
+compression_skipped = registry.counter(
+    "sse_compression_skipped_total",
+    "Connections served uncompressed although the client accepted compression",
+    ("reason",),
+)
+
+
+def accepted_encodings(accept_encoding: str) -> dict[str, float]:
+    """Content codings from an Accept-Encoding header, with their q-values"""
+    accepted = {}
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        quality = 1.0
+        for param in params.split(";"):
+            name, _, value = param.strip().partition("=")
+            if name.lower() == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        accepted[coding] = quality
+    return accepted
+
+
+class StreamCompression:
+    """Negotiates and applies per-connection compression within CPU and stream caps"""
+
+    def __init__(
+        self,
+        encodings: tuple[str, ...] = ("gzip", "deflate"),
+        level: int = 6,
+        window_bits: int = 13,
+        mem_level: int = 6,
+        max_streams: int = 1000,
+        cpu_budget: float = 0.25,
+    ) -> None:
+        unknown = set(encodings) - _WBITS.keys()
+        if unknown:
+            raise ValueError(f"Unsupported encodings: {sorted(unknown)}")
+        self.encodings = encodings
+        self.level = level
+        # A small window and memLevel keep each connection's zlib state near
+        # 2**(window_bits + 2) + 2**(mem_level + 9) bytes: 64 KiB by default
+        self.window_bits = window_bits
+        self.mem_level = mem_level
+        self.max_streams = max_streams
+        self.cpu_budget = cpu_budget
+        self.active = 0
+        # Compression CPU seconds per wall second, measured over ~1 s windows
+        self.load = 0.0
+        self._window_start = perf_counter()
+        self._window_cpu = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.encodings)
+
+    def negotiate(self, headers: list[tuple[bytes, bytes]]) -> str | None:
+        """The encoding for a new connection, or None to send it uncompressed"""
+        if not self.encodings:
+            return None
+        accept = b", ".join(v for k, v in headers if k == b"accept-encoding")
+        if not accept:
+            return None
+        accepted = accepted_encodings(accept.decode("latin-1"))
+        wildcard = accepted.get("*", 0.0)
+        best, best_q = None, 0.0
+        for encoding in self.encodings:
+            quality = accepted.get(encoding, wildcard)
+            if quality > best_q:
+                best, best_q = encoding, quality
+        if best is None:
+            return None
+        self._roll_window(perf_counter())
+        if self.active >= self.max_streams:
+            compression_skipped.labels("max_streams").inc()
+            return None
+        if self.load > self.cpu_budget:
+            compression_skipped.labels("cpu_budget").inc()
+            return None
+        return best
+
+    def compressor(self, encoding: str):
+        return zlib.compressobj(
+            self.level, zlib.DEFLATED, _WBITS[encoding] + self.window_bits, self.mem_level
+        )
+
+    def wrap(self, app: Callable, encoding: str) -> Callable:
+        """An ASGI app that runs ``app`` with its response body compressed"""
+
+        async def compressed(scope: dict, receive: Callable, send: Callable) -> None:
+            compressor = self.compressor(encoding)
+            bytes_in = compression_bytes_in.labels(encoding)
+            bytes_out = compression_bytes_out.labels(encoding)
+            seconds = compression_seconds.labels(encoding)
+
+            async def compressing_send(message: dict) -> None:
+                if message["type"] == "http.response.start":
+                    headers = [
+                        (name, value)
+                        for name, value in message.get("headers", [])
+                        if name.lower() not in (b"content-length", b"content-encoding")
+                    ]
+                    headers.append((b"content-encoding", encoding.encode()))
+                    headers.append((b"vary", b"Accept-Encoding"))
+                    message = {**message, "headers": headers}
+                elif message["type"] == "http.response.body":
+                    body = message.get("body", b"")
+                    more = message.get("more_body", False)
+                    started = perf_counter()
+                    # Sync-flush every event so the client can decode it now;
+                    # the last message also writes the stream trailer
+                    out = compressor.compress(body) + compressor.flush(
+                        zlib.Z_SYNC_FLUSH if more else zlib.Z_FINISH
+                    )
+                    finished = perf_counter()
+                    self._spent(finished - started, finished)
+                    seconds.inc(finished - started)
+                    bytes_in.inc(len(body))
+                    bytes_out.inc(len(out))
+                    message = {**message, "body": out}
+                await send(message)
+
+            self.active += 1
+            compressed_streams.labels(encoding).inc()
+            try:
+                await app(scope, receive, compressing_send)
+            finally:
+                self.active -= 1
+                compressed_streams.labels(encoding).dec()
+
+        return compressed
+
+    def _spent(self, seconds: float, now: float) -> None:
+        self._window_cpu += seconds
+        self._roll_window(now)
+
+    def _roll_window(self, now: float) -> None:
+        elapsed = now - self._window_start
+        if elapsed >= 1.0:
+            self.load = self._window_cpu / elapsed
+            self._window_start = now
+            self._window_cpu = 0.0
+
+
+def create_compression() -> StreamCompression:
+    """Build the compression settings from SSE_COMPRESSION and friends"""
+    setting = os.environ.get("SSE_COMPRESSION", "off").lower()
+    encodings = () if setting in ("", "off", "none") else tuple(
+        encoding.strip() for encoding in setting.split(",") if encoding.strip()
+    )
+    return StreamCompression(
+        encodings,
+        level=int(os.environ.get("SSE_COMPRESSION_LEVEL", "6")),
+        max_streams=int(os.environ.get("SSE_COMPRESSION_MAX_STREAMS", "1000")),
+        cpu_budget=float(os.environ.get("SSE_COMPRESSION_CPU", "0.25")),
+    )
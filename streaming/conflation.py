@@ -0,0 +1,129 @@
+"""
+Conflated latest-value streams.
+
+A producer may update a ``LatestValue`` far more often than clients want to
+hear about it. Updates only merge fields into the current state; a snapshot is
+serialized when some subscriber actually samples it, at most once per version,
+and every subscriber sampling the same version shares that frame. Intermediate
+values nobody sampled are never serialized. ``close()`` ends a finite stream:
+readers get the latest snapshot, then an optional final frame.
+"""
+
+import asyncio
+from collections.abc import AsyncGenerator, Awaitable, Callable
+from typing import Any
+
+from streaming.frames import Frame
+
+# Turns the raw merged state into the payload that gets serialized
+Render = Callable[[dict], dict]
+
+
+class LatestValue:
+    """A merged state cell that subscribers sample at their own rate"""
+
+    def __init__(
+        self,
+        event: str,
+        render: Render = dict,
+        producer: Callable[["LatestValue"], Awaitable[None]] | None = None,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    ) -> None:
+        self.event = event
+        self.render = render
+        self.producer = producer
+        # Paces each reader's sampling; the app passes its clock's
+        self.sleep = sleep
+        self.state: dict = {}
+        self.version = 0
+        self.readers = 0
+        self._frame: Frame | None = None
+        self._payload: Any = None
+        self._payload_version = -1
+        self._waiter: asyncio.Future | None = None
+        self._task: asyncio.Task | None = None
+        # Set by close(): readers send the latest snapshot, then this frame
+        self.closed = False
+        self._final: Frame | None = None
+
+    def update(self, fields: dict) -> None:
+        """Merge new field values; cheap enough to call thousands of times a second"""
+        self.state.update(fields)
+        self.version += 1
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def close(self, final: Frame | None = None) -> None:
+        """End every reader's stream after the latest snapshot and ``final``"""
+        self.closed = True
+        self._final = final
+        waiter = self._waiter
+        if waiter is not None:
+            self._waiter = None
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def payload(self) -> Any:
+        """The current snapshot rendered, once per version"""
+        if self._payload_version != self.version:
+            self._payload = self.render(self.state)
+            self._payload_version = self.version
+        return self._payload
+
+    def frame(self) -> Frame:
+        """The current snapshot as a frame, serialized once per version"""
+        frame = self._frame
+        if frame is None or frame.id != str(self.version):
+            frame = Frame.json(self.event, self.payload(), id=str(self.version))
+            self._frame = frame
+        return frame
+
+    async def changed(self, version: int) -> None:
+        """Wait until the state is newer than ``version``"""
+        while self.version == version and not self.closed:
+            if self._waiter is None:
+                self._waiter = asyncio.get_running_loop().create_future()
+            # Shield so one reader leaving does not cancel the others' wait
+            await asyncio.shield(self._waiter)
+
+    async def sample(
+        self, max_hz: float, encode: Callable[[int, Any], Frame] | None = None
+    ) -> AsyncGenerator[Frame, None]:
+        """Yield at most ``max_hz`` snapshots per second, skipping unchanged ones"""
+        # Readers of a version share one frame, unless ``encode`` builds one per
+        # reader from (version, payload) for encodings that depend on what that
+        # reader was sent before
+        interval = 1 / max_hz
+        self._attach()
+        try:
+            seen = 0  # nothing to send before the first update
+            while True:
+                if self.version == seen:
+                    await self.changed(seen)
+                if self.version != seen:
+                    seen = self.version
+                    if encode is None:
+                        yield self.frame()
+                    else:
+                        yield encode(seen, self.payload())
+                if self.closed:
+                    if self._final is not None:
+                        yield self._final
+                    return
+                await self.sleep(interval)
+        finally:
+            self._detach()
+
+    def _attach(self) -> None:
+        self.readers += 1
+        if self.producer is not None and self._task is None:
+            self._task = asyncio.create_task(self.producer(self))
+
+    def _detach(self) -> None:
+        self.readers -= 1
+        if not self.readers and self._task is not None:
+            self._task.cancel()
+            self._task = None
@@ -0,0 +1,187 @@
+"""
+Server-side subscription filters, compiled once and matched through an index.
+
+A stream URL declares its filter in the query string:
+
+- ``level>=WARNING`` (or ``min_level=WARNING``): events at or above a level
+- ``level=ERROR``, ``service=api-server``, ``topic=billing``: events whose
+  payload field equals the value; repeating a field accepts any of its values
+
+``compile_filter`` turns those parameters into a ``Filter``. Equal filters
+compile to the same object, so subscribers that ask for the same thing share
+one entry wherever filters are grouped.
+
+``FilterIndex`` finds the filters an event matches without evaluating each
+one. Filters are bucketed by the fields they constrain and the values they
+want, then sorted by minimum level. A lookup does one dict probe per distinct
+set of constrained fields, plus a bisect on the level. It then touches only
+the filters that match, however many subscribers do not.
+"""
+
+import bisect
+import itertools
+from collections.abc import Iterable, Mapping
+from functools import lru_cache
+
+LEVELS = {
+    "DEBUG": 10,
+    "INFO": 20,
+    "WARN": 30,
+    "WARNING": 30,
+    "ERROR": 40,
+    "CRITICAL": 50,
+    "FATAL": 50,
+}
+# Canonical name for each rank
+_NAMES = {10: "DEBUG", 20: "INFO", 30: "WARNING", 40: "ERROR", 50: "CRITICAL"}
+# Payload fields a filter can require values for
+FIELDS = ("level", "service", "topic")
+
+
+def level_rank(level: object) -> int:
+    """Rank of a level name; 0 for anything that is not one"""
+    return LEVELS.get(level, 0) if isinstance(level, str) else 0
+
+
+class Filter:
+    """A compiled subscription filter; hashable, and shared between equal ones"""
+
+    __slots__ = ("min_level", "fields", "values", "key")
+
+    def __init__(
+        self, min_level: int = 0, equals: Mapping[str, Iterable[str]] | None = None
+    ) -> None:
+        self.min_level = min_level
+        wanted = {name: frozenset(values) for name, values in (equals or {}).items()}
+        # Constrained fields in a fixed order, and the accepted values of each
+        self.fields = tuple(sorted(wanted))
+        self.values = tuple(wanted[name] for name in self.fields)
+        self.key = (
+            min_level,
+            tuple((name, tuple(sorted(v))) for name, v in zip(self.fields, self.values)),
+        )
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, Filter) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+    def __bool__(self) -> bool:
+        # False for the filter that lets everything through
+        return bool(self.min_level or self.fields)
+
+    def __repr__(self) -> str:
+        return f"Filter({self.describe()!r})"
+
+    def describe(self) -> str:
+        """The filter as query parameters"""
+        parts = []
+        if self.min_level:
+            parts.append(f"level>={_NAMES[self.min_level]}")
+        for name, values in zip(self.fields, self.values):
+            parts.extend(f"{name}={value}" for value in sorted(values))
+        return "&".join(parts)
+
+    def matches(self, attributes: Mapping, rank: int | None = None) -> bool:
+        """Whether an event with this payload passes; ``rank`` saves the level lookup"""
+        if rank is None:
+            rank = level_rank(attributes.get("level"))
+        if rank < self.min_level:
+            return False
+        for name, values in zip(self.fields, self.values):
+            if attributes.get(name) not in values:
+                return False
+        return True
+
+
+MATCH_ALL = Filter()
+
+
+def compile_filter(params: Iterable[tuple[str, str]]) -> Filter:
+    """The Filter declared by query parameters; ValueError for an unknown level"""
+    min_level = 0
+    equals: dict[str, set[str]] = {}
+    for name, value in params:
+        if name in ("level>", "min_level"):
+            rank = LEVELS.get(value.upper())
+            if rank is None:
+                raise ValueError(f"unknown level {value!r}")
+            min_level = max(min_level, rank)
+        elif name in FIELDS:
+            if name == "level":
+                if value.upper() not in LEVELS:
+                    raise ValueError(f"unknown level {value!r}")
+                value = _NAMES[LEVELS[value.upper()]]
+            equals.setdefault(name, set()).add(value)
+    key = (min_level, tuple(sorted((name, frozenset(v)) for name, v in equals.items())))
+    return _compiled(key)
+
+
+@lru_cache(maxsize=4096)
+def _compiled(key: tuple) -> Filter:
+    min_level, equals = key
+    return Filter(min_level, dict(equals)) if key != (0, ()) else MATCH_ALL
+
+
+class FilterIndex:
+    """The distinct filters of a set of subscribers, indexed for matching"""
+
+    def __init__(self) -> None:
+        # Filter -> number of subscribers using it
+        self.counts: dict[Filter, int] = {}
+        # Constrained fields -> wanted values -> filters sorted by min_level
+        self._tables: dict[tuple[str, ...], dict[tuple, list[Filter]]] = {}
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+    def __iter__(self):
+        return iter(self.counts)
+
+    def add(self, filter: Filter) -> None:
+        """Count a subscriber using ``filter``, indexing it on first use"""
+        count = self.counts.get(filter, 0)
+        self.counts[filter] = count + 1
+        if count:
+            return
+        table = self._tables.setdefault(filter.fields, {})
+        # A filter accepting several values of a field sits under each of them
+        for values in itertools.product(*filter.values):
+            bisect.insort(table.setdefault(values, []), filter, key=_min_level)
+
+    def remove(self, filter: Filter) -> None:
+        """Drop a subscriber using ``filter``, unindexing it after the last one"""
+        count = self.counts[filter] - 1
+        if count:
+            self.counts[filter] = count
+            return
+        del self.counts[filter]
+        table = self._tables[filter.fields]
+        for values in itertools.product(*filter.values):
+            bucket = table[values]
+            bucket.remove(filter)
+            if not bucket:
+                del table[values]
+        if not table:
+            del self._tables[filter.fields]
+
+    def match(self, attributes: Mapping, rank: int | None = None) -> list[Filter]:
+        """Every indexed filter the event with this payload passes"""
+        if rank is None:
+            rank = level_rank(attributes.get("level"))
+        matched = []
+        get = attributes.get
+        for fields, table in self._tables.items():
+            bucket = table.get(tuple(get(name) for name in fields))
+            if bucket is None:
+                continue
+            if bucket[-1].min_level <= rank:
+                matched.extend(bucket)
+            else:
+                matched.extend(bucket[: bisect.bisect_right(bucket, rank, key=_min_level)])
+        return matched
+
+
+def _min_level(filter: Filter) -> int:
+    return filter.min_level
@@ -0,0 +1,108 @@
+"""
+Pre-encoded SSE frames.
+
+EventSourceResponse passes ``bytes`` through untouched, so a ``Frame`` (a bytes
+subclass holding the finished ``event:/id:/data:`` wire format) is encoded once
+and then written as-is to however many connections share it.
+"""
+
+from time import perf_counter
+from typing import Any
+
+from streaming import serialization
+from streaming.metrics import CounterValue, HistogramValue, serialization_seconds
+
+SEPARATOR = "\r\n"
+
+# Serialization timing cells by event name, so the hot path skips label lookup
+_timings: dict[str, HistogramValue] = {}
+# Running total across all events; profiling reads it around generator steps
+serialization_total = CounterValue()
+
+
+def _clean(value: str) -> str:
+    # Event names and ids must stay on a single line
+    if "\n" in value or "\r" in value:
+        return value.replace("\r\n", "").replace("\r", "").replace("\n", "")
+    return value
+
+
+def encode(
+    event: str | None = None,
+    data: str | None = None,
+    id: str | None = None,
+    retry: int | None = None,
+    comment: str | None = None,
+    sep: str = SEPARATOR,
+) -> bytes:
+    """Encode one SSE frame using the same layout as sse-starlette"""
+    parts = []
+    if comment is not None:
+        for line in comment.splitlines() or [""]:
+            parts.append(f": {line}{sep}")
+    if id is not None:
+        parts.append(f"id: {_clean(id)}{sep}")
+    if event is not None:
+        parts.append(f"event: {_clean(event)}{sep}")
+    if data is not None:
+        if "\n" in data or "\r" in data:
+            for line in data.replace("\r\n", "\n").replace("\r", "\n").split("\n"):
+                parts.append(f"data: {line}{sep}")
+        else:
+            parts.append(f"data: {data}{sep}")
+    if retry is not None:
+        parts.append(f"retry: {int(retry)}{sep}")
+    parts.append(sep)
+    return "".join(parts).encode("utf-8")
+
+
+class Frame(bytes):
+    """An SSE frame that has already been encoded to wire bytes"""
+
+    def __new__(
+        cls,
+        raw: bytes,
+        event: str | None = None,
+        data: str | None = None,
+        id: str | None = None,
+    ) -> "Frame":
+        frame = super().__new__(cls, raw)
+        frame.event = event
+        frame.data = data
+        frame.id = id
+        return frame
+
+    @classmethod
+    def build(
+        cls,
+        event: str | None = None,
+        data: str | None = None,
+        id: str | None = None,
+        retry: int | None = None,
+        comment: str | None = None,
+    ) -> "Frame":
+        """Encode the given fields into a frame"""
+        return cls(encode(event, data, id, retry, comment), event, data, id)
+
+    @classmethod
+    def json(cls, event: str, payload: Any, id: str | None = None) -> "Frame":
+        """Serialize a payload with the active serializer and encode it into a frame"""
+        started = perf_counter()
+        data = serialization.serializer.dumps(payload)
+        # JSON text never contains a raw line break, so it is always a single
+        # data line; same layout as encode()
+        if id is None:
+            raw = f"event: {_clean(event)}\r\ndata: {data}\r\n\r\n"
+        else:
+            raw = (
+                f"id: {_clean(id)}\r\nevent: {_clean(event)}\r\n"
+                f"data: {data}\r\n\r\n"
+            )
+        frame = cls(raw.encode(), event, data, id)
+        timing = _timings.get(event)
+        if timing is None:
+            timing = _timings[event] = serialization_seconds.labels(event)
+        elapsed = perf_counter() - started
+        timing.observe(elapsed)
+        serialization_total.inc(elapsed)
+        return frame
@@ -0,0 +1,248 @@
+"""
+CPU-bound jobs in a process pool, with progress streamed to any number of
+watchers.
+
+Jobs run in a ``ProcessPoolExecutor``, so heavy work never blocks the event
+loop. Workers report progress through a shared-memory array: each job owns a
+slot of two integers (steps done, total steps). A report is two stores into
+that memory, with no message, lock or system call. Frequent updates are
+coalesced for free, since the slot only ever holds the newest value.
+
+One poller task in the server reads the slots of running jobs every
+``poll_interval``. It publishes changed values into each job's ``LatestValue``
+cell, so a job produces at most one progress snapshot per interval however
+often its worker reports. Every watcher samples that cell at its own rate and
+shares the serialized frame. When the job ends, watchers get the final
+snapshot and then a ``complete`` or ``error`` event.
+
+Jobs and their slots belong to the worker process that accepted them.
+"""
+
+import asyncio
+import hashlib
+import multiprocessing
+import os
+import uuid
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.sharedctypes import RawArray
+from typing import Any
+
+from streaming.clock import Clock
+from streaming.conflation import LatestValue
+from streaming.frames import Frame
+
+# The slot array of a pool worker process, set by its initializer
+_slots = None
+
+
+def _attach(slots) -> None:
+    global _slots
+    _slots = slots
+
+
+class Progress:
+    """Worker-side reporter for one job's slot; pickled into the pool"""
+
+    def __init__(self, slot: int) -> None:
+        self.slot = slot
+
+    def __call__(self, done: int, total: int) -> None:
+        base = 2 * self.slot
+        _slots[base + 1] = total
+        _slots[base] = done
+
+
+def _run(slot: int, func: Callable, args: tuple) -> Any:
+    return func(Progress(slot), *args)
+
+
+def hash_chain(progress: Progress, steps: int, rounds: int) -> str:
+    """Demo job: ``steps`` x ``rounds`` chained SHA-256 digests"""
+    digest = b"seed"
+    progress(0, steps)
+    for step in range(1, steps + 1):
+        for _ in range(rounds):
+            digest = hashlib.sha256(digest).digest()
+        progress(step, steps)
+    return digest.hex()
+
+
+class JobsFull(Exception):
+    """Every progress slot is taken by a queued or running job"""
+
+
+class Job:
+    """A submitted job and the cell its watchers sample"""
+
+    def __init__(
+        self, job_id: str, slot: int, sleep: Callable[[float], Awaitable[None]]
+    ) -> None:
+        self.id = job_id
+        self.slot = slot
+        self.status = "queued"
+        self.done = -1
+        self.total = 0
+        self.result: Any = None
+        self.error: str | None = None
+        self.progress = LatestValue("progress", sleep=sleep)
+
+    def snapshot(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "current_step": max(self.done, 0),
+            "total_steps": self.total,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobManager:
+    """Runs jobs in a process pool and publishes their progress"""
+
+    def __init__(
+        self,
+        max_workers: int | None = None,
+        capacity: int = 256,
+        poll_interval: float = 0.1,
+        retain: int = 1000,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        timestamp: Callable[[], str] | None = None,
+    ) -> None:
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.capacity = capacity
+        self.poll_interval = poll_interval
+        # Finished jobs kept for late watchers and status requests
+        self.retain = retain
+        self.sleep = sleep
+        self.timestamp = timestamp or Clock().timestamp
+        self.jobs: OrderedDict[str, Job] = OrderedDict()
+        self._running: dict[str, Job] = {}
+        self._free = list(range(capacity - 1, -1, -1))
+        self._slots = RawArray("q", 2 * capacity)
+        self._pool: ProcessPoolExecutor | None = None
+        self._poller: asyncio.Task | None = None
+
+    def submit(self, func: Callable, *args: Any) -> Job:
+        """Queue ``func(progress, *args)`` in the pool; raises JobsFull"""
+        if not self._free:
+            raise JobsFull(f"{self.capacity} jobs already queued or running")
+        if self._pool is None:
+            # Spawned, not forked: the server's sockets and threads stay here
+            self._pool = ProcessPoolExecutor(
+                self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_attach,
+                initargs=(self._slots,),
+            )
+        slot = self._free.pop()
+        self._slots[2 * slot] = -1
+        self._slots[2 * slot + 1] = 0
+        job = Job(uuid.uuid4().hex, slot, self.sleep)
+        self.jobs[job.id] = job
+        self._running[job.id] = job
+        self._trim()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._pool, _run, slot, func, args)
+        future.add_done_callback(lambda f: self._finish(job, f))
+        if self._poller is None or self._poller.done():
+            self._poller = asyncio.create_task(self._poll())
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        return self.jobs.get(job_id)
+
+    async def close(self) -> None:
+        """Stop polling and shut the pool down, cancelling queued jobs"""
+        if self._poller is not None:
+            self._poller.cancel()
+            await asyncio.gather(self._poller, return_exceptions=True)
+            self._poller = None
+        if self._pool is not None:
+            pool, self._pool = self._pool, None
+            await asyncio.to_thread(pool.shutdown, True, cancel_futures=True)
+
+    async def _poll(self) -> None:
+        while self._running:
+            for job in self._running.values():
+                self._publish(job)
+            await self.sleep(self.poll_interval)
+
+    def _publish(self, job: Job, force: bool = False) -> None:
+        base = 2 * job.slot
+        done = self._slots[base]
+        if done == job.done and not force:
+            return
+        if done >= 0 and job.status == "queued":
+            job.status = "running"
+        job.done, job.total = done, self._slots[base + 1]
+        if done < 0:
+            return
+        percentage = done / job.total * 100 if job.total else 100.0
+        job.progress.update(
+            {
+                "job_id": job.id,
+                "percentage": round(percentage, 1),
+                "current_step": done,
+                "total_steps": job.total,
+                "status": job.status,
+                "message": f"Processing step {done}/{job.total}",
+                "timestamp": self.timestamp(),
+            }
+        )
+
+    def _finish(self, job: Job, future: asyncio.Future) -> None:
+        self._running.pop(job.id, None)
+        if future.cancelled():
+            job.status, job.error = "cancelled", "job was cancelled"
+        elif future.exception() is not None:
+            exc = future.exception()
+            job.status, job.error = "failed", f"{type(exc).__name__}: {exc}"
+        else:
+            job.status, job.result = "completed", future.result()
+        # The worker's last report, which may have landed after the last poll,
+        # with the final status
+        self._publish(job, force=True)
+        self._free.append(job.slot)
+        if job.status == "completed":
+            final = Frame.json("complete", {"job_id": job.id, "result": job.result})
+        else:
+            final = Frame.json("error", {"job_id": job.id, "error": job.error})
+        job.progress.close(final)
+
+    def _trim(self) -> None:
+        # Forget the oldest finished jobs beyond ``retain``
+        excess = len(self.jobs) - len(self._running) - self.retain
+        for job_id in list(self.jobs):
+            if excess <= 0:
+                break
+            if job_id not in self._running:
+                del self.jobs[job_id]
+                excess -= 1
+
+    def stats(self) -> dict:
+        """Pool size and job counts, for the health endpoint"""
+        running = sum(job.status == "running" for job in self._running.values())
+        return {
+            "workers": self.max_workers,
+            "capacity": self.capacity,
+            "queued": len(self._running) - running,
+            "running": running,
+            "retained": len(self.jobs) - len(self._running),
+        }
+
+
+def create_jobs(
+    sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+    timestamp: Callable[[], str] | None = None,
+) -> JobManager:
+    """Build the job manager from SSE_JOB_WORKERS and SSE_JOB_CAPACITY"""
+    workers = os.environ.get("SSE_JOB_WORKERS")
+    return JobManager(
+        max_workers=int(workers) if workers else None,
+        capacity=int(os.environ.get("SSE_JOB_CAPACITY", "256")),
+        sleep=sleep,
+        timestamp=timestamp,
+    )
@@ -0,0 +1,374 @@
+"""
+Prometheus metrics for the streaming internals.
+
+Metrics live in the process that records them: every worker keeps its own
+registry and a scrape of ``/metrics`` describes the worker that answered it.
+All updates happen on the event loop thread, so cells are plain attributes
+incremented in place, with no locks. A labelled cell is resolved once (per
+connection, or per event name) and then kept, so the per-event path is an
+attribute update and never builds label tuples or dicts.
+
+Values are rendered in the Prometheus text exposition format (version 0.0.4).
+"""
+
+import asyncio
+import math
+from bisect import bisect_left
+from collections.abc import Awaitable, Callable, Iterable, Iterator
+from typing import Any
+
+try:
+    from sse_starlette.sse import SendTimeoutError
+except ImportError:  # pragma: no cover - sse-starlette is only needed by app.py
+    SendTimeoutError = None
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; suits request-scale latencies
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1)
+
+# (label values, value) pairs reported by a collector at scrape time
+Samples = Iterable[tuple[tuple[str, ...], float]]
+
+
+class CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self) -> None:
+        self.value = 0
+
+    def inc(self, amount: float = 1) -> None:
+        self.value += amount
+
+
+class GaugeValue(CounterValue):
+    __slots__ = ()
+
+    def dec(self, amount: float = 1) -> None:
+        self.value -= amount
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class HistogramValue:
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: tuple[float, ...]) -> None:
+        self.bounds = bounds
+        # One slot per bucket plus +Inf; made cumulative only when rendered
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+
+class Metric:
+    """A named metric family with one cell per combination of label values"""
+
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> None:
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._cells: dict[tuple[str, ...], Any] = {}
+
+    def labels(self, *values: str) -> Any:
+        """The cell for these label values; keep it rather than looking it up per event"""
+        cell = self._cells.get(values)
+        if cell is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f"{self.name} takes labels {self.labelnames}")
+            cell = self._cells[values] = self._new_cell()
+        return cell
+
+    def _new_cell(self) -> Any:
+        raise NotImplementedError
+
+    def samples(self) -> Iterator[tuple[str, tuple[str, ...], tuple[str, ...], float]]:
+        """(name suffix, label names, label values, value) for every cell"""
+        for values, cell in self._cells.items():
+            yield "", self.labelnames, values, cell.value
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def _new_cell(self) -> CounterValue:
+        return CounterValue()
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def _new_cell(self) -> GaugeValue:
+        return GaugeValue()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_cell(self) -> HistogramValue:
+        return HistogramValue(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def samples(self) -> Iterator[tuple[str, tuple[str, ...], tuple[str, ...], float]]:
+        names = (*self.labelnames, "le")
+        for values, cell in self._cells.items():
+            total = 0
+            for bound, count in zip((*self.buckets, math.inf), cell.counts):
+                total += count
+                yield "_bucket", names, (*values, _format(bound)), total
+            yield "_sum", self.labelnames, values, cell.sum
+            yield "_count", self.labelnames, values, total
+
+
+class Collector(Metric):
+    """A metric whose samples are computed at scrape time"""
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        kind: str,
+        labelnames: tuple[str, ...],
+        collect: Callable[[], Samples],
+    ) -> None:
+        super().__init__(name, help, labelnames)
+        self.kind = kind
+        self.collect = collect
+
+    def samples(self) -> Iterator[tuple[str, tuple[str, ...], tuple[str, ...], float]]:
+        for values, value in self.collect():
+            yield "", self.labelnames, values, value
+
+
+class Registry:
+    """The metrics of one process, in the order they were registered"""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        # Registering a name again replaces it, so a reloaded module can
+        # re-register its collectors
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Counter:
+        return self.register(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: tuple[str, ...] = ()) -> Gauge:
+        return self.register(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: tuple[str, ...] = (),
+        buckets: Iterable[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, help, labelnames, buckets))
+
+    def collector(
+        self,
+        name: str,
+        help: str,
+        kind: str,
+        labelnames: tuple[str, ...],
+        collect: Callable[[], Samples],
+    ) -> Collector:
+        """Register a gauge or counter read from existing state when scraped"""
+        return self.register(Collector(name, help, kind, labelnames, collect))
+
+    def render(self) -> str:
+        """Every metric in the Prometheus text format"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {_escape_help(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, names, values, value in metric.samples():
+                if names:
+                    labels = ",".join(
+                        f'{name}="{_escape(str(v))}"' for name, v in zip(names, values)
+                    )
+                    lines.append(f"{metric.name}{suffix}{{{labels}}} {_format(value)}")
+                else:
+                    lines.append(f"{metric.name}{suffix} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _format(value: float) -> str:
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if math.isnan(value):
+        return "NaN"
+    return repr(value)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _escape_help(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n")
+
+
+registry = Registry()
+
+active_connections = registry.gauge(
+    "sse_active_connections", "Open SSE connections", ("path",)
+)
+events_sent = registry.counter(
+    "sse_events_sent_total", "SSE events written to clients", ("path",)
+)
+bytes_sent = registry.counter(
+    "sse_bytes_sent_total", "Response body bytes written, pings included", ("path",)
+)
+serialization_seconds = registry.histogram(
+    "sse_serialization_seconds",
+    "Time to serialize and encode one frame",
+    ("event",),
+    (1e-6, 5e-6, 1e-5, 2.5e-5, 5e-5, 1e-4, 2.5e-4, 5e-4, 1e-3, 5e-3),
+)
+connection_seconds = registry.histogram(
+    "sse_connection_duration_seconds",
+    "How long SSE connections stayed open",
+    ("path",),
+    (1, 5, 10, 30, 60, 300, 900, 1800, 3600, 14400),
+)
+disconnects = registry.counter(
+    "sse_disconnects_total",
+    "Closed SSE connections by reason: completed, client, shutdown, "
+    "send_timeout, cancelled or error",
+    ("path", "reason"),
+)
+loop_lag_seconds = registry.histogram(
+    "sse_event_loop_lag_seconds",
+    "How late the event loop ran a timer",
+    (),
+    (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5),
+)
+
+
+class StreamMetrics:
+    """The cells of one stream path, resolved once per path"""
+
+    __slots__ = ("path", "active", "events", "bytes", "duration")
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.active = active_connections.labels(path)
+        self.events = events_sent.labels(path)
+        self.bytes = bytes_sent.labels(path)
+        self.duration = connection_seconds.labels(path)
+
+
+_streams: dict[str, StreamMetrics] = {}
+
+ASGIApp = Callable[[dict, Callable, Callable], Awaitable[None]]
+
+
+async def track_stream(
+    path: str, app: ASGIApp, scope: dict, receive: Callable, send: Callable
+) -> None:
+    """Run a streaming ASGI response, recording it under ``path``"""
+    stream = _streams.get(path)
+    if stream is None:
+        stream = _streams[path] = StreamMetrics(path)
+    events, sent = stream.events, stream.bytes
+    finished = client_left = False
+
+    async def metered_send(message: dict) -> None:
+        nonlocal finished
+        if message["type"] == "http.response.body":
+            body = message.get("body")
+            if body:
+                sent.inc(len(body))
+                # Chunks starting with ':' are comments, i.e. keep-alive pings
+                if body[0] != 0x3A:
+                    events.inc()
+            if not message.get("more_body", False):
+                finished = True
+        await send(message)
+
+    async def metered_receive() -> dict:
+        nonlocal client_left
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            client_left = True
+        return message
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    stream.active.inc()
+    reason = "error"
+    try:
+        await app(scope, metered_receive, metered_send)
+        if finished:
+            reason = "completed"
+        elif client_left:
+            reason = "client"
+        else:
+            # sse-starlette returns without ending the body when the server exits
+            reason = "shutdown"
+    except asyncio.CancelledError:
+        reason = "cancelled"
+        raise
+    except Exception as exc:
+        if SendTimeoutError is not None and isinstance(exc, SendTimeoutError):
+            reason = "send_timeout"
+        raise
+    finally:
+        stream.active.dec()
+        stream.duration.observe(loop.time() - started)
+        disconnects.labels(path, reason).inc()
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a periodic timer"""
+
+    def __init__(self, interval: float = 0.5) -> None:
+        self.interval = interval
+        self._task: asyncio.Task | None = None
+
+    def start(self) -> None:
+        """Start sampling; call once the event loop is running"""
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        cell = loop_lag_seconds.labels()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            cell.observe(max(0.0, loop.time() - started - self.interval))
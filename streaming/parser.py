@@ -0,0 +1,235 @@
+"""
+Incremental parser for the text/event-stream format.
+
+Follows the WHATWG event-stream interpretation rules: lines may end in CRLF, LF
+or CR (also when split across chunks), ``data:`` lines accumulate, comments are
+ignored, ``id`` values containing NUL are ignored, and ``retry`` accepts only
+ASCII digits. Feed it raw bytes as they arrive and it returns complete events.
+
+Received bytes stay in one ``bytearray`` and only complete frames are parsed.
+Frame boundaries are found with ``find``/``rfind`` on the buffer, resuming
+where the previous search stopped, so a frame split across many chunks is
+searched once. Streams of small frames are split into lines with one C call
+per chunk; larger frames are walked line by line in place and their data is
+decoded straight from a ``memoryview``. Either way the payload is decoded once
+per frame.
+"""
+
+from dataclasses import dataclass
+
+_BOM = b"\xef\xbb\xbf"
+_LF = 10
+_CR = 13
+_SPACE = 32
+# Frame size above which frames are walked in place instead of copied and
+# split; copying wins for small frames, memchr-speed scanning for large ones
+_SMALL_FRAME = 1024
+
+
+@dataclass(slots=True)
+class Event:
+    """One dispatched server-sent event"""
+
+    event: str = "message"
+    data: str = ""
+    id: str | None = None
+    retry: int | None = None
+
+
+class SSEParser:
+    """Turns chunks of an event stream into ``Event`` objects"""
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        # Where the next frame-boundary search resumes
+        self._scan = 0
+        # Average size of the frames parsed last, to pick the parsing strategy
+        self._frame_size = 0
+        self._walking = False
+        self._first = True
+        self._skip_lf = False
+        self._event = ""
+        self._retry: int | None = None
+        self._name_raw = b""
+        self._name = ""
+        self.last_event_id: str | None = None
+        self.retry: int | None = None
+
+    def feed(self, chunk: bytes) -> list[Event]:
+        """Consume a chunk and return the events it completed"""
+        if self._skip_lf and chunk[:1] == b"\n":
+            chunk = chunk[1:]
+        self._skip_lf = False
+        if b"\r" in chunk:
+            chunk = self._normalize(chunk)
+
+        buffer = self._buffer
+        buffer += chunk
+        if self._first and len(buffer) >= 3:
+            if buffer.startswith(_BOM):
+                del buffer[:3]
+            self._first = False
+
+        walk = self._frame_size > _SMALL_FRAME
+        if walk != self._walking:
+            # The two strategies resume their searches differently
+            self._walking = walk
+            self._scan = 0
+        if walk:
+            events, used = self._walk(buffer)
+        else:
+            events, used = self._split(buffer)
+        if used:
+            del buffer[:used]
+            self._scan = max(0, self._scan - used)
+        return events
+
+    def _normalize(self, chunk: bytes) -> bytes:
+        """Rewrite lone CR line endings as LF; CRLF is handled while parsing"""
+        if chunk.endswith(b"\r"):
+            # The LF of a CRLF pair may still be in the next chunk; end the
+            # line now and drop that LF if it comes
+            chunk += b"\n"
+            self._skip_lf = True
+        if chunk.count(b"\r") != chunk.count(b"\r\n"):
+            chunk = chunk.replace(b"\r\n", b"\n").replace(b"\r", b"\n")
+        return chunk
+
+    def _split(self, buffer: bytearray) -> tuple[list[Event], int]:
+        """Parse every complete frame in the buffer from one copy of them"""
+        # The last blank line closes the last complete frame
+        start = self._scan
+        found = max(buffer.rfind(b"\n\n", start), buffer.rfind(b"\n\r\n", start))
+        if found != -1:
+            end = buffer.index(b"\n", found + 1) + 1
+        elif buffer.startswith(b"\n") or buffer.startswith(b"\r\n"):
+            end = buffer.index(b"\n") + 1
+        else:
+            self._scan = max(0, len(buffer) - 2)
+            return [], 0
+        self._scan = 0
+
+        with memoryview(buffer) as view:
+            lines = bytes(view[:end]).splitlines()
+        events = []
+        data = []
+        frames = 0
+        for line in lines:
+            if line.startswith(b"data: "):
+                data.append(line[6:])
+            elif not line:
+                frames += 1
+                if data:
+                    payload = data[0] if len(data) == 1 else b"\n".join(data)
+                    events.append(
+                        Event(
+                            self._event or "message",
+                            payload.decode("utf-8", "replace"),
+                            self.last_event_id,
+                            self._retry,
+                        )
+                    )
+                    data = []
+                self._event = ""
+                self._retry = None
+            elif line.startswith(b"event: ") and line[7:] == self._name_raw:
+                self._event = self._name
+            elif line.startswith(b"id: ") and b"\0" not in line:
+                self.last_event_id = line[4:].decode("utf-8", "replace")
+            elif line.startswith(b"data:"):
+                data.append(line[5:])
+            elif line == b"data":
+                data.append(b"")
+            else:
+                self._field(line)
+        self._frame_size = end // frames
+        return events, end
+
+    def _walk(self, buffer: bytearray) -> tuple[list[Event], int]:
+        """Parse complete frames in place, one line-ending search per line"""
+        events = []
+        pos = 0
+        with memoryview(buffer) as view:
+            while True:
+                end = self._frame_end(buffer, pos)
+                if end == -1:
+                    break
+                event = self._parse_frame(buffer, view, pos, end)
+                if event is not None:
+                    events.append(event)
+                self._frame_size = end - pos
+                pos = end
+        return events, pos
+
+    def _frame_end(self, buffer: bytearray, pos: int) -> int:
+        """End of the blank line closing the frame at pos, or -1"""
+        # Resume at the first line the previous search did not reach
+        line = max(pos, self._scan)
+        size = len(buffer)
+        while line < size:
+            first = buffer[line]
+            if first == _LF:
+                self._scan = 0
+                return line + 1
+            if first == _CR:
+                # Lone CRs are gone, so this starts a CRLF blank line
+                self._scan = 0
+                return line + 2
+            newline = buffer.find(b"\n", line)
+            if newline == -1:
+                break
+            line = newline + 1
+        self._scan = line
+        return -1
+
+    def _parse_frame(
+        self, buffer: bytearray, view: memoryview, pos: int, end: int
+    ) -> Event | None:
+        # Views of the data values instead of copies; the blank line is skipped
+        data = []
+        while True:
+            newline = buffer.find(b"\n", pos, end)
+            stop = newline
+            if stop > pos and buffer[stop - 1] == _CR:
+                stop -= 1
+            if stop == pos:
+                break
+            if buffer.startswith(b"data:", pos, stop):
+                start = pos + 5
+                if start < stop and buffer[start] == _SPACE:
+                    start += 1
+                data.append(view[start:stop])
+            elif stop - pos == 4 and buffer.startswith(b"data", pos, stop):
+                data.append(b"")
+            else:
+                self._field(bytes(view[pos:stop]))
+            pos = newline + 1
+        if not data:
+            self._event = ""
+            self._retry = None
+            return None
+        payload = data[0] if len(data) == 1 else b"\n".join(data)
+        return self._dispatch(str(payload, "utf-8", "replace"))
+
+    def _field(self, line: bytes) -> None:
+        name, _, value = line.partition(b":")
+        if value[:1] == b" ":
+            value = value[1:]
+        if name == b"event":
+            # Event names repeat from frame to frame; compare before decoding
+            if value != self._name_raw:
+                self._name_raw = value
+                self._name = value.decode("utf-8", "replace")
+            self._event = self._name
+        elif name == b"id":
+            if b"\0" not in value:
+                self.last_event_id = value.decode("utf-8", "replace")
+        elif name == b"retry":
+            if value.isdigit():
+                self.retry = self._retry = int(value)
+
+    def _dispatch(self, data: str) -> Event:
+        event = Event(self._event or "message", data, self.last_event_id, self._retry)
+        self._event = ""
+        self._retry = None
+        return event
@@ -0,0 +1,136 @@
+"""
+Opt-in per-yield phase timings for stream generators.
+
+A ``StreamProfiler`` wraps a response's frame generator and its ASGI ``send``,
+splitting each event into four phases:
+
+- ``produce``: CPU time the generator spends building the event. The
+  generator is stepped by hand, so only the slices where it actually runs are
+  timed; its sleeps and waits on other tasks are not.
+- ``serialize``: the part of ``produce`` spent in ``Frame.json``. It is nested
+  under ``produce`` in the output.
+- ``enqueue``: from the generator yielding to the response calling ``send``
+  (sse-starlette's byte conversion and timeout scope).
+- ``write``: inside ``send``, i.e. handing the bytes to the server and waiting
+  for the socket to drain. Keep-alive pings are written under ``ping``.
+
+Totals are kept per route and phase and dumped in the folded-stack format
+(``path;phase;subphase microseconds`` per line) that flamegraph.pl, inferno
+and speedscope read. While disabled, ``instrument()`` hands back the generator
+and ``send`` unchanged, so the only cost is one attribute check per
+connection.
+"""
+
+from collections.abc import AsyncGenerator, AsyncIterator, Awaitable, Callable
+from time import perf_counter
+from typing import Any
+
+from streaming.frames import serialization_total
+
+
+class _Step:
+    """Awaits an awaitable, timing only the slices where it runs"""
+
+    __slots__ = ("_awaitable", "cpu", "serialize")
+
+    def __init__(self, awaitable: Awaitable) -> None:
+        self._awaitable = awaitable
+        self.cpu = 0.0
+        self.serialize = 0.0
+
+    def __await__(self):
+        inner = self._awaitable.__await__()
+        value: Any = None
+        error: BaseException | None = None
+        while True:
+            serialized = serialization_total.value
+            started = perf_counter()
+            try:
+                if error is None:
+                    signal = inner.send(value)
+                else:
+                    signal = inner.throw(error)
+            except StopIteration as stop:
+                return stop.value
+            finally:
+                self.cpu += perf_counter() - started
+                self.serialize += serialization_total.value - serialized
+            # Hand the future to the event loop and relay what it sends back
+            try:
+                value, error = (yield signal), None
+            except BaseException as exc:
+                value, error = None, exc
+
+
+class StreamProfiler:
+    """Accumulates phase timings per route while enabled"""
+
+    def __init__(self, enabled: bool = False) -> None:
+        self.enabled = enabled
+        self._totals: dict[str, float] = {}
+
+    def instrument(
+        self, path: str, frames: AsyncIterator, send: Callable
+    ) -> tuple[AsyncIterator, Callable]:
+        """Wrap a response's frame iterator and ``send`` if profiling is on"""
+        if not self.enabled:
+            return frames, send
+        totals = self._totals
+        produce, serialize, enqueue, write, ping = (
+            f"{path};produce",
+            f"{path};produce;serialize",
+            f"{path};enqueue",
+            f"{path};write",
+            f"{path};ping",
+        )
+        # perf_counter() of the last yield, until send() picks the event up
+        yielded: float | None = None
+
+        async def profiled() -> AsyncGenerator[Any, None]:
+            nonlocal yielded
+            try:
+                while True:
+                    step = _Step(frames.__anext__())
+                    try:
+                        item = await step
+                    except StopAsyncIteration:
+                        return
+                    finally:
+                        totals[produce] = (
+                            totals.get(produce, 0.0) + step.cpu - step.serialize
+                        )
+                        totals[serialize] = totals.get(serialize, 0.0) + step.serialize
+                    yielded = perf_counter()
+                    yield item
+            finally:
+                if hasattr(frames, "aclose"):
+                    await frames.aclose()
+
+        async def profiled_send(message: dict) -> None:
+            nonlocal yielded
+            started = perf_counter()
+            if yielded is not None:
+                totals[enqueue] = totals.get(enqueue, 0.0) + started - yielded
+                key, yielded = write, None
+            elif message.get("more_body", False):
+                key = ping
+            else:
+                key = write
+            try:
+                await send(message)
+            finally:
+                totals[key] = totals.get(key, 0.0) + perf_counter() - started
+
+        return profiled(), profiled_send
+
+    def folded(self) -> str:
+        """Totals as folded stacks with microsecond counts, largest first"""
+        lines = []
+        for stack, seconds in sorted(self._totals.items(), key=lambda kv: -kv[1]):
+            micros = round(seconds * 1e6)
+            if micros > 0:
+                lines.append(f"{stack} {micros}")
+        return "\n".join(lines) + "\n" if lines else ""
+
+    def reset(self) -> None:
+        self._totals.clear()
@@ -0,0 +1,74 @@
+"""
+Bounded replay history for Last-Event-ID resume.
+
+Channel event ids are consecutive integers, so the frame for an id lives at
+``id % capacity`` and a reconnecting client's missed frames are found without
+searching. The buffer is bounded both by frame count and by total bytes.
+"""
+
+from streaming.frames import Frame
+
+
+class ReplayBuffer:
+    """Fixed-size ring of a channel's most recent frames, indexed by event id"""
+
+    def __init__(self, capacity: int, max_bytes: int = 1024 * 1024) -> None:
+        if capacity < 1:
+            raise ValueError("capacity must be at least 1")
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self._slots: list[Frame | None] = [None] * capacity
+        self._count = 0
+        self.first_id = 0
+        self.last_id = 0
+        self.size = 0
+
+    def __len__(self) -> int:
+        return self._count
+
+    def append(self, event_id: int, frame: Frame) -> None:
+        """Store the frame for the next event id"""
+        if self._count and event_id != self.last_id + 1:
+            # Ids jumped (e.g. frames lost during a broker failover), so older
+            # entries can no longer be addressed by position
+            self.clear()
+        if self._count == self.capacity:
+            self._evict()
+        if not self._count:
+            self.first_id = event_id
+        self._slots[event_id % self.capacity] = frame
+        self.last_id = event_id
+        self._count += 1
+        self.size += len(frame)
+        while self.size > self.max_bytes and self._count > 1:
+            self._evict()
+
+    def since(self, last_id: int) -> tuple[list[Frame], bool]:
+        """
+        Return the frames after ``last_id`` and whether they close the gap.
+        When the client is too far behind, everything still held is returned
+        together with ``False``.
+        """
+        if last_id == self.last_id:
+            return [], True
+        if not self._count or last_id > self.last_id or last_id + 1 < self.first_id:
+            return self._range(self.first_id), False
+        return self._range(last_id + 1), True
+
+    def clear(self) -> None:
+        self._slots = [None] * self.capacity
+        self._count = 0
+        self.size = 0
+
+    def _range(self, start: int) -> list[Frame]:
+        if not self._count:
+            return []
+        slots, capacity = self._slots, self.capacity
+        return [slots[i % capacity] for i in range(start, self.last_id + 1)]
+
+    def _evict(self) -> None:
+        slot = self.first_id % self.capacity
+        self.size -= len(self._slots[slot])
+        self._slots[slot] = None
+        self.first_id += 1
+        self._count -= 1
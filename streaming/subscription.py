@@ -0,0 +1,109 @@
+"""
+Bounded per-subscriber queues with slow-consumer policies.
+
+Fan-out never waits for a subscriber: each one owns a bounded buffer, and when
+that buffer is full its overflow policy decides what to give up. A client on a
+slow link can therefore only hurt itself, never the producer or other clients.
+"""
+
+import asyncio
+from collections import Counter, deque
+from enum import Enum
+
+from streaming.frames import Frame
+
+
+class Policy(str, Enum):
+    """What to do when a subscriber's buffer is full"""
+
+    DROP_OLDEST = "drop_oldest"  # discard the oldest queued frame
+    DROP_NEWEST = "drop_newest"  # discard the incoming frame
+    COALESCE = "coalesce"  # discard everything queued, keep only the newest
+    DISCONNECT = "disconnect"  # drop the incoming frame; close after N overflows
+
+
+# How often each policy fired in this process, plus forced disconnects
+overflow_counts: Counter = Counter()
+
+
+class Subscription:
+    """A subscriber's bounded frame buffer"""
+
+    __slots__ = (
+        "_buffer",
+        "_waiter",
+        "maxsize",
+        "policy",
+        "max_overflows",
+        "overflows",
+        "closed",
+    )
+
+    def __init__(
+        self,
+        maxsize: int = 256,
+        policy: Policy = Policy.DROP_OLDEST,
+        max_overflows: int = 10,
+    ) -> None:
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self._buffer: deque[Frame] = deque()
+        self._waiter: asyncio.Future | None = None
+        self.maxsize = maxsize
+        self.policy = Policy(policy)
+        self.max_overflows = max_overflows
+        self.overflows = 0
+        self.closed = False
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def put(self, frame: Frame) -> None:
+        """Queue a frame without ever blocking the caller"""
+        if self.closed:
+            return
+        buffer = self._buffer
+        if len(buffer) < self.maxsize:
+            buffer.append(frame)
+        else:
+            self.overflows += 1
+            policy = self.policy
+            overflow_counts[policy.value] += 1
+            if policy is Policy.DROP_OLDEST:
+                buffer.popleft()
+                buffer.append(frame)
+            elif policy is Policy.COALESCE:
+                buffer.clear()
+                buffer.append(frame)
+            elif policy is Policy.DISCONNECT and self.overflows >= self.max_overflows:
+                overflow_counts["disconnected"] += 1
+                buffer.clear()
+                self.close()
+                return
+        self._wake()
+
+    def close(self) -> None:
+        """End the subscription once the queued frames have been read"""
+        self.closed = True
+        self._wake()
+
+    async def get(self) -> Frame | None:
+        """Wait for the next frame; ``None`` once the subscription is closed"""
+        while not self._buffer:
+            if self.closed:
+                return None
+            self._waiter = asyncio.get_running_loop().create_future()
+            try:
+                await self._waiter
+            finally:
+                self._waiter = None
+        return self._buffer.popleft()
+
+    def get_nowait(self) -> Frame:
+        """Pop the next queued frame; raises IndexError when the buffer is empty"""
+        return self._buffer.popleft()
+
+    def _wake(self) -> None:
+        waiter = self._waiter
+        if waiter is not None and not waiter.done():
+            waiter.set_result(None)
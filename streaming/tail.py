@@ -0,0 +1,240 @@
+"""
+Shared tailing of application log files.
+
+``shared_tail(path)`` returns the one ``LogTail`` for a file in this process,
+however many streams follow it. A tail runs only while someone subscribes.
+While it runs, it polls the file every ``poll_interval`` and reads whatever
+was appended, in chunks of up to ``chunk_size`` bytes. Each chunk is split
+into lines in one ``bytes.split``.
+
+Each line is parsed once: its level is the first DEBUG/INFO/WARNING/ERROR/
+CRITICAL token near the start of the line, and its JSON payload is serialized
+once. Subscribers are grouped by (filter, format), so one read builds at most
+one frame per group, shared by every subscriber in it:
+
+- ``log`` format: the per-line ``log`` events of the lines the group's filter
+  passes, joined into one write
+- ``log_batch`` format: one event whose data is the JSON array of those lines
+
+Each line is matched against a ``FilterIndex`` of the distinct filters, so
+filtering costs one index lookup per line, not a predicate per subscriber.
+
+A tail starts at the end of the file, like ``tail -f``, and numbers lines from
+there; the numbers are the event ids. It survives rotation:
+when the path starts naming a new file, the rest of the old file is read and
+the new one is followed from its start. A file truncated in place (copytruncate)
+is re-read from its start.
+"""
+
+import asyncio
+import os
+import re
+from collections.abc import AsyncGenerator, Awaitable, Callable
+
+from streaming import serialization
+from streaming.clock import Clock
+from streaming.filters import LEVELS, MATCH_ALL, Filter, FilterIndex
+from streaming.frames import SEPARATOR, Frame
+from streaming.subscription import Policy, Subscription
+
+# Where a line's level is looked for
+LEVEL_SCAN = 64
+_LEVEL = re.compile(r"\b(DEBUG|INFO|WARN(?:ING)?|ERROR|CRITICAL|FATAL)\b")
+_CANONICAL = {"WARN": "WARNING", "FATAL": "CRITICAL"}
+
+
+class LogTail:
+    """Follows one file and fans its new lines out to filtered subscribers"""
+
+    def __init__(
+        self,
+        path: str,
+        service: str | None = None,
+        poll_interval: float = 0.1,
+        chunk_size: int = 1 << 18,
+        queue_size: int = 256,
+        policy: Policy = Policy.DROP_OLDEST,
+        sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+        timestamp: Callable[[], str] | None = None,
+    ) -> None:
+        self.path = path
+        self.service = service or os.path.basename(path)
+        self.poll_interval = poll_interval
+        self.chunk_size = chunk_size
+        self.queue_size = queue_size
+        self.policy = policy
+        self.sleep = sleep
+        self.timestamp = timestamp or Clock().timestamp
+        # (filter, batch format) -> subscriptions
+        self.groups: dict[tuple[Filter, bool], set[Subscription]] = {}
+        self.index = FilterIndex()
+        self.line_number = 0
+        self.rotations = 0
+        self.truncations = 0
+        self._fd: int | None = None
+        self._position = 0
+        self._partial = b""
+        self._task: asyncio.Task | None = None
+
+    @property
+    def subscribers(self) -> int:
+        return sum(map(len, self.groups.values()))
+
+    async def stream(
+        self, filter: Filter = MATCH_ALL, batch: bool = False
+    ) -> AsyncGenerator[Frame, None]:
+        """Yield frames of the new lines ``filter`` passes until the client leaves"""
+        key = (filter, batch)
+        subscription = Subscription(self.queue_size, self.policy)
+        self.groups.setdefault(key, set()).add(subscription)
+        self.index.add(filter)
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        try:
+            while True:
+                frame = await subscription.get()
+                if frame is None:
+                    return
+                yield frame
+        finally:
+            self.index.remove(filter)
+            group = self.groups[key]
+            group.discard(subscription)
+            if not group:
+                del self.groups[key]
+            if not self.groups and self._task is not None:
+                self._task.cancel()
+                self._task = None
+                self._close()
+
+    async def _run(self) -> None:
+        while True:
+            if self._fd is None:
+                self._open(at_end=True)
+            while self._fd is not None:
+                data = os.read(self._fd, self.chunk_size)
+                if not data:
+                    break
+                self._position += len(data)
+                self.feed(data)
+                # A backlog is worked off a chunk per loop turn, not in one go
+                await asyncio.sleep(0)
+            self._check_rotation()
+            await self.sleep(self.poll_interval)
+
+    def _open(self, at_end: bool) -> None:
+        try:
+            self._fd = os.open(self.path, os.O_RDONLY)
+        except FileNotFoundError:
+            return
+        self._position = os.lseek(self._fd, 0, os.SEEK_END) if at_end else 0
+        self._partial = b""
+
+    def _close(self) -> None:
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _check_rotation(self) -> None:
+        # Called at end of file, so nothing unread is left in the current one
+        if self._fd is None:
+            return
+        try:
+            named = os.stat(self.path)
+        except FileNotFoundError:
+            # Rotated away and not recreated yet; keep the old file until it is
+            return
+        current = os.fstat(self._fd)
+        if (named.st_ino, named.st_dev) != (current.st_ino, current.st_dev):
+            self.rotations += 1
+            self._close()
+            self._open(at_end=False)
+        elif current.st_size < self._position:
+            self.truncations += 1
+            self._position = os.lseek(self._fd, 0, os.SEEK_SET)
+            self._partial = b""
+
+    def feed(self, data: bytes) -> None:
+        """Split appended bytes into lines and publish the complete ones"""
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        if not lines or not self.groups:
+            self.line_number += len(lines)
+            return
+        dumps = serialization.serializer.dumps
+        search = _LEVEL.search
+        stamp = self.timestamp()
+        service = self.service
+        number = self.line_number
+        # [line number, JSON payload, encoded log event or None], by matching filter
+        matched: dict[Filter, list[list]] = {}
+        match = self.index.match
+        for raw in lines:
+            number += 1
+            text = raw.decode("utf-8", "replace").rstrip("\r")
+            if not text:
+                continue
+            match = search(text, 0, LEVEL_SCAN)
+            if match is None:
+                level, rank = "UNKNOWN", 0
+            else:
+                level = match.group(1)
+                rank = LEVELS[level]
+                level = _CANONICAL.get(level, level)
+            payload = {
+                "level": level,
+                "message": text,
+                "timestamp": stamp,
+                "line_number": number,
+                "service": service,
+            }
+            filters = match(payload, rank)
+            if not filters:
+                continue
+            record = [number, dumps(payload), None]
+            for filter in filters:
+                if filter in matched:
+                    matched[filter].append(record)
+                else:
+                    matched[filter] = [record]
+        self.line_number = number
+        if matched:
+            self._publish(matched)
+
+    def _publish(self, matched: dict[Filter, list[list]]) -> None:
+        for (filter, batch), group in self.groups.items():
+            selected = matched.get(filter)
+            if not selected:
+                continue
+            last = str(selected[-1][0])
+            if batch:
+                data = "[" + ",".join(r[1] for r in selected) + "]"
+                frame = Frame.build("log_batch", data, last)
+            else:
+                events = []
+                for record in selected:
+                    # Each line's log event is encoded once, for every group
+                    if record[2] is None:
+                        record[2] = _log_event(record[0], record[1])
+                    events.append(record[2])
+                frame = Frame(b"".join(events), "log", None, last)
+            for subscription in group:
+                subscription.put(frame)
+
+
+def _log_event(number: int, data: str) -> bytes:
+    # The layout of frames.encode for an id, the log event name and one data line
+    sep = SEPARATOR
+    return f"id: {number}{sep}event: log{sep}data: {data}{sep}{sep}".encode()
+
+
+_tails: dict[str, LogTail] = {}
+
+
+def shared_tail(path: str, **options) -> LogTail:
+    """The process's one LogTail for ``path``; ``options`` apply on first use"""
+    key = os.path.realpath(path)
+    tail = _tails.get(key)
+    if tail is None:
+        tail = _tails[key] = LogTail(path, **options)
+    return tail
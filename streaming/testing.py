@@ -0,0 +1,193 @@
+"""
+In-process ASGI client for exercising SSE endpoints.
+
+``httpx.ASGITransport`` only returns a response once the app has finished, so
+it cannot read an endless stream. ``ASGIClient`` calls the app directly and
+hands out body chunks as the app sends them. Use it with ``VirtualClock`` to run
+long streams in virtual time:
+
+    async def main():
+        async with ASGIClient(app) as client:
+            async with client.stream("/stream/simple") as response:
+                async for event in response.events():
+                    ...
+
+    VirtualClock().run(main())
+
+The client runs the app's lifespan on enter and exit. Leaving a ``stream()``
+block disconnects that request, just as a browser closing the tab would.
+"""
+
+import asyncio
+from collections.abc import AsyncGenerator, AsyncIterator, Mapping
+from contextlib import asynccontextmanager
+from dataclasses import dataclass, field
+
+from streaming.parser import Event, SSEParser
+
+try:
+    from sse_starlette.sse import AppStatus
+except ImportError:  # pragma: no cover - sse-starlette is only needed by app.py
+    AppStatus = None
+
+
+@dataclass
+class Response:
+    """Status, headers and, for ``get()``, the full body of a response"""
+
+    status_code: int
+    headers: dict[str, str]
+    body: bytes = b""
+    _messages: asyncio.Queue | None = field(default=None, repr=False)
+    _task: asyncio.Task | None = field(default=None, repr=False)
+
+    async def aiter_bytes(self) -> AsyncIterator[bytes]:
+        """Body chunks as the app sends them"""
+        while True:
+            message = await _next_message(self._messages, self._task)
+            if message is None:
+                return
+            if message["type"] != "http.response.body":
+                continue
+            if message.get("body"):
+                yield message["body"]
+            if not message.get("more_body", False):
+                return
+
+    async def events(self) -> AsyncIterator[Event]:
+        """The body parsed as server-sent events"""
+        parser = SSEParser()
+        async for chunk in self.aiter_bytes():
+            for event in parser.feed(chunk):
+                yield event
+
+
+async def _next_message(queue: asyncio.Queue, task: asyncio.Task) -> dict | None:
+    """Next message the app sent, or None once it has returned"""
+    if not queue.empty() or not task.done():
+        getter = asyncio.ensure_future(queue.get())
+        await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+        if getter.done():
+            return getter.result()
+        getter.cancel()
+    if not queue.empty():
+        return queue.get_nowait()
+    # Surface the app's own exception instead of a silent end of stream
+    task.result()
+    return None
+
+
+class ASGIClient:
+    """Drives an ASGI app in process, streaming responses as they are sent"""
+
+    def __init__(self, app, client: tuple[str, int] = ("127.0.0.1", 50000)) -> None:
+        self.app = app
+        self.client = client
+        self._state: dict = {}
+        self._lifespan: asyncio.Task | None = None
+        self._lifespan_in: asyncio.Queue = asyncio.Queue()
+        self._lifespan_out: asyncio.Queue = asyncio.Queue()
+
+    async def __aenter__(self) -> "ASGIClient":
+        if AppStatus is not None:
+            # sse-starlette keeps one exit event per process, bound to the
+            # loop that created it; each run here gets a fresh loop
+            AppStatus.should_exit_event = None
+        scope = {"type": "lifespan", "asgi": {"version": "3.0"}, "state": self._state}
+        self._lifespan = asyncio.create_task(
+            self.app(scope, self._lifespan_in.get, self._lifespan_out.put)
+        )
+        await self._lifespan_in.put({"type": "lifespan.startup"})
+        message = await self._lifespan_out.get()
+        if message["type"] != "lifespan.startup.complete":
+            raise RuntimeError(message.get("message", "lifespan startup failed"))
+        return self
+
+    async def __aexit__(self, *exc_info) -> None:
+        await self._lifespan_in.put({"type": "lifespan.shutdown"})
+        await self._lifespan_out.get()
+        await self._lifespan
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        path: str,
+        headers: Mapping[str, str] | None = None,
+        method: str = "GET",
+    ) -> AsyncGenerator[Response, None]:
+        """Send a request and yield the response as soon as its headers arrive"""
+        messages: asyncio.Queue = asyncio.Queue()
+        disconnected = asyncio.Event()
+        requested = False
+
+        async def receive() -> dict:
+            nonlocal requested
+            if not requested:
+                requested = True
+                return {"type": "http.request", "body": b"", "more_body": False}
+            await disconnected.wait()
+            return {"type": "http.disconnect"}
+
+        task = asyncio.create_task(
+            self.app(self._scope(method, path, headers), receive, messages.put)
+        )
+        try:
+            start = await _next_message(messages, task)
+            if start is None:
+                raise RuntimeError(f"{path} returned without a response")
+            yield Response(
+                start["status"],
+                {
+                    name.decode("latin-1"): value.decode("latin-1")
+                    for name, value in start.get("headers", [])
+                },
+                _messages=messages,
+                _task=task,
+            )
+        finally:
+            disconnected.set()
+            try:
+                await task
+            except asyncio.CancelledError:
+                if not task.cancelled():
+                    raise
+
+    async def request(
+        self, method: str, path: str, headers: Mapping[str, str] | None = None
+    ) -> Response:
+        """Send a request without a body and read the whole response"""
+        async with self.stream(path, headers, method) as response:
+            response.body = b"".join([chunk async for chunk in response.aiter_bytes()])
+        return response
+
+    async def get(self, path: str, headers: Mapping[str, str] | None = None) -> Response:
+        """Send a GET and read the whole response"""
+        return await self.request("GET", path, headers)
+
+    async def post(self, path: str, headers: Mapping[str, str] | None = None) -> Response:
+        """Send a POST with an empty body and read the whole response"""
+        return await self.request("POST", path, headers)
+
+    def _scope(
+        self, method: str, path: str, headers: Mapping[str, str] | None
+    ) -> dict:
+        path, _, query = path.partition("?")
+        return {
+            "type": "http",
+            "asgi": {"version": "3.0"},
+            "http_version": "1.1",
+            "method": method,
+            "scheme": "http",
+            "path": path,
+            "raw_path": path.encode(),
+            "query_string": query.encode(),
+            "root_path": "",
+            "headers": [(b"host", b"testserver")]
+            + [
+                (name.lower().encode("latin-1"), value.encode("latin-1"))
+                for name, value in (headers or {}).items()
+            ],
+            "client": self.client,
+            "server": ("testserver", 80),
+            "state": dict(self._state),
+        }
@@ -0,0 +1,103 @@
+"""
+A hashed timer wheel for per-connection ticks and keep-alive pings.
+
+``asyncio.sleep`` puts a ``TimerHandle`` on the event loop's heap for every
+sleeper. With every connection sleeping between events and between pings,
+50k connections keep 100k entries on that heap, and each wake-up costs a
+heap pop. ``TimerWheel.sleep`` instead appends a future to the list slot of
+its deadline tick. The wheel itself holds a single loop timer, set for the
+next occupied tick, and when it fires it wakes every sleeper due in that tick
+in one batch.
+
+Deadlines are rounded up to the next tick, so a sleep can last up to one tick
+longer than asked. Ticks are counted from a fixed origin, so sleeps that start
+on a tick and last a whole number of ticks stay exact, with no drift. A delay
+shorter than a tick falls back to ``asyncio.sleep``, for producers that need
+finer timing.
+"""
+
+import asyncio
+import math
+
+
+class TimerWheel:
+    """Batches sleeps into ``tick``-second slots behind one event loop timer"""
+
+    def __init__(self, tick: float = 0.1, slots: int = 512) -> None:
+        if tick <= 0 or slots < 1:
+            raise ValueError("tick and slots must be positive")
+        self.tick = tick
+        # (deadline tick, future) pairs; a slot holds every tick ≡ index mod slots
+        self._slots: list[list[tuple[int, asyncio.Future]]] = [[] for _ in range(slots)]
+        # Sleepers in the slots, including cancelled ones not yet swept
+        self.pending = 0
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._origin = 0.0
+        # First tick not yet processed
+        self._cursor = 0
+        self._handle: asyncio.TimerHandle | None = None
+        self._next: int | None = None
+
+    async def sleep(self, seconds: float) -> None:
+        """Sleep until the first tick at least ``seconds`` away"""
+        if seconds < self.tick:
+            await asyncio.sleep(seconds)
+            return
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            self._reset(loop)
+        # Rounded first, so float error cannot push an exact deadline a tick late
+        target = math.ceil(round((loop.time() + seconds - self._origin) / self.tick, 6))
+        target = max(target, self._cursor)
+        future = loop.create_future()
+        self._slots[target % len(self._slots)].append((target, future))
+        self.pending += 1
+        if self._next is None or target < self._next:
+            self._schedule(target)
+        await future
+
+    def _reset(self, loop: asyncio.AbstractEventLoop) -> None:
+        # A new event loop (tests run one per case): futures of the old one are dead
+        if self._handle is not None:
+            self._handle.cancel()
+        for slot in self._slots:
+            slot.clear()
+        self.pending = 0
+        self._loop = loop
+        self._origin = loop.time()
+        self._cursor = 0
+        self._handle = self._next = None
+
+    def _schedule(self, target: int) -> None:
+        if self._handle is not None:
+            self._handle.cancel()
+        self._next = target
+        self._handle = self._loop.call_at(self._origin + target * self.tick, self._fire)
+
+    def _fire(self) -> None:
+        self._handle = self._next = None
+        slots = self._slots
+        size = len(slots)
+        now = math.floor((self._loop.time() - self._origin) / self.tick + 1e-6)
+        # After a long idle gap every slot is visited once, not once per tick
+        for tick in range(max(self._cursor, now - size + 1), now + 1):
+            slot = slots[tick % size]
+            if not slot:
+                continue
+            later = []
+            for entry in slot:
+                if entry[0] > now:
+                    # Due in a later turn of the wheel
+                    later.append(entry)
+                    continue
+                future = entry[1]
+                if not future.done():
+                    future.set_result(None)
+            self.pending -= len(slot) - len(later)
+            slots[tick % size] = later
+        self._cursor = max(self._cursor, now + 1)
+        if self.pending:
+            for offset in range(size):
+                if slots[(self._cursor + offset) % size]:
+                    self._schedule(self._cursor + offset)
+                    break
@@ -0,0 +1,233 @@
+"""
+Inter-worker transports for the broadcast hub.
+
+With ``uvicorn app:app --workers 4`` every worker is a separate process with its
+own hub. A transport carries each published frame to the other workers so that
+one producer can serve clients connected anywhere. ``UnixSocketTransport`` needs
+no outside services: the first worker to grab a lock file becomes the broker and
+the others connect to it over a Unix-domain socket. If the broker exits, the
+remaining workers elect a new one the same way.
+"""
+
+import asyncio
+import os
+import socket
+import struct
+import tempfile
+from collections.abc import Callable, Iterable
+
+from streaming.frames import Frame
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+# Called with (channel name, frame) for every frame that arrives from a peer
+Deliver = Callable[[str, Frame], None]
+
+# Length prefixes for channel, event, id and data in every message
+_HEADER = struct.Struct("!HHHI")
+
+# Peers whose socket buffer grows beyond this are dropped and reconnect
+MAX_PEER_BUFFER = 8 * 1024 * 1024
+
+
+def encode_message(channel: str, frame: Frame) -> bytes:
+    """Pack a frame's fields for the wire; receivers rebuild the SSE bytes"""
+    name = channel.encode()
+    event = (frame.event or "").encode()
+    event_id = (frame.id or "").encode()
+    data = (frame.data or "").encode()
+    return b"".join(
+        (_HEADER.pack(len(name), len(event), len(event_id), len(data)), name, event, event_id, data)
+    )
+
+
+async def read_message(reader: asyncio.StreamReader) -> tuple[str, Frame, bytes]:
+    """Read one message written by ``encode_message``, also returning its raw bytes"""
+    header = await reader.readexactly(_HEADER.size)
+    name_len, event_len, id_len, data_len = _HEADER.unpack(header)
+    body = await reader.readexactly(name_len + event_len + id_len + data_len)
+    view = memoryview(body)
+    name = str(view[:name_len], "utf-8")
+    offset = name_len
+    event = str(view[offset : offset + event_len], "utf-8") or None
+    offset += event_len
+    event_id = str(view[offset : offset + id_len], "utf-8") or None
+    offset += id_len
+    data = str(view[offset:], "utf-8")
+    return name, Frame.build(event, data, event_id), header + body
+
+
+class Transport:
+    """Base class: delivers frames published in one worker to all workers"""
+
+    # Only the leader runs channel producers
+    leader = True
+
+    async def start(
+        self,
+        deliver: Deliver,
+        on_leader: Callable[[], None],
+        snapshot: Callable[[], Iterable[tuple[str, Frame]]],
+    ) -> None:
+        self.deliver = deliver
+        self.on_leader = on_leader
+        self.snapshot = snapshot
+        on_leader()
+
+    def publish(self, channel: str, frame: Frame) -> None:
+        """Send a locally published frame to the other workers"""
+
+    async def close(self) -> None:
+        pass
+
+
+class LocalTransport(Transport):
+    """Single-process transport: there are no other workers to reach"""
+
+
+class UnixSocketTransport(Transport):
+    """Broker-over-Unix-socket transport with lock-file leader election"""
+
+    leader = False
+
+    def __init__(self, path: str, retry_interval: float = 0.05) -> None:
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.retry_interval = retry_interval
+        self._lock_fd: int | None = None
+        self._server: asyncio.AbstractServer | None = None
+        self._peers: set[asyncio.StreamWriter] = set()
+        self._writer: asyncio.StreamWriter | None = None
+        self._reader_task: asyncio.Task | None = None
+        self._closing = False
+
+    async def start(self, deliver, on_leader, snapshot) -> None:
+        self.deliver = deliver
+        self.on_leader = on_leader
+        self.snapshot = snapshot
+        await self._join()
+
+    def publish(self, channel: str, frame: Frame) -> None:
+        message = encode_message(channel, frame)
+        if self.leader:
+            self._broadcast(message)
+        elif self._writer is not None:
+            self._writer.write(message)
+        # Otherwise a new broker is being elected and the frame only reaches
+        # this worker's own subscribers
+
+    async def close(self) -> None:
+        self._closing = True
+        if self._reader_task is not None:
+            self._reader_task.cancel()
+        if self._writer is not None:
+            self._writer.close()
+        for peer in list(self._peers):
+            peer.close()
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            try:
+                os.unlink(self.path)
+            except FileNotFoundError:
+                pass
+        if self._lock_fd is not None:
+            os.close(self._lock_fd)
+            self._lock_fd = None
+        self.leader = False
+
+    async def _join(self) -> None:
+        """Become the broker if the lock is free, otherwise connect to it"""
+        while not self._closing:
+            if self._try_lock():
+                await self._serve()
+                return
+            try:
+                reader, writer = await asyncio.open_unix_connection(self.path)
+            except OSError:
+                # The broker holds the lock but has not bound the socket yet
+                await asyncio.sleep(self.retry_interval)
+                continue
+            self._writer = writer
+            self._reader_task = asyncio.create_task(self._follow(reader))
+            return
+
+    def _try_lock(self) -> bool:
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        self._lock_fd = fd
+        return True
+
+    async def _serve(self) -> None:
+        # Whoever holds the lock owns the socket path, so a leftover is stale
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+        self._server = await asyncio.start_unix_server(self._accept, path=self.path)
+        self.leader = True
+        self.on_leader()
+
+    async def _accept(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        for channel, frame in self.snapshot():
+            writer.write(encode_message(channel, frame))
+        self._peers.add(writer)
+        try:
+            while True:
+                channel, frame, message = await read_message(reader)
+                self._broadcast(message, exclude=writer)
+                self.deliver(channel, frame)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            self._peers.discard(writer)
+            writer.close()
+
+    async def _follow(self, reader: asyncio.StreamReader) -> None:
+        try:
+            while True:
+                channel, frame, _ = await read_message(reader)
+                self.deliver(channel, frame)
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        if self._closing:
+            return
+        # The broker went away: elect a new one and reconnect
+        self._writer.close()
+        self._writer = None
+        await self._join()
+
+    def _broadcast(
+        self, message: bytes, exclude: asyncio.StreamWriter | None = None
+    ) -> None:
+        for peer in list(self._peers):
+            if peer is exclude:
+                continue
+            if peer.transport.get_write_buffer_size() > MAX_PEER_BUFFER:
+                self._peers.discard(peer)
+                peer.close()
+                continue
+            peer.write(message)
+
+
+def create_transport() -> Transport:
+    """Build the transport selected by SSE_TRANSPORT (``unix`` or ``local``)"""
+    default = "unix" if hasattr(socket, "AF_UNIX") and fcntl is not None else "local"
+    kind = os.environ.get("SSE_TRANSPORT", default).lower()
+    if kind == "local":
+        return LocalTransport()
+    if kind == "unix":
+        path = os.environ.get(
+            "SSE_BROKER_PATH", os.path.join(tempfile.gettempdir(), "streaming_sse.sock")
+        )
+        return UnixSocketTransport(path)
+    raise ValueError(f"Unknown SSE_TRANSPORT: {kind!r}")
@@ -1,262 +1,443 @@
 #!/usr/bin/env python3
 """
-Test script for FastAPI SSE Streaming Examples
-This script tests all SSE endpoints to ensure they work correctly.
+Tests for the FastAPI SSE streaming endpoints.
+
+Every test runs the app in process on a VirtualClock, so streams that take
+seconds or minutes of real time finish in milliseconds. The simulated data is
+seeded, which makes each run send exactly the same bytes.
 """
 
+import asyncio
+import importlib
 import json
-import time
-
-import requests
-
-
-def test_health_endpoint():
-    """Test the health check endpoint"""
-    print("🔍 Testing health endpoint...")
-    try:
-        response = requests.get("http://localhost:8000/health")
-        if response.status_code == 200:
-            data = response.json()
-            print(f"✅ Health check passed: {data['status']}")
-            return True
-        else:
-            print(f"❌ Health check failed: {response.status_code}")
-            return False
-    except Exception as e:
-        print(f"❌ Health check error: {e}")
-        return False
-
-
-def test_simple_stream():
-    """Test the simple stream endpoint"""
-    print("\n🔍 Testing simple stream...")
-    try:
-        response = requests.get("http://localhost:8000/stream/simple", stream=True)
-        if response.status_code == 200:
-            message_count = 0
-            for line in response.iter_lines():
-                if line:
-                    line_str = line.decode("utf-8")
-                    if line_str.startswith("data: "):
-                        data = json.loads(line_str[6:])
-                        message_count += 1
-                        print(f"📨 Message {message_count}: {data['message']}")
-
-                        if data.get("count", 0) == 10:
-                            print("✅ Simple stream completed successfully")
-                            return True
-            print("❌ Simple stream did not complete as expected")
-            return False
-        else:
-            print(f"❌ Simple stream failed: {response.status_code}")
-            return False
-    except Exception as e:
-        print(f"❌ Simple stream error: {e}")
-        return False
-
-
-def test_progress_stream():
-    """Test the progress stream endpoint"""
-    print("\n🔍 Testing progress stream...")
-    try:
-        response = requests.get("http://localhost:8000/stream/progress", stream=True)
-        if response.status_code == 200:
-            progress_events = 0
-            iterator = response.iter_lines()
-            for line in iterator:
-                if line:
-                    line_str = line.decode("utf-8")
-                    if line_str.startswith("event: progress"):
-                        # Get the next line which should contain the data
-                        try:
-                            next_line = next(iterator)
-                            if next_line:
-                                next_line_str = next_line.decode("utf-8")
-                                if next_line_str.startswith("data: "):
-                                    data = json.loads(next_line_str[6:])
-                                    progress_events += 1
-                                    print(
-                                        f"📊 Progress {data['percentage']}%: {data['message']}"
-                                    )
-
-                                    if data["percentage"] == 100.0:
-                                        print("✅ Progress stream completed successfully")
-                                        return True
-                        except StopIteration:
-                            break
-            print("❌ Progress stream did not complete as expected")
-            return False
-        else:
-            print(f"❌ Progress stream failed: {response.status_code}")
-            return False
-    except Exception as e:
-        print(f"❌ Progress stream error: {e}")
-        return False
-
-
-def test_realtime_stream():
-    """Test the realtime stream endpoint"""
-    print("\n🔍 Testing realtime stream...")
-    try:
-        response = requests.get("http://localhost:8000/stream/realtime", stream=True)
-        if response.status_code == 200:
-            sensor_events = 0
-            start_time = time.time()
-            iterator = response.iter_lines()
-            
-            for line in iterator:
-                if line:
-                    line_str = line.decode("utf-8")
-                    if line_str.startswith("event: sensor_data"):
-                        # Get the next line which should contain the data
-                        try:
-                            next_line = next(iterator)
-                            if next_line:
-                                next_line_str = next_line.decode("utf-8")
-                                if next_line_str.startswith("data: "):
-                                    data = json.loads(next_line_str[6:])
-                                    sensor_events += 1
-                                    print(
-                                        f"🌡️ Sensor data {sensor_events}: {data['temperature']}°C, {data['humidity']}%, {data['pressure']}hPa"
-                                    )
-                                    
-                                    # Test for 5 seconds
-                                    if time.time() - start_time > 5:
-                                        print(
-                                            "✅ Realtime stream working (tested for 5 seconds)"
-                                        )
-                                        return True
-                        except StopIteration:
-                            break
-            print("❌ Realtime stream did not work as expected")
-            return False
-        else:
-            print(f"❌ Realtime stream failed: {response.status_code}")
-            return False
-    except Exception as e:
-        print(f"❌ Realtime stream error: {e}")
-        return False
-
-
-def test_chat_stream():
-    """Test the chat stream endpoint"""
-    print("\n🔍 Testing chat stream...")
-    try:
-        response = requests.get("http://localhost:8000/stream/chat", stream=True)
-        if response.status_code == 200:
-            messages_received = 0
-            iterator = response.iter_lines()
-            for line in iterator:
-                if line:
-                    line_str = line.decode("utf-8")
-                    if line_str.startswith("event: message"):
-                        # Get the next line which should contain the data
-                        try:
-                            next_line = next(iterator)
-                            if next_line:
-                                next_line_str = next_line.decode("utf-8")
-                                if next_line_str.startswith("data: "):
-                                    data = json.loads(next_line_str[6:])
-                                    messages_received += 1
-                                    print(
-                                        f"💬 Chat message {messages_received}: {data['text'][:50]}..."
-                                    )
-                                    
-                                    if messages_received >= 5:
-                                        print("✅ Chat stream completed successfully")
-                                        return True
-                        except StopIteration:
-                            break
-            print("❌ Chat stream did not complete as expected")
-            return False
-        else:
-            print(f"❌ Chat stream failed: {response.status_code}")
-            return False
-    except Exception as e:
-        print(f"❌ Chat stream error: {e}")
-        return False
-
-
-def test_log_stream():
-    """Test the log stream endpoint"""
-    print("\n🔍 Testing log stream...")
-    try:
-        response = requests.get("http://localhost:8000/stream/logs", stream=True)
-        if response.status_code == 200:
-            log_events = 0
-            iterator = response.iter_lines()
-            for line in iterator:
-                if line:
-                    line_str = line.decode("utf-8")
-                    if line_str.startswith("event: log"):
-                        # Get the next line which should contain the data
-                        try:
-                            next_line = next(iterator)
-                            if next_line:
-                                next_line_str = next_line.decode("utf-8")
-                                if next_line_str.startswith("data: "):
-                                    data = json.loads(next_line_str[6:])
-                                    log_events += 1
-                                    print(
-                                        f"📝 Log {log_events} [{data['level']}]: {data['message']}"
-                                    )
-                                    
-                                    if log_events >= 10:
-                                        print("✅ Log stream working (received 10+ logs)")
-                                        return True
-                        except StopIteration:
-                            break
-            print("❌ Log stream did not work as expected")
-            return False
-        else:
-            print(f"❌ Log stream failed: {response.status_code}")
-            return False
-    except Exception as e:
-        print(f"❌ Log stream error: {e}")
-        return False
-
-
-def main():
-    """Run all tests"""
-    print("🚀 Starting FastAPI SSE Streaming Tests")
-    print("=" * 50)
-
-    # Check if server is running
-    if not test_health_endpoint():
-        print("\n❌ Server is not running. Please start the server first:")
-        print("   python main.py")
-        return
-
-    # Run all stream tests
-    tests = [
-        test_simple_stream,
-        test_progress_stream,
-        test_realtime_stream,
-        test_chat_stream,
-        test_log_stream,
+import zlib
+from datetime import datetime
+
+import pytest
+
+from streaming import (
+    AdmissionControl,
+    Clock,
+    DeltaDecoder,
+    SSEParser,
+    StreamCompression,
+    VirtualClock,
+    shared_tail,
+)
+from streaming.testing import ASGIClient
+
+SEED = 1234
+
+
+def load_app():
+    """A freshly imported app on its own virtual clock, with seeded data"""
+    import app
+
+    module = importlib.reload(app)
+    module.clock = VirtualClock()
+    module.rng.seed(SEED)
+    return module
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setenv("SSE_TRANSPORT", "local")
+    return load_app()
+
+
+def run(server, scenario):
+    """Run ``scenario(client)`` against the app in virtual time"""
+
+    async def main():
+        async with ASGIClient(server.app) as client:
+            return await scenario(client)
+
+    return server.clock.run(main())
+
+
+async def collect(client, path, limit=None, headers=None):
+    """Events of a stream until it ends or ``limit`` have arrived"""
+    events = []
+    async with client.stream(path, headers) as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        async for event in response.events():
+            events.append(event)
+            if len(events) == limit:
+                break
+    return events
+
+
+def timestamps(events, key="timestamp"):
+    return [datetime.fromisoformat(json.loads(event.data)[key]) for event in events]
+
+
+def test_health_endpoint(server):
+    """The health check answers with the virtual time"""
+    response = run(server, lambda client: client.get("/health"))
+
+    assert response.status_code == 200
+    data = json.loads(response.body)
+    assert data["status"] == "healthy"
+    assert data["timestamp"] == "2024-01-01T00:00:00"
+
+
+def test_simple_stream(server):
+    """Ten messages one second apart, then a completion event"""
+    events = run(server, lambda client: collect(client, "/stream/simple"))
+
+    messages = [json.loads(event.data) for event in events[:-1]]
+    assert [message["count"] for message in messages] == list(range(1, 11))
+    assert [event.id for event in events[:-1]] == [str(i) for i in range(1, 11)]
+    assert events[-1].event == "complete"
+    assert server.clock.elapsed == pytest.approx(10)
+
+
+def test_simple_stream_resumes_after_last_event_id(server):
+    """A reconnecting client only gets the messages it missed"""
+    events = run(
+        server,
+        lambda client: collect(client, "/stream/simple", headers={"Last-Event-ID": "7"}),
+    )
+
+    assert [json.loads(event.data)["count"] for event in events[:-1]] == [8, 9, 10]
+
+
+def test_progress_stream(server):
+    """Progress runs from 0 to 100 percent in 5% steps"""
+    events = run(server, lambda client: collect(client, "/stream/progress"))
+
+    progress = [json.loads(event.data) for event in events]
+    assert all(event.event == "progress" for event in events)
+    assert [step["percentage"] for step in progress] == [i * 5.0 for i in range(21)]
+    assert progress[-1]["status"] == "completed"
+    assert server.clock.elapsed == pytest.approx(10.5)
+
+
+def test_job_progress_stream(server):
+    """A submitted job's progress reaches every watcher, then its result"""
+    # Pool work takes real time, so this one runs on the real clock
+    server.clock = Clock()
+    server.jobs.poll_interval = 0.02
+
+    async def scenario(client):
+        response = await client.post("/jobs?steps=5&rounds=1000")
+        job = json.loads(response.body)
+        watchers = [collect(client, job["stream"]) for _ in range(2)]
+        streams = await asyncio.gather(*watchers)
+        status = await client.get(f"/jobs/{job['job_id']}")
+        missing = await client.get("/stream/progress/unknown")
+        return response, streams, json.loads(status.body), missing
+
+    async def main():
+        async with ASGIClient(server.app) as client:
+            return await scenario(client)
+
+    response, streams, status, missing = asyncio.run(main())
+
+    assert response.status_code == 202
+    assert status["status"] == "completed"
+    assert status["current_step"] == status["total_steps"] == 5
+    for events in streams:
+        assert events[-1].event == "complete"
+        assert json.loads(events[-1].data)["result"] == status["result"]
+        progress = [json.loads(event.data) for event in events[:-1]]
+        assert progress[-1]["percentage"] == 100.0
+    assert missing.status_code == 404
+
+
+def test_realtime_stream(server):
+    """Thirty sensor readings within range, one per second"""
+    events = run(server, lambda client: collect(client, "/stream/realtime"))
+
+    assert len(events) == 30
+    readings = [json.loads(event.data) for event in events]
+    assert all(20 <= reading["temperature"] <= 30 for reading in readings)
+    assert all(40 <= reading["humidity"] <= 80 for reading in readings)
+    assert all(1000 <= reading["pressure"] <= 1020 for reading in readings)
+    stamps = timestamps(events)
+    assert {(b - a).total_seconds() for a, b in zip(stamps, stamps[1:])} == {1.0}
+
+
+def test_realtime_stream_conflated(server):
+    """With max_hz the stream never sends faster than asked"""
+    events = run(
+        server, lambda client: collect(client, "/stream/realtime?max_hz=5", limit=20)
+    )
+
+    assert len(events) == 20
+    ids = [int(event.id) for event in events]
+    assert ids == sorted(set(ids))
+    assert server.clock.elapsed == pytest.approx(19 / 5)
+
+
+@pytest.mark.parametrize("query", ["", "max_hz=5&"])
+def test_realtime_stream_delta_encoding(monkeypatch, query):
+    """Delta events decode to exactly the readings the full stream sends"""
+    monkeypatch.setenv("SSE_TRANSPORT", "local")
+
+    def stream(path):
+        return run(load_app(), lambda client: collect(client, path, limit=25))
+
+    full = stream(f"/stream/realtime?{query}")
+    delta = stream(f"/stream/realtime?{query}encoding=delta")
+
+    decoder = DeltaDecoder()
+    decoded = [
+        decoder.decode(event.event.removeprefix("sensor_"), json.loads(event.data))
+        for event in delta
     ]
+    assert [event.event for event in delta[:2]] == ["sensor_schema", "sensor_delta"]
+    assert decoded == [json.loads(event.data) for event in full]
+    assert [event.id for event in delta] == [event.id for event in full]
+    assert sum(len(e.data) for e in delta) < sum(len(e.data) for e in full) / 3
+
+
+def test_compressed_stream_flushes_every_event(server):
+    """Each gzip chunk decodes to whole events as soon as it arrives"""
+    server.compression = StreamCompression(("gzip", "deflate"))
+
+    async def scenario(client):
+        chunks = []
+        headers = {"Accept-Encoding": "deflate;q=0.5, gzip"}
+        async with client.stream("/stream/logs", headers) as response:
+            assert response.headers["content-encoding"] == "gzip"
+            assert response.headers["vary"] == "Accept-Encoding"
+            chunks = [chunk async for chunk in response.aiter_bytes()]
+        return chunks, await collect(client, "/stream/logs")
+
+    chunks, plain = run(server, scenario)
+
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    parser = SSEParser()
+    events = []
+    # The stream opens with its retry hint, before the first event
+    assert parser.feed(decompressor.decompress(chunks[0])) == []
+    assert parser.retry is not None
+    for chunk in chunks[1:-1]:
+        # Nothing may wait in the compressor for a later event
+        decoded = parser.feed(decompressor.decompress(chunk))
+        assert decoded, chunk
+        events.extend(decoded)
+    # The closing empty body only carries the gzip trailer
+    assert parser.feed(decompressor.decompress(chunks[-1])) == []
+    assert decompressor.eof
+    assert len(events) == len(plain) == 15
+    assert sum(map(len, chunks)) < sum(len(e.data) for e in events) / 2
+
+
+def test_compression_respects_caps(server):
+    """Clients are served uncompressed once the stream cap is reached"""
+    server.compression = StreamCompression(("gzip",), max_streams=0)
+
+    async def scenario(client):
+        headers = {"Accept-Encoding": "gzip"}
+        async with client.stream("/stream/simple", headers) as response:
+            return response.headers.get("content-encoding")
+
+    assert run(server, scenario) is None
+
+
+def test_admission_limits_streams(server):
+    """Streams over a limit get a fast 503 with Retry-After; health shows occupancy"""
+    server.admission = AdmissionControl(max_streams=3, max_per_client=2, rng=server.rng)
+
+    async def scenario(client):
+        other = ASGIClient(server.app, client=("10.0.0.2", 50000))
+        async with client.stream("/stream/datetime") as first:
+            async with client.stream("/stream/datetime"):
+                hint = SSEParser()
+                hint.feed(await anext(first.aiter_bytes()))
+                same_client = await client.get("/stream/datetime")
+                async with other.stream("/stream/datetime"):
+                    over_process = await other.get("/stream/datetime")
+                    health = await client.get("/health")
+        return hint.retry, same_client, over_process, health, await client.get("/health")
+
+    retry, same_client, over_process, health, after = run(server, scenario)
+
+    # Hints are 3 s plus (occupancy squared) of the 27 s range, with jitter
+    assert 6000 <= retry < 1.5 * 6000
+    assert same_client.status_code == over_process.status_code == 503
+    assert json.loads(same_client.body) == {"detail": "Too many streams, retry later"}
+    assert 15 <= int(same_client.headers["retry-after"]) <= 1.5 * 15 + 1
+    assert 30 <= int(over_process.headers["retry-after"]) <= 1.5 * 30
+    admission = json.loads(health.body)["admission"]
+    assert admission["active_streams"] == 3
+    assert admission["clients"] == 2
+    assert admission["busiest_client_streams"] == 2
+    assert admission["retry_ms"] == 30000
+    assert admission["rejected"] == {"max_per_client": 1, "max_streams": 1}
+    assert json.loads(after.body)["admission"]["active_streams"] == 0
+
+
+def test_chat_stream(server):
+    """Five bot messages, each wrapped in typing indicators"""
+    events = run(server, lambda client: collect(client, "/stream/chat"))
+
+    messages = [json.loads(event.data) for event in events if event.event == "message"]
+    assert [message["id"] for message in messages] == [1, 2, 3, 4, 5]
+    assert sum(event.event == "typing" for event in events) == 10
+    assert json.loads(events[-1].data)["total_messages"] == 5
+    assert server.clock.elapsed == pytest.approx(15)
+
+
+def test_log_stream(server):
+    """Fifteen log lines with known levels"""
+    events = run(server, lambda client: collect(client, "/stream/logs"))
+
+    logs = [json.loads(event.data) for event in events]
+    assert [log["line_number"] for log in logs] == list(range(1, 16))
+    assert {log["level"] for log in logs} <= {"INFO", "WARNING", "ERROR", "DEBUG"}
+
+
+def test_log_stream_batched(server):
+    """Batched logs carry every line, with the id of the last one in each batch"""
+    events = run(server, lambda client: collect(client, "/stream/logs?batch_ms=2000"))
+
+    batches = [json.loads(event.data) for event in events]
+    assert all(event.event == "log_batch" for event in events)
+    assert [log["line_number"] for batch in batches for log in batch] == list(
+        range(1, 16)
+    )
+    assert [event.id for event in events] == [
+        str(batch[-1]["line_number"]) for batch in batches
+    ]
+
+
+def test_log_stream_min_level(server):
+    """Simulated lines below the requested level are left out"""
+    events = run(server, lambda client: collect(client, "/stream/logs?min_level=WARNING"))
+
+    logs = [json.loads(event.data) for event in events]
+    assert logs and {log["level"] for log in logs} <= {"WARNING", "ERROR"}
+    assert [event.id for event in events] == [str(log["line_number"]) for log in logs]
+
+
+def test_log_stream_tails_file(monkeypatch, tmp_path):
+    """With SSE_LOG_FILE set, every stream follows the file through one shared tail"""
+    log_file = tmp_path / "app.log"
+    log_file.write_text("written before anyone watched\n")
+    monkeypatch.setenv("SSE_TRANSPORT", "local")
+    monkeypatch.setenv("SSE_LOG_FILE", str(log_file))
+    server = load_app()
+
+    async def scenario(client):
+        streams = asyncio.gather(
+            collect(client, "/stream/logs", limit=3),
+            collect(client, "/stream/logs?min_level=ERROR", limit=1),
+            collect(client, "/stream/logs?min_level=WARNING&batch_ms=100", limit=1),
+        )
+        await server.clock.sleep(1)
+        subscribers = shared_tail(str(log_file)).subscribers
+        with log_file.open("a") as log:
+            log.write("12:00:00 INFO started\n12:00:01 WARN slow\n12:00:02 ERROR failed\n")
+        return await streams, subscribers
+
+    (lines, errors, batches), subscribers = run(server, scenario)
+
+    assert subscribers == 3
+    logs = [json.loads(event.data) for event in lines]
+    assert [log["level"] for log in logs] == ["INFO", "WARNING", "ERROR"]
+    # Counted from where the tail started, like tail -f
+    assert [log["line_number"] for log in logs] == [1, 2, 3]
+    assert logs[0]["message"] == "12:00:00 INFO started"
+    assert [event.id for event in lines] == ["1", "2", "3"]
+    assert [json.loads(event.data)["message"] for event in errors] == [
+        "12:00:02 ERROR failed"
+    ]
+    assert batches[0].event == "log_batch"
+    assert [log["level"] for log in json.loads(batches[0].data)] == ["WARNING", "ERROR"]
+
+
+def test_datetime_stream(server):
+    """The shared datetime channel ticks every 30 seconds"""
+    events = run(server, lambda client: collect(client, "/stream/datetime", limit=4))
+
+    stamps = timestamps(events, key="datetime")
+    assert {(b - a).total_seconds() for a, b in zip(stamps, stamps[1:])} == {30.0}
+    assert [event.id for event in events] == ["1", "2", "3", "4"]
+
+
+def test_metrics_endpoint(server):
+    """Stream metrics are exposed in the Prometheus text format"""
+
+    def samples(response):
+        lines = response.body.decode().splitlines()
+        return dict(line.rsplit(" ", 1) for line in lines if not line.startswith("#"))
+
+    async def scenario(client):
+        before = samples(await client.get("/metrics"))
+        await collect(client, "/stream/simple")
+        await collect(client, "/stream/datetime", limit=1)
+        return before, await client.get("/metrics")
+
+    before, response = run(server, scenario)
+    after = samples(response)
+
+    def delta(name):
+        return float(after[name]) - float(before.get(name, 0))
+
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    assert delta('sse_events_sent_total{path="/stream/simple"}') == 11
+    assert delta('sse_disconnects_total{path="/stream/simple",reason="completed"}') == 1
+    assert delta('sse_disconnects_total{path="/stream/datetime",reason="client"}') == 1
+    assert after['sse_active_connections{path="/stream/simple"}'] == "0"
+    assert delta('sse_connection_duration_seconds_sum{path="/stream/simple"}') == 10
+    assert delta('sse_serialization_seconds_count{event="message"}') == 10
+    assert after['sse_channel_subscribers{channel="datetime"}'] == "0"
+
+
+def test_profile_endpoint(server):
+    """Profiling is switched on at runtime and dumps folded stacks"""
+
+    async def scenario(client):
+        toggled = await client.post("/admin/profile?enabled=true")
+        assert json.loads(toggled.body) == {"enabled": True}
+        await collect(client, "/stream/simple")
+        return await client.get("/admin/profile?reset=true")
+
+    response = run(server, scenario)
+
+    stacks = dict(line.rsplit(" ", 1) for line in response.body.decode().splitlines())
+    assert {
+        "/stream/simple;produce",
+        "/stream/simple;produce;serialize",
+        "/stream/simple;enqueue",
+    } <= stacks.keys()
+    assert all(micros.isdigit() for micros in stacks.values())
+    assert server.profiler.folded() == ""
+
+
+def test_admin_endpoints_are_local_only(server):
+    """Clients on other machines cannot read or toggle the profiler"""
+
+    async def scenario(client):
+        return [
+            (await client.get("/admin/profile")).status_code,
+            (await client.post("/admin/profile?enabled=true")).status_code,
+        ]
 
-    passed = 0
-    total = len(tests)
+    async def remote():
+        async with ASGIClient(server.app, client=("203.0.113.7", 50000)) as client:
+            return await scenario(client)
 
-    for test in tests:
-        try:
-            if test():
-                passed += 1
-        except KeyboardInterrupt:
-            print("\n⏹️  Tests interrupted by user")
-            break
-        except Exception as e:
-            print(f"❌ Test failed with exception: {e}")
+    assert server.clock.run(remote()) == [403, 403]
+    assert not server.profiler.enabled
 
-    print("\n" + "=" * 50)
-    print(f"📊 Test Results: {passed}/{total} tests passed")
 
-    if passed == total:
-        print("🎉 All tests passed! SSE streaming is working correctly.")
-    else:
-        print("⚠️  Some tests failed. Please check the server logs.")
+def test_streams_are_byte_identical(monkeypatch):
+    """Two runs from the same seed send the same bytes, pings included"""
+    monkeypatch.setenv("SSE_TRANSPORT", "local")
 
+    async def record(client):
+        body = b""
+        for path in ("/stream/realtime", "/stream/logs", "/stream/chat"):
+            async with client.stream(path) as response:
+                body += b"".join([chunk async for chunk in response.aiter_bytes()])
+        return body
 
-if __name__ == "__main__":
-    main()
+    first = run(load_app(), record)
+    second = run(load_app(), record)
+    assert b": ping - " in first
+    assert first == second
@@ -0,0 +1,753 @@
+#!/usr/bin/env python3
+"""
+Unit tests for the streaming building blocks used by app.py.
+These run in-process and do not need a live server.
+"""
+
+import asyncio
+import json
+import time
+from datetime import datetime
+
+import httpx
+from sse_starlette.sse import ServerSentEvent, ensure_bytes
+
+from streaming import (
+    AdmissionControl,
+    AsyncSSEClient,
+    BroadcastHub,
+    Clock,
+    DeltaDecoder,
+    DeltaEncoder,
+    Frame,
+    JobManager,
+    JsonSerializer,
+    LatestValue,
+    LogTail,
+    Policy,
+    Registry,
+    ReplayBuffer,
+    SSEParser,
+    StreamCompression,
+    StreamProfiler,
+    TimerWheel,
+    Subscription,
+    UnixSocketTransport,
+    VirtualClock,
+    hash_chain,
+    batched,
+    create_serializer,
+    overflow_counts,
+)
+
+
+def test_hub_runs_one_producer_for_many_subscribers():
+    """Every subscriber receives the same pre-encoded frame from a single producer"""
+    started = 0
+
+    async def producer():
+        nonlocal started
+        started += 1
+        for i in range(3):
+            yield "tick", {"n": i}
+            await asyncio.sleep(0)
+
+    async def consume(hub):
+        return [frame async for frame in hub.stream("ticks")]
+
+    async def run():
+        hub = BroadcastHub()
+        hub.register("ticks", producer)
+        return await asyncio.gather(*(consume(hub) for _ in range(50)))
+
+    results = asyncio.run(run())
+
+    assert started == 1
+    assert all(len(frames) == 3 for frames in results)
+    assert all(frames[0] is results[0][0] for frames in results)
+    assert results[0][0] == Frame.json("tick", {"n": 0}, id="1")
+    assert results[0][0].startswith(b"id: 1\r\nevent: tick\r\ndata: {")
+
+
+def test_hub_stops_producer_when_last_subscriber_leaves():
+    """Detaching the last subscriber cancels the channel's producer"""
+
+    async def producer():
+        while True:
+            yield "tick", {}
+            await asyncio.sleep(0.01)
+
+    async def run():
+        hub = BroadcastHub()
+        channel = hub.register("ticks", producer, replay_latest=True)
+        stream = hub.stream("ticks")
+        first = await stream.__anext__()
+        assert channel.running
+        await stream.aclose()
+        return first, channel
+
+    first, channel = asyncio.run(run())
+
+    assert first.startswith(b"id: 1\r\nevent: tick")
+    assert not channel.running
+    assert not channel.subscribers
+
+
+def test_frame_matches_sse_starlette_encoding():
+    """Pre-encoded frames are byte-identical to what sse-starlette would produce"""
+    cases = [
+        {"event": "message", "data": '{"count": 1}'},
+        {"event": "log", "data": "first line\nsecond line", "id": "7"},
+        {"data": "plain", "retry": 1500},
+        {"comment": "ping"},
+    ]
+    for fields in cases:
+        assert Frame.build(**fields) == ServerSentEvent(**fields).encode()
+
+
+def test_frame_is_written_without_reencoding():
+    """EventSourceResponse hands frames to the socket unchanged"""
+    frame = Frame.json("message", {"count": 1})
+    assert ensure_bytes(frame, "\r\n") is frame
+    assert frame.event == "message"
+    assert json.loads(frame.data) == {"count": 1}
+
+
+def test_replay_buffer_returns_only_missed_frames():
+    """Resume finds the missed frames by id and reports gaps older than the ring"""
+    buffer = ReplayBuffer(capacity=4)
+    frames = [Frame.json("tick", {"n": i}, id=str(i)) for i in range(1, 8)]
+    for i, frame in enumerate(frames, start=1):
+        buffer.append(i, frame)
+
+    assert buffer.since(7) == ([], True)
+    assert buffer.since(5) == (frames[5:], True)
+    assert buffer.since(3) == (frames[3:], True)
+    assert buffer.since(1) == (frames[3:], False)
+    assert buffer.since(99) == (frames[3:], False)
+
+
+def test_replay_buffer_is_bounded_by_bytes():
+    """The ring evicts old frames once it exceeds its byte budget"""
+    frame = Frame.json("tick", {"pad": "x" * 100}, id="1")
+    buffer = ReplayBuffer(capacity=100, max_bytes=len(frame) * 3)
+    for i in range(1, 11):
+        buffer.append(i, frame)
+
+    assert len(buffer) == 3
+    assert buffer.first_id == 8
+    assert buffer.size <= buffer.max_bytes
+
+
+def test_hub_resumes_from_last_event_id():
+    """A reconnecting subscriber gets the frames it missed, or a gap event"""
+
+    async def run():
+        hub = BroadcastHub()
+        hub.register("ticks", history=5)
+        for i in range(8):
+            hub.publish("ticks", "tick", {"n": i})
+        resumed = hub.stream("ticks", last_event_id=6)
+        behind = hub.stream("ticks", last_event_id=1)
+        return (
+            [await resumed.__anext__() for _ in range(2)],
+            [await behind.__anext__() for _ in range(6)],
+        )
+
+    resumed, behind = asyncio.run(run())
+
+    assert [frame.id for frame in resumed] == ["7", "8"]
+    assert behind[0].event == "gap"
+    assert json.loads(behind[0].data) == {"last_event_id": 1, "oldest_available": 4}
+    assert [frame.id for frame in behind[1:]] == ["4", "5", "6", "7", "8"]
+
+
+def test_unix_transport_relays_frames_between_workers(tmp_path):
+    """A frame published in one hub reaches subscribers of every other hub"""
+    path = str(tmp_path / "broker.sock")
+
+    async def run():
+        leader = BroadcastHub(UnixSocketTransport(path))
+        follower = BroadcastHub(UnixSocketTransport(path))
+        await leader.start()
+        await follower.start()
+        assert leader.transport.leader and not follower.transport.leader
+
+        on_follower = follower.stream("room")
+        on_leader = leader.stream("room")
+        pending = [
+            asyncio.ensure_future(on_follower.__anext__()),
+            asyncio.ensure_future(on_leader.__anext__()),
+        ]
+        await asyncio.sleep(0.05)
+
+        leader.publish("room", "message", {"from": "leader"})
+        from_leader = await asyncio.wait_for(pending[0], 1)
+        follower.publish("room", "message", {"from": "follower"})
+        first_on_leader = await asyncio.wait_for(pending[1], 1)
+        second_on_leader = await asyncio.wait_for(on_leader.__anext__(), 1)
+
+        # Closing the broker hands leadership to the remaining worker
+        await on_leader.aclose()
+        await leader.close()
+        for _ in range(100):
+            if follower.transport.leader:
+                break
+            await asyncio.sleep(0.01)
+        promoted = follower.transport.leader
+        await on_follower.aclose()
+        await follower.close()
+        return from_leader, first_on_leader, second_on_leader, promoted
+
+    from_leader, first, second, promoted = asyncio.run(run())
+
+    assert from_leader == Frame.json("message", {"from": "leader"}, id="1")
+    assert json.loads(first.data) == {"from": "leader"}
+    assert json.loads(second.data) == {"from": "follower"}
+    assert promoted
+
+
+def test_subscription_overflow_policies():
+    """Each policy keeps the buffer bounded and gives up the documented frames"""
+    frames = [Frame.json("tick", {"n": i}) for i in range(5)]
+
+    def fill(policy, **kwargs):
+        subscription = Subscription(maxsize=2, policy=policy, **kwargs)
+        for frame in frames:
+            subscription.put(frame)
+        drained = []
+        while len(subscription):
+            drained.append(subscription.get_nowait())
+        return subscription, drained
+
+    before = overflow_counts.copy()
+
+    assert fill(Policy.DROP_OLDEST)[1] == frames[3:]
+    assert fill(Policy.DROP_NEWEST)[1] == frames[:2]
+    assert fill(Policy.COALESCE)[1] == frames[4:]
+    subscription, drained = fill(Policy.DISCONNECT, max_overflows=3)
+    assert subscription.closed and drained == []
+
+    assert overflow_counts["drop_oldest"] - before["drop_oldest"] == 3
+    assert overflow_counts["coalesce"] - before["coalesce"] == 2
+    assert overflow_counts["disconnected"] - before["disconnected"] == 1
+
+
+def test_slow_readers_do_not_delay_fast_readers():
+    """Stuck subscribers overflow their own buffers while fast ones keep up"""
+    events = 200
+
+    async def fast_reader(stream, latencies):
+        async for frame in stream:
+            latencies.append(time.perf_counter() - float(frame.data))
+
+    async def slow_reader(stream):
+        async for _ in stream:
+            await asyncio.sleep(0.05)
+
+    async def run(slow_readers):
+        hub = BroadcastHub()
+        hub.register("ticks", queue_size=8, policy=Policy.DROP_OLDEST)
+        latencies = []
+        readers = [asyncio.create_task(fast_reader(hub.stream("ticks"), latencies))]
+        readers += [
+            asyncio.create_task(slow_reader(hub.stream("ticks")))
+            for _ in range(slow_readers)
+        ]
+        await asyncio.sleep(0)
+        for _ in range(events):
+            hub.publish("ticks", "tick", time.perf_counter())
+            await asyncio.sleep(0.001)
+        subscriptions = hub.channel("ticks").subscribers
+        peak = max(len(subscription) for subscription in subscriptions)
+        for reader in readers:
+            reader.cancel()
+        await asyncio.gather(*readers, return_exceptions=True)
+        return sorted(latencies), peak
+
+    alone, _ = asyncio.run(run(slow_readers=0))
+    crowded, peak = asyncio.run(run(slow_readers=100))
+
+    assert len(crowded) == events
+    assert peak <= 8
+    p99 = crowded[int(len(crowded) * 0.99)]
+    assert p99 < max(0.02, alone[int(len(alone) * 0.99)] * 5)
+
+
+def test_latest_value_serializes_only_sampled_snapshots():
+    """Readers get merged snapshots at their own rate; skipped values are never rendered"""
+    rendered = []
+
+    def render(state):
+        rendered.append(dict(state))
+        return state
+
+    async def producer(cell):
+        i = 0
+        while True:
+            i += 1
+            cell.update({"a": i} if i % 2 else {"b": i})
+            await asyncio.sleep(0.0002)
+
+    async def reader(cell, samples):
+        frames = []
+        async for frame in cell.sample(max_hz=20):
+            frames.append(frame)
+            if len(frames) == samples:
+                return frames
+
+    async def run():
+        cell = LatestValue("reading", render, producer)
+        results = await asyncio.gather(*(reader(cell, 4) for _ in range(10)))
+        return cell, results
+
+    cell, results = asyncio.run(run())
+
+    # Readers woken by the same update share one serialized frame
+    assert all(frames[0] is results[0][0] for frames in results)
+    distinct = {id(frame) for frames in results for frame in frames}
+    assert len(rendered) == len(distinct) <= 40
+    assert int(results[0][-1].id) > 100
+    assert set(rendered[-1]) == {"a", "b"}
+    assert cell.readers == 0
+
+
+def test_batched_bounds_batch_size_and_latency():
+    """Bursts are split at max_size; trickles are flushed after the linger window"""
+
+    async def burst_then_trickle():
+        for i in range(25):
+            yield i
+        for i in range(25, 28):
+            await asyncio.sleep(0.03)
+            yield i
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        batches = []
+        async for batch in batched(burst_then_trickle(), linger=0.01, max_size=10):
+            batches.append((loop.time(), batch))
+        return batches
+
+    batches = asyncio.run(run())
+
+    assert [batch for _, batch in batches[:3]] == [
+        list(range(10)),
+        list(range(10, 20)),
+        list(range(20, 25)),
+    ]
+    assert [batch for _, batch in batches[3:]] == [[25], [26], [27]]
+
+
+def test_parser_follows_the_event_stream_spec():
+    """Multi-line data, comments, ids, retry and every line ending are handled"""
+    stream = (
+        "\ufeff: comment\r\n"
+        "event: update\r\n"
+        "data: first\r\n"
+        "data:second\r\n"
+        "id: 7\r\n"
+        "retry: 2500\r\n"
+        "\r\n"
+        "data: cr line\r\r"
+        "id: bad\0id\n"
+        "retry: soon\n"
+        "data\n"
+        "\n"
+        "event: ignored-without-data\n\n"
+    ).encode()
+
+    # Feed one byte at a time so every line ending is split across chunks
+    parser = SSEParser()
+    events = [event for i in range(len(stream)) for event in parser.feed(stream[i : i + 1])]
+
+    assert [(e.event, e.data, e.id, e.retry) for e in events] == [
+        ("update", "first\nsecond", "7", 2500),
+        ("message", "cr line", "7", None),
+        ("message", "", "7", None),
+    ]
+    assert parser.retry == 2500
+
+
+def test_parser_handles_large_frames_across_chunks():
+    """Large frames parsed in place match small ones, however the bytes arrive"""
+    large = "é" * 3000
+    frames = [
+        f"id: 1\r\nevent: big\r\ndata: {large}\r\ndata: tail\r\n\r\n",
+        "id: 2\r\ndata: small\r\n\r\n",
+        f"id: 3\ndata:{large}\n\n",
+    ]
+    stream = "".join(frames * 3).encode()
+    expected = [
+        ("big", f"{large}\ntail", "1"),
+        ("message", "small", "2"),
+        ("message", large, "3"),
+    ] * 3
+
+    for size in (1, 7, 1000, 4096, len(stream)):
+        parser = SSEParser()
+        events = [
+            event
+            for i in range(0, len(stream), size)
+            for event in parser.feed(stream[i : i + size])
+        ]
+        assert [(e.event, e.data, e.id) for e in events] == expected
+
+
+def test_client_reconnects_with_last_event_id():
+    """The client resumes from the last id it saw after the server's retry delay"""
+    seen_headers = []
+
+    async def app(scope, receive, send):
+        last_id = dict(scope["headers"]).get(b"last-event-id")
+        seen_headers.append(last_id)
+        start = int(last_id or 0)
+        body = "retry: 10\n\n" + "".join(
+            f"id: {i}\ndata: {i}\n\n" for i in range(start + 1, start + 3)
+        )
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": body.encode()})
+
+    async def run():
+        transport = httpx.ASGITransport(app=app)
+        async with AsyncSSEClient("http://test", transport=transport) as client:
+            received = []
+            async for event in client.events("/stream"):
+                received.append(event.data)
+                if len(received) == 6:
+                    return received
+
+    received = asyncio.run(run())
+
+    assert received == ["1", "2", "3", "4", "5", "6"]
+    assert seen_headers == [None, b"2", b"4"]
+
+
+def test_registry_renders_prometheus_text():
+    """Counters, gauges and cumulative histogram buckets in the text format"""
+    registry = Registry()
+    requests = registry.counter("requests_total", "Requests", ("path",))
+    latency = registry.histogram("latency_seconds", "Latency", (), (0.1, 1))
+    registry.collector("queued", "Queued", "gauge", ("q",), lambda: [(("a",), 3)])
+
+    cell = requests.labels('/say "hi"')
+    cell.inc()
+    cell.inc(2)
+    for value in (0.05, 0.1, 0.5, 5):
+        latency.observe(value)
+
+    assert registry.render().splitlines() == [
+        "# HELP requests_total Requests",
+        "# TYPE requests_total counter",
+        'requests_total{path="/say \\"hi\\""} 3',
+        "# HELP latency_seconds Latency",
+        "# TYPE latency_seconds histogram",
+        'latency_seconds_bucket{le="0.1"} 2',
+        'latency_seconds_bucket{le="1"} 3',
+        'latency_seconds_bucket{le="+Inf"} 4',
+        "latency_seconds_sum 5.65",
+        "latency_seconds_count 4",
+        "# HELP queued Queued",
+        "# TYPE queued gauge",
+        'queued{q="a"} 3',
+    ]
+    assert requests.labels('/say "hi"') is cell
+
+
+def test_profiler_times_only_the_generator_running():
+    """Sleeps inside a generator are not counted as produce time"""
+    profiler = StreamProfiler(enabled=True)
+    sent = []
+
+    async def frames():
+        for i in range(3):
+            await asyncio.sleep(0.05)
+            yield Frame.json("tick", {"i": i})
+
+    async def send(message):
+        sent.append(message)
+
+    async def run():
+        stream, profiled_send = profiler.instrument("/ticks", frames(), send)
+        async for frame in stream:
+            await profiled_send({"type": "http.response.body", "body": frame})
+
+    asyncio.run(run())
+
+    totals = {}
+    for line in profiler.folded().splitlines():
+        stack, micros = line.rsplit(" ", 1)
+        totals[stack] = int(micros)
+    assert len(sent) == 3
+    assert {"/ticks;produce", "/ticks;produce;serialize"} <= totals.keys()
+    assert totals["/ticks;produce"] + totals["/ticks;produce;serialize"] < 50_000
+
+    profiler.enabled = False
+    stream = frames()
+    assert profiler.instrument("/ticks", stream, send) == (stream, send)
+
+
+def test_serializers_produce_the_same_json():
+    """Every backend encodes payloads to equivalent JSON in a single-line frame"""
+    payload = {"text": "22 °C", "big": 2**70, 1: [1.5, None, True]}
+    expected = json.loads(json.dumps(payload))
+    for kind in ("auto", "json", "orjson"):
+        serializer = create_serializer(kind)
+        assert json.loads(serializer.dumps(payload)) == expected
+
+    frame = Frame.json("log", {"line": "a\nb"}, id="3")
+    assert frame == Frame.build("log", frame.data, "3")
+    assert isinstance(create_serializer("json"), JsonSerializer)
+
+
+def test_timestamp_is_shared_within_a_tick():
+    """timestamp() formats once per tick, truncated to the clock's resolution"""
+    clock = Clock(resolution=60)
+    stamp, again = clock.timestamp(), clock.timestamp()
+    # The same string object, unless a minute boundary passed between the calls
+    assert again is stamp or again > stamp
+    assert datetime.fromisoformat(stamp).second == 0
+
+    virtual = VirtualClock()
+    assert virtual.timestamp() == "2024-01-01T00:00:00"
+    virtual.elapsed = 1.5
+    assert virtual.timestamp() == "2024-01-01T00:00:01.500000"
+
+
+def test_delta_encoding_sends_only_changed_fields():
+    """After the schema, events carry elapsed ms and changed scaled integers"""
+    readings = [
+        {"a": 1.25, "b": 7.0, "timestamp": "2024-01-01T00:00:00", "unit": "m"},
+        {"a": 1.25, "b": 6.99, "timestamp": "2024-01-01T00:00:00.250000", "unit": "m"},
+        {"a": 1.25, "b": 6.99, "timestamp": "2024-01-01T00:00:01", "unit": "m"},
+    ]
+    encoder = DeltaEncoder(("a", "b"), precision=2, static=("unit",))
+    encoded = [encoder.encode(reading) for reading in readings]
+
+    assert encoded[0] == (
+        "schema",
+        {
+            "fields": ["a", "b"],
+            "precision": 2,
+            "values": [125, 700],
+            "timestamp": "2024-01-01T00:00:00",
+            "static": {"unit": "m"},
+        },
+    )
+    assert encoded[1:] == [("delta", [250, 1, -1]), ("delta", [750])]
+
+    decoder = DeltaDecoder()
+    assert [decoder.decode(kind, payload) for kind, payload in encoded] == readings
+
+
+def test_compression_negotiation():
+    """The server's preferred encoding the client accepts, within the CPU budget"""
+    compression = StreamCompression(("gzip", "deflate"), cpu_budget=0.5)
+
+    def negotiate(accept):
+        return compression.negotiate([(b"accept-encoding", accept.encode())])
+
+    assert negotiate("gzip, deflate, br") == "gzip"
+    assert negotiate("deflate, gzip;q=0.4") == "deflate"
+    assert negotiate("*;q=0.2") == "gzip"
+    assert negotiate("gzip;q=0, br") is None
+    assert compression.negotiate([]) is None
+
+    compression.load = 0.9
+    assert negotiate("gzip") is None
+    assert StreamCompression(()).negotiate([(b"accept-encoding", b"gzip")]) is None
+
+
+def test_admission_raises_retry_hints_with_load():
+    """Open streams get a new retry hint with their next write once load grows"""
+    admission = AdmissionControl(max_streams=10, retry_min_ms=1000, retry_max_ms=10000, jitter=0)
+    sent = []
+
+    async def send(message):
+        sent.append(message.get("body"))
+
+    async def stream(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b"data: 1\r\n\r\n", "more_body": True})
+        for _ in range(8):
+            assert admission.admit("10.0.0.1") is None
+        await send({"type": "http.response.body", "body": b"data: 2\r\n\r\n", "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+
+    assert admission.admit("10.0.0.1") is None
+    asyncio.run(admission.wrap(stream, "10.0.0.1")({}, None, send))
+
+    # 1 of 10 slots: 1000 + 9000 * 0.01, rounded down to a whole second
+    assert sent == [
+        None,
+        b"retry: 1000\r\n\r\n",
+        b"data: 1\r\n\r\n",
+        b"retry: 8000\r\n\r\ndata: 2\r\n\r\n",
+        b"",
+    ]
+    assert admission.active == 8
+    assert admission.admit("10.0.0.2") is None
+    assert admission.admit("10.0.0.3") is None
+    assert admission.admit("10.0.0.3") == "max_streams"
+    assert admission.retry_ms == 10000
+
+
+def test_timer_wheel_batches_sleepers_behind_one_loop_timer():
+    """Sleeps wake on their tick without drift, all sharing one loop timer"""
+    clock = VirtualClock()
+    wheel = TimerWheel(tick=0.1, slots=8)
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        woke = []
+
+        async def sleeper(seconds, times):
+            for _ in range(times):
+                await wheel.sleep(seconds)
+                woke.append((seconds, round(loop.time(), 9)))
+
+        tasks = [
+            asyncio.create_task(sleeper(0.5, 3)),
+            asyncio.create_task(sleeper(0.8, 2)),
+            # More than one turn of the 0.8 s wheel
+            asyncio.create_task(sleeper(30, 1)),
+            asyncio.create_task(sleeper(0.25, 1)),
+        ]
+        await asyncio.sleep(0)
+        timers = sum(not handle.cancelled() for handle in loop._scheduled)
+        cancelled = asyncio.create_task(wheel.sleep(5))
+        await asyncio.sleep(0)
+        cancelled.cancel()
+        await asyncio.gather(*tasks)
+        return woke, timers
+
+    woke, timers = clock.run(run())
+
+    assert timers == 1
+    # 0.25 s rounds up to the next tick
+    assert woke == [
+        (0.25, 0.3),
+        (0.5, 0.5),
+        (0.8, 0.8),
+        (0.5, 1.0),
+        (0.5, 1.5),
+        (0.8, 1.6),
+        (30, 30.0),
+    ]
+    assert wheel.pending == 0
+
+
+def test_jobs_stream_progress_without_blocking_the_loop():
+    """Many concurrent pool jobs reach all their watchers while the loop stays responsive"""
+    manager = JobManager(max_workers=2, poll_interval=0.02)
+
+    async def watch(job):
+        frames = [frame async for frame in job.progress.sample(max_hz=50)]
+        return [json.loads(frame.data) for frame in frames], frames[-1].event
+
+    async def probe(stop):
+        # How late a 10 ms timer fires while jobs are submitted and reported
+        loop = asyncio.get_running_loop()
+        worst = 0.0
+        while not stop.is_set():
+            started = loop.time()
+            await asyncio.sleep(0.01)
+            worst = max(worst, loop.time() - started - 0.01)
+        return worst
+
+    async def run():
+        stop = asyncio.Event()
+        lag = asyncio.create_task(probe(stop))
+        jobs = [manager.submit(hash_chain, 10, 2000) for _ in range(24)]
+        # Three watchers per job share its snapshots
+        watched = await asyncio.gather(*(watch(job) for job in jobs for _ in range(3)))
+        stop.set()
+        stats = manager.stats()
+        await manager.close()
+        return jobs, watched, await lag, stats
+
+    jobs, watched, worst_lag, stats = asyncio.run(run())
+
+    assert worst_lag < 0.1
+    assert stats["running"] == stats["queued"] == 0
+    expected = hash_chain(lambda done, total: None, 10, 2000)
+    for job in jobs:
+        assert job.status == "completed"
+        assert job.result == expected
+    for progress, last in watched:
+        assert last == "complete"
+        steps = [update["current_step"] for update in progress[:-1]]
+        assert steps == sorted(steps)
+        assert progress[-2]["percentage"] == 100.0
+        assert progress[-2]["status"] == "completed"
+        assert progress[-1]["result"] == expected
+
+
+def test_log_tail_follows_rotation_and_truncation(tmp_path):
+    """One tail feeds every level group once per read, across rotate and truncate"""
+    path = tmp_path / "app.log"
+    path.write_text("old INFO line\n")
+    tail = LogTail(str(path), poll_interval=0.1)
+    clock = VirtualClock()
+
+    async def follow(received, **options):
+        parser = SSEParser()
+        async for frame in tail.stream(**options):
+            received.extend(parser.feed(bytes(frame)))
+
+    def append(text):
+        with path.open("a") as log:
+            log.write(text)
+
+    async def run():
+        every, errors, batches = [], [], []
+        tasks = [
+            asyncio.create_task(follow(every)),
+            asyncio.create_task(follow(errors, min_level="ERROR")),
+            asyncio.create_task(follow(batches, min_level="warning", batch=True)),
+        ]
+        await asyncio.sleep(0.15)
+        append("DEBUG one\nWARN two\nthree, no level\nERROR fo")
+        await asyncio.sleep(0.1)
+        append("ur\n")
+        await asyncio.sleep(0.1)
+        # Rotation: the rest of the old file, then the new one from its start
+        append("INFO five\n")
+        path.rename(tmp_path / "app.log.1")
+        path.write_text("CRITICAL six\n")
+        await asyncio.sleep(0.2)
+        # copytruncate: shorter than what was read, so read again from the start
+        path.write_text("ERROR\n")
+        await asyncio.sleep(0.2)
+        running = tail._task is not None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return every, errors, batches, running
+
+    every, errors, batches, running = clock.run(run())
+
+    def lines(events):
+        found = []
+        for event in events:
+            data = json.loads(event.data)
+            for record in data if event.event == "log_batch" else [data]:
+                found.append((record["line_number"], record["level"], record["message"]))
+        return found
+
+    assert lines(every) == [
+        (1, "DEBUG", "DEBUG one"),
+        (2, "WARNING", "WARN two"),
+        (3, "UNKNOWN", "three, no level"),
+        (4, "ERROR", "ERROR four"),
+        (5, "INFO", "INFO five"),
+        (6, "CRITICAL", "CRITICAL six"),
+        (7, "ERROR", "ERROR"),
+    ]
+    assert [event.id for event in every] == [str(n) for n in range(1, 8)]
+    assert [line[0] for line in lines(errors)] == [4, 6, 7]
+    assert [line[0] for line in lines(batches)] == [2, 4, 6, 7]
+    assert {event.event for event in batches} == {"log_batch"}
+    assert (tail.rotations, tail.truncations) == (1, 1)
+    # The last subscriber leaving stops the tail and closes the file
+    assert running and tail._task is None and tail._fd is None